@@ -0,0 +1,12 @@
+"""
+Shared helpers for the DWH extraction and transformation scripts.
+
+Submodules are imported on demand so that a script only pays for what it uses:
+
+    from dwh_utils import extraction, transform
+
+Heavy optional dependencies (mysql.connector, requests, openpyxl, IPython) are
+only imported inside the functions that need them.
+"""
+
+__version__ = "0.1.0"
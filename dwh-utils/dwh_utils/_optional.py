@@ -0,0 +1,30 @@
+import importlib
+
+
+# Pip distribution names for top-level modules whose import name differs.
+PIP_NAMES = {
+    "mysql": "mysql-connector-python",
+    "IPython": "ipython",
+    "python_calamine": "python-calamine",
+}
+
+
+def import_optional(name):
+    """
+    Import an optional dependency on first use.
+
+    Parameters:
+    name (str): The module to import, e.g. 'mysql.connector'.
+
+    Raises:
+    ImportError: If the module is not installed, with a hint on how to install it.
+
+    Returns:
+    module: The imported module.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        top_level = name.split(".")[0]
+        pip_name = PIP_NAMES.get(top_level, top_level)
+        raise ImportError(f"'{name}' is required for this feature. Install it with: pip install {pip_name}") from e
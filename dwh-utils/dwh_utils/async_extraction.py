@@ -0,0 +1,215 @@
+"""
+Asyncio extraction path for many small HTTP sources.
+
+All requests share one aiohttp session with a pooled connector, a semaphore
+bounds how many are in flight, and response bodies are parsed in a worker pool
+so parsing never blocks the event loop:
+
+    from dwh_utils.async_extraction import HttpRequest, fetch_many
+
+    http_requests = [HttpRequest(f'https://servicios.ine.es/.../{code}', kind='json') for code in codes]
+    frames = fetch_many(http_requests, concurrency=64)
+
+perform_extraction uses this path for its JSON/CSV sources when the
+extraction config sets "concurrency". Retries, backoff, Retry-After and the
+per-host rate limits behave as in http_client.
+
+Requires the optional 'aiohttp' package.
+"""
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from ._optional import import_optional
+from .extraction import parse_csv_bytes, parse_json_bytes
+from .http_client import (
+    BACKOFF_MAX, DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, RETRY_STATUSES,
+    backoff_delay, bucket_for, retry_after_seconds
+)
+
+
+DEFAULT_CONCURRENCY = 32
+
+# kind: 'json' or 'csv'; column_delimiter: CSV only; rate_limit: requests per second to the host;
+# timeout, max_retries: settings of this request, None for those of fetch_all.
+HttpRequest = namedtuple('HttpRequest', ['url', 'kind', 'column_delimiter', 'rate_limit', 'timeout', 'max_retries'],
+                         defaults=('json', None, None, None, None))
+
+
+class FetchError(Exception):
+    """A request that could not be downloaded or parsed. The underlying error, if any, is its __cause__."""
+
+
+def _client_timeout(timeout):
+    aiohttp = import_optional('aiohttp')
+    connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+
+
+def _parse(kind, content, column_delimiter):
+    # Module-level so it can be sent to a process pool
+    if kind == 'csv':
+        return parse_csv_bytes(content, column_delimiter)
+    return parse_json_bytes(content)
+
+
+async def _acquire_rate_limit(host, rate_limit):
+    bucket = bucket_for(host, rate_limit)
+    if bucket is None:
+        return None
+    while True:
+        wait = bucket.try_acquire()
+        if not wait:
+            return bucket
+        await asyncio.sleep(wait)
+
+
+async def _fetch_one(session, semaphore, executor, request, max_retries, max_backoff):
+    """Download and parse one request. Returns the DataFrame, or raises FetchError."""
+    aiohttp = import_optional('aiohttp')
+    loop = asyncio.get_running_loop()
+    host = urlsplit(request.url).hostname
+    if request.max_retries is not None:
+        max_retries = request.max_retries
+    # aiohttp reads timeout=None as no timeout at all, so the session's is only overridden when set
+    get_options = {} if request.timeout is None else {'timeout': _client_timeout(request.timeout)}
+
+    async with semaphore:
+        attempt = 0
+        while True:
+            bucket = await _acquire_rate_limit(host, request.rate_limit)
+
+            response = None
+            try:
+                async with session.get(request.url, **get_options) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        content = await response.read()
+                        break
+                    error = f"HTTP {response.status}"
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+                # Includes a body cut off mid-transfer
+                error = e
+            except (aiohttp.ClientError, ValueError) as e:
+                # HTTP errors, invalid URLs, ...: this request fails, the others go on
+                raise FetchError(f"Failed to download {request.url}: {e}") from e
+
+            if attempt >= max_retries:
+                cause = error if isinstance(error, BaseException) else None
+                raise FetchError(f"Failed to download {request.url} after {attempt + 1} attempts: {error}") from cause
+
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt, cap=max_backoff)
+            elif delay > max_backoff:
+                raise FetchError(f"Failed to download {request.url}: {error}, and the server asks to retry "
+                                 f"after {delay:.0f}s, more than max_backoff ({max_backoff:.0f}s)")
+            elif bucket is not None:
+                bucket.pause(delay)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    # Parse outside the semaphore so the slot is free for the next download
+    try:
+        return await loop.run_in_executor(executor, _parse, request.kind, content, request.column_delimiter)
+    except ValueError as e:
+        raise FetchError(f"Failed to parse {request.url}: {e}") from e
+
+
+async def fetch_all(http_requests, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                    parse_workers=None, use_processes=False, on_result=None, return_exceptions=False,
+                    max_backoff=BACKOFF_MAX):
+    """
+    Download and parse many HTTP sources concurrently. Coroutine version of fetch_many.
+
+    Parameters:
+    http_requests (list): HttpRequest entries.
+    concurrency (int): Maximum number of requests in flight.
+    timeout (float or tuple): Timeout in seconds, or a (connect, read) pair. A request's own timeout wins.
+    max_retries (int): Retries on connection errors, timeouts and retryable HTTP statuses. A request's own
+                       max_retries wins.
+    parse_workers (int): Size of the parsing pool. Defaults to the executor's default.
+    use_processes (bool): Parse in worker processes instead of threads, for large JSON bodies
+                          where flattening holds the GIL. Default is False.
+    on_result (callable): Called as on_result(index, df) as soon as each request is done (df is None if it
+                          failed), so results can be stored instead of all being held until the end.
+                          Calls run one at a time in a worker thread, not on the event loop.
+                          The returned list then holds what on_result returned, or None where it raised.
+    return_exceptions (bool): Hold the error of a failed request in the returned list instead of None:
+                              a FetchError for a failed download or parse, or the exception on_result
+                              raised. on_result is then only called for the requests that succeeded.
+                              Default is False.
+    max_backoff (float): Longest wait between attempts of a request, in seconds. A Retry-After asking for
+                         more fails the request.
+
+    Returns:
+    list: One DataFrame per request, in order, or None (the error, with return_exceptions) where it failed.
+    """
+    aiohttp = import_optional('aiohttp')
+
+    client_timeout = _client_timeout(timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    loop = asyncio.get_running_loop()
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    # on_result writes files (checkpoints, spills): it runs off the event loop so downloads go on meanwhile,
+    # in a single thread so calls never overlap
+    with executor_class(max_workers=parse_workers) as executor, ThreadPoolExecutor(max_workers=1) as result_executor:
+        async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+            async def fetch(idx, request):
+                try:
+                    df = await _fetch_one(session, semaphore, executor, request, max_retries, max_backoff)
+                except FetchError as e:
+                    print(e)
+                    if return_exceptions:
+                        return e
+                    df = None
+                if on_result is None:
+                    return df
+                try:
+                    return await loop.run_in_executor(result_executor, on_result, idx, df)
+                except Exception as e:
+                    # As for a failed download, so one bad result does not cancel the other requests
+                    print(f"Failed to handle the result of {request.url}: {e}")
+                    return e if return_exceptions else None
+
+            return await asyncio.gather(*(fetch(idx, request) for idx, request in enumerate(http_requests)))
+
+
+def fetch_many(http_requests, **options):
+    """
+    Download and parse many HTTP sources concurrently from synchronous code.
+
+    Works inside Jupyter too: if an event loop is already running in this thread,
+    the fetch runs on a fresh loop in a helper thread.
+
+    Parameters:
+    http_requests (list): HttpRequest entries.
+    **options: See fetch_all.
+
+    Returns:
+    list: One DataFrame per request, in order, or None where it failed.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(fetch_all(http_requests, **options))
+
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(fetch_all(http_requests, **options))
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
@@ -0,0 +1,87 @@
+"""
+Console entry point: run one or more pipelines in a single process.
+
+    dwh-run ahorro compras
+    dwh-run ahorro --config-dir /opt/dwh/dwh-etls/config
+
+Running several pipelines in one interpreter shares the connection pools and
+mapping caches between them instead of paying the start-up cost per script.
+"""
+import os
+import sys
+import argparse
+import contextlib
+
+from .config import get_config_dir, load_plan
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    """Temporarily change the working directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def run_pipeline(pipeline, config_dir=None, run_id=None):
+    """
+    Runs the extraction stage of a pipeline from its compiled plan.
+
+    Relative paths in the configuration are resolved from the pipeline's
+    'extraction' folder next to the config directory, the same way they are
+    when the <pipeline>_e.py script is run.
+
+    Parameters:
+    pipeline (str): The pipeline name, e.g. 'ahorro'.
+    config_dir (str): Directory holding the configuration files.
+    run_id (str): Run to create or resume. See extraction.perform_extraction.
+
+    Returns:
+    dict: Dictionary containing the extracted DataFrames.
+    """
+    from .extraction import perform_extraction
+
+    config_dir = get_config_dir(config_dir)
+    plan = load_plan(pipeline, config_dir)
+
+    script_dir = os.path.join(os.path.dirname(config_dir), 'extraction')
+    if not os.path.isdir(script_dir):
+        script_dir = os.getcwd()
+
+    with working_directory(script_dir):
+        return perform_extraction(None, script_filename=os.path.join(script_dir, f'{pipeline}_e.py'), plan=plan, run_id=run_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='dwh-run', description='Run DWH pipelines in a single process.')
+    parser.add_argument('pipelines', nargs='+', help="Pipeline names, matching <config-dir>/<pipeline>.json.")
+    parser.add_argument('--config-dir', default=None, help="Directory holding the pipeline configs (default: $DWH_CONFIG_DIR or dwh-etls/config).")
+    parser.add_argument('--run-id', default=None, help="Run id to create or resume. Defaults to the last incomplete run of the pipeline; completed sources of a resumed run are not extracted again.")
+    args = parser.parse_args(argv)
+
+    # Validate every pipeline up front so a broken config fails the run before any extraction starts.
+    # ImportError: an optional dependency the config needs is missing, e.g. pyarrow for Arrow staging
+    try:
+        for pipeline in args.pipelines:
+            load_plan(pipeline, args.config_dir)
+    except (OSError, RuntimeError, ImportError, ValueError) as e:
+        print(e)
+        return 2
+
+    failed = []
+    for pipeline in args.pipelines:
+        print(f"Running pipeline '{pipeline}'...")
+        try:
+            run_pipeline(pipeline, args.config_dir, args.run_id)
+        except Exception as e:
+            print(f"Pipeline '{pipeline}' failed: {e}")
+            failed.append(pipeline)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,487 @@
+import os
+import copy
+import json
+import difflib
+import importlib.util
+import threading
+from types import MappingProxyType
+from collections import namedtuple
+
+
+# Directory holding one <pipeline>.json per pipeline. Overridable with the DWH_CONFIG_DIR environment variable.
+DEFAULT_CONFIG_DIR = os.path.join('dwh-etls', 'config')
+
+DEFAULT_TEMP_FOLDER = '../../s3/temp_files'
+DEFAULT_MAPPING_PATH = 'static/Mapping.xlsx'
+# One <table>.json per target table, see schema.SchemaRegistry
+DEFAULT_SCHEMA_FOLDER = 'static/schemas'
+
+
+class ConfigError(RuntimeError):
+    """Raised when a pipeline configuration does not match the schema."""
+
+
+# Schema of the configuration files. Each entry maps a key to (accepted types, required).
+_OPTIONAL_STR = ((str, type(None)), False)
+_OPTIONAL_BOOL = (bool, False)
+_REQUIRED_STR = (str, True)
+
+_STAGING_FIELDS = {
+    "load_s3": _OPTIONAL_BOOL,
+    "output_folder": _OPTIONAL_STR,
+    "script_filename": _OPTIONAL_STR,
+}
+
+# timeout: seconds, or [connect, read]; max_retries: retries on transient errors; rate_limit: requests per second to the host
+_HTTP_FIELDS = {
+    "timeout": ((int, float, list), False),
+    "max_retries": (int, False),
+    "rate_limit": ((int, float), False),
+}
+
+SOURCE_SCHEMAS = {
+    "json": {
+        "url": _REQUIRED_STR,
+        **_HTTP_FIELDS,
+        **_STAGING_FIELDS,
+    },
+    "sql": {
+        "host": _REQUIRED_STR,
+        "username": _REQUIRED_STR,
+        "password": _REQUIRED_STR,
+        "database": _REQUIRED_STR,
+        "table": _REQUIRED_STR,
+        "change_probe": _OPTIONAL_STR,
+        "probe_column": _OPTIONAL_STR,
+        **_STAGING_FIELDS,
+    },
+    "csv": {
+        "url": _REQUIRED_STR,
+        "column_delimiter": _OPTIONAL_STR,
+        **_HTTP_FIELDS,
+        **_STAGING_FIELDS,
+    },
+    # sheets: a sheet, a list of them, or null for all; dtype: column -> type enforced on read (see
+    # transform.enforce_dtypes), other columns are inferred; sheet_column: column naming the sheet of each
+    # row when several are read; workers: processes parsing sheets in parallel
+    "excel": {
+        "path": _REQUIRED_STR,
+        "sheets": ((list, str, type(None)), False),
+        "header": (int, False),
+        "dtype": (dict, False),
+        "sheet_column": _OPTIONAL_STR,
+        "workers": (int, False),
+        **_STAGING_FIELDS,
+    },
+}
+
+# List-valued keys: (accepted element types, required length or None for any)
+LIST_ELEMENTS = {
+    "timeout": ((int, float), 2),
+    "sheets": ((str, int), None),
+    "keys": (str, None),
+}
+
+# Keys restricted to a fixed set of values (null is always allowed for optional keys)
+FIELD_CHOICES = {
+    "change_probe": ("update_time", "checksum", "fingerprint"),
+    "staging_format": ("xlsx", "arrow"),
+}
+
+# Integer keys that must be at least 1
+POSITIVE_INTS = ("concurrency", "staging_workers", "workers")
+
+EXTRACTION_SCHEMA = {
+    "output_excel_path": _OPTIONAL_STR,
+    # "xlsx" stages the run as one workbook; "arrow" as memory-mappable Arrow IPC files (see staging.load_staged)
+    "staging_format": _OPTIONAL_STR,
+    # Fetch JSON/CSV sources concurrently through the asyncio engine, with at most this many requests in flight
+    "concurrency": (int, False),
+    # Cap on the memory held by extracted frames, in bytes or as e.g. "4GB"; beyond it finished sources are evicted to disk
+    "memory_budget": ((int, str), False),
+    # Processes rendering the sheets of the xlsx staging workbook. Off (1) by default: under the spawn start
+    # method (Windows, macOS) each worker re-imports the calling script, which then needs an
+    # `if __name__ == '__main__':` guard around perform_extraction.
+    "staging_workers": (int, False),
+    **{kind: (list, False) for kind in SOURCE_SCHEMAS},
+}
+
+MAPPING_SCHEMA = {
+    "mapping_column_name": _OPTIONAL_STR,
+    "mapping_path": _OPTIONAL_STR,
+    "full_map": _OPTIONAL_BOOL,
+    "dq": _OPTIONAL_BOOL,
+    "dq_export": _OPTIONAL_BOOL,
+    "script_name": _OPTIONAL_STR,
+    # Composite-key, range and validity-date sheets (see mapping.MappingIndex): keys lists the columns matched
+    # against the key columns of the sheet, range a column looked up in its low/high bands and valid_on a date
+    # column looked up in its validity windows. keys defaults to the mapped column when range or valid_on is set.
+    "keys": ((list, type(None)), False),
+    "range": _OPTIONAL_STR,
+    "valid_on": _OPTIONAL_STR,
+}
+
+# Top-level sections read by dwh_utils. Other sections are left alone unless they look like a typo of these.
+KNOWN_SECTIONS = {
+    "extraction": dict,
+    "mapping": dict,
+}
+
+
+# A compiled, read-only view of a configuration.
+# sources: tuple of SourcePlan in execution order; mapping: tuple of MappingPlan;
+# mapping_sheets: distinct (mapping_path, sheet) pairs the transformation needs;
+# staging_folder: where the staging workbook is written; staging_format: 'xlsx' or 'arrow';
+# temp_folders: folders used by load_s3 sources;
+# concurrency: in-flight limit of the asyncio HTTP engine, or None to fetch sources one by one;
+# memory_budget: bytes the extracted frames may hold (a size string in the config), or None for no limit;
+# staging_workers: processes rendering the staging workbook, 1 for none.
+PipelinePlan = namedtuple('PipelinePlan', ['name', 'config_file', 'sources', 'mapping', 'mapping_sheets', 'staging_folder', 'staging_format', 'temp_folders', 'concurrency', 'memory_budget', 'staging_workers'])
+
+# kind: 'json', 'sql', 'csv' or 'excel'; name: '<kind>_<index>', also used as the staging sheet name;
+# options: read-only dict of the source entry with defaults filled in.
+SourcePlan = namedtuple('SourcePlan', ['kind', 'index', 'name', 'options'])
+
+MappingPlan = namedtuple('MappingPlan', ['column', 'options'])
+
+
+def _check_fields(entry, schema, where, errors):
+    """Collect type, required-key and unknown-key errors for one config object."""
+    if not isinstance(entry, dict):
+        errors.append(f"{where}: expected an object, got {type(entry).__name__}")
+        return
+
+    for key, (types, required) in schema.items():
+        if key not in entry:
+            if required:
+                errors.append(f"{where}: missing required key '{key}'")
+        elif not _is_instance(entry[key], types):
+            errors.append(f"{where}.{key}: expected {_type_names(types)}, got {type(entry[key]).__name__}")
+        elif key in LIST_ELEMENTS and isinstance(entry[key], list):
+            _check_elements(entry[key], *LIST_ELEMENTS[key], f"{where}.{key}", errors)
+        elif key in FIELD_CHOICES and entry[key] is not None and entry[key] not in FIELD_CHOICES[key]:
+            errors.append(f"{where}.{key}: expected one of {', '.join(FIELD_CHOICES[key])}, got '{entry[key]}'")
+        elif key in POSITIVE_INTS and entry[key] is not None and entry[key] < 1:
+            errors.append(f"{where}.{key}: expected a positive int, got {entry[key]}")
+
+    for key in entry:
+        if key not in schema:
+            errors.append(f"{where}: unknown key '{key}'{_suggestion(key, schema)}")
+
+
+def _is_instance(value, types):
+    # JSON true/false load as bool, a subclass of int: they only pass where bool itself is accepted
+    types = types if isinstance(types, tuple) else (types,)
+    if isinstance(value, bool) and bool not in types:
+        return False
+    return isinstance(value, types)
+
+
+def _check_elements(values, types, length, where, errors):
+    """Collect element type and length errors for a list-valued key."""
+    if length is not None and len(values) != length:
+        errors.append(f"{where}: expected {length} elements, got {len(values)}")
+    for idx, value in enumerate(values):
+        if not _is_instance(value, types):
+            errors.append(f"{where}[{idx}]: expected {_type_names(types)}, got {type(value).__name__}")
+
+
+def _type_names(types):
+    types = types if isinstance(types, tuple) else (types,)
+    return " or ".join("null" if t is type(None) else t.__name__ for t in types)
+
+
+def _suggestion(key, known):
+    matches = difflib.get_close_matches(key, list(known), n=1)
+    return f" (did you mean '{matches[0]}'?)" if matches else ""
+
+
+def _check_source_rules(kind, entry, where, errors):
+    """Collect errors for source options that are only invalid in combination."""
+    if kind == "sql" and entry.get("change_probe") == "fingerprint" and not entry.get("probe_column"):
+        errors.append(f"{where}: change_probe 'fingerprint' requires a probe_column, COUNT(*) alone misses updates")
+    if kind == "excel" and entry.get("sheets") == []:
+        errors.append(f"{where}.sheets: empty list, leave it out (or null) to read every sheet")
+
+
+def _check_extraction_rules(extraction_config, errors):
+    """Collect errors for extraction options whose values are checked beyond their type."""
+    budget = extraction_config.get("memory_budget")
+    if _is_instance(budget, (int, str)):
+        # Imported here: pandas is only needed once a run starts
+        from .memory import parse_size
+        try:
+            size = parse_size(budget)
+        except ValueError as e:
+            errors.append(f"extraction.memory_budget: {e}")
+        else:
+            if size < 1:
+                errors.append(f"extraction.memory_budget: expected a positive size, got {budget!r}")
+
+
+def validate_config(config, source="config"):
+    """
+    Validates a configuration dictionary against the schema.
+
+    All problems are collected and reported together, so a misspelled key or a
+    source without a url fails before anything is downloaded.
+
+    Parameters:
+    config (dict): The configuration data.
+    source (str): Name used in error messages, usually the config file path.
+
+    Raises:
+    ConfigError: If the configuration is invalid.
+    """
+    errors = []
+
+    if not isinstance(config, dict):
+        raise ConfigError(f"{source}: expected a JSON object at the top level")
+
+    for key, value in config.items():
+        if key in KNOWN_SECTIONS:
+            if not isinstance(value, KNOWN_SECTIONS[key]):
+                errors.append(f"{key}: expected an object, got {type(value).__name__}")
+        elif difflib.get_close_matches(key, list(KNOWN_SECTIONS), n=1, cutoff=0.8):
+            errors.append(f"unknown section '{key}'{_suggestion(key, KNOWN_SECTIONS)}")
+
+    extraction_config = config.get("extraction", {})
+    if isinstance(extraction_config, dict):
+        _check_fields(extraction_config, EXTRACTION_SCHEMA, "extraction", errors)
+        _check_extraction_rules(extraction_config, errors)
+        for kind, schema in SOURCE_SCHEMAS.items():
+            entries = extraction_config.get(kind, [])
+            if isinstance(entries, list):
+                for idx, entry in enumerate(entries):
+                    _check_fields(entry, schema, f"extraction.{kind}[{idx}]", errors)
+                    if isinstance(entry, dict):
+                        _check_source_rules(kind, entry, f"extraction.{kind}[{idx}]", errors)
+
+    mapping_config = config.get("mapping", {})
+    if isinstance(mapping_config, dict):
+        for column, settings in mapping_config.items():
+            _check_fields(settings, MAPPING_SCHEMA, f"mapping.{column}", errors)
+
+    if errors:
+        raise ConfigError(f"Invalid configuration {source}:\n  " + "\n  ".join(errors))
+
+
+def compile_plan(config, name=None, config_file=None):
+    """
+    Validates a configuration and compiles it into an immutable execution plan.
+
+    Parameters:
+    config (dict): The configuration data.
+    name (str): The pipeline name.
+    config_file (str): Path the configuration was read from, if any.
+
+    Raises:
+    ConfigError: If the configuration is invalid.
+    ImportError: If "staging_format" is "arrow" and pyarrow is not installed.
+
+    Returns:
+    PipelinePlan: The compiled plan.
+    """
+    validate_config(config, config_file or name or "config")
+
+    extraction_config = config.get("extraction", {})
+    # Fail before anything is downloaded rather than when the run is staged
+    if extraction_config.get("staging_format") == "arrow" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError(f"{config_file or name or 'config'}: staging_format 'arrow' requires pyarrow. "
+                          "Install it with: pip install pyarrow")
+
+    memory_budget = extraction_config.get("memory_budget")
+    if memory_budget is not None:
+        from .memory import parse_size
+        memory_budget = parse_size(memory_budget)
+
+    sources = []
+    temp_folders = []
+    for kind in SOURCE_SCHEMAS:
+        for idx, entry in enumerate(extraction_config.get(kind, [])):
+            options = dict(entry)
+            options["load_s3"] = options.get("load_s3") or False
+            options["output_folder"] = options.get("output_folder") or DEFAULT_TEMP_FOLDER
+            sources.append(SourcePlan(kind, idx, f"{kind}_{idx}", MappingProxyType(options)))
+
+            if options["load_s3"] and options["output_folder"] not in temp_folders:
+                temp_folders.append(options["output_folder"])
+
+    mapping = []
+    mapping_sheets = []
+    for column, settings in config.get("mapping", {}).items():
+        options = dict(settings)
+        options["mapping_column_name"] = options.get("mapping_column_name") or column
+        options["mapping_path"] = options.get("mapping_path") or DEFAULT_MAPPING_PATH
+        mapping.append(MappingPlan(column, MappingProxyType(options)))
+
+        sheet = (options["mapping_path"], options["mapping_column_name"])
+        if sheet not in mapping_sheets:
+            mapping_sheets.append(sheet)
+
+    return PipelinePlan(
+        name=name,
+        config_file=config_file,
+        sources=tuple(sources),
+        mapping=tuple(mapping),
+        mapping_sheets=tuple(mapping_sheets),
+        staging_folder=extraction_config.get("output_excel_path") or "",
+        staging_format=extraction_config.get("staging_format") or "xlsx",
+        temp_folders=tuple(temp_folders),
+        concurrency=extraction_config.get("concurrency"),
+        memory_budget=memory_budget,
+        staging_workers=extraction_config.get("staging_workers") or 1,
+    )
+
+
+# Parsed and compiled configs, keyed by absolute path. Entries are reused while the file's mtime and size are unchanged.
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def _load_cached(config_file, name=None):
+    """Return (config, plan) for a config file, parsing and validating it only when the file changed."""
+    config_file = os.path.abspath(config_file)
+
+    try:
+        stat = os.stat(config_file)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Config file {config_file} not found.")
+
+    key = (stat.st_mtime_ns, stat.st_size)
+
+    with _config_cache_lock:
+        cached = _config_cache.get(config_file)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    with open(config_file, 'r') as file:
+        try:
+            config = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ConfigError(f"Invalid JSON in {config_file}: {e}")
+
+    if name is None:
+        name = os.path.splitext(os.path.basename(config_file))[0]
+    plan = compile_plan(config, name, config_file)
+
+    with _config_cache_lock:
+        _config_cache[config_file] = (key, config, plan)
+
+    return config, plan
+
+
+def clear_config_cache():
+    """Drop all cached configurations."""
+    with _config_cache_lock:
+        _config_cache.clear()
+
+
+def get_config_dir(config_dir=None):
+    """
+    Resolve the directory that holds the pipeline configuration files.
+
+    Parameters:
+    config_dir (str): Explicit directory. Defaults to $DWH_CONFIG_DIR, then 'dwh-etls/config'.
+
+    Returns:
+    str: The absolute path of the configuration directory.
+    """
+    return os.path.abspath(config_dir or os.environ.get('DWH_CONFIG_DIR') or DEFAULT_CONFIG_DIR)
+
+
+def read_config_file(config_file):
+    """
+    Reads and validates a JSON configuration file.
+
+    The parsed result is cached per process and reused until the file changes.
+    A fresh copy is returned on every call, so callers may modify it.
+
+    Parameters:
+    config_file (str): Path of the JSON file.
+
+    Raises:
+        FileNotFoundError: If the configuration file does not exist.
+        ConfigError: If the file is not valid JSON or does not match the schema.
+
+    Returns:
+        dict: The configuration data.
+    """
+    config, _ = _load_cached(config_file)
+    return copy.deepcopy(config)
+
+
+def load_plan(pipeline, config_dir=None):
+    """
+    Loads the compiled execution plan of a pipeline by name.
+
+    Parameters:
+    pipeline (str): The pipeline name, e.g. 'ahorro'.
+    config_dir (str): Directory holding the configuration files. See get_config_dir.
+
+    Raises:
+        FileNotFoundError: If the configuration file does not exist.
+        ConfigError: If the configuration is invalid.
+
+    Returns:
+        PipelinePlan: The compiled plan.
+    """
+    _, plan = _load_cached(os.path.join(get_config_dir(config_dir), f'{pipeline}.json'), pipeline)
+    return plan
+
+
+def load_pipeline_config(pipeline, config_dir=None):
+    """
+    Loads the configuration of a pipeline by name, e.g. 'ahorro' -> <config_dir>/ahorro.json.
+
+    Parameters:
+    pipeline (str): The pipeline name.
+    config_dir (str): Directory holding the configuration files. See get_config_dir.
+
+    Returns:
+        dict: The configuration data.
+    """
+    return read_config_file(os.path.join(get_config_dir(config_dir), f'{pipeline}.json'))
+
+
+def config_file_for_script(notebook_filename):
+    """
+    Locate the configuration file of a script or notebook: '<dir>/extraction/ahorro_e.py' -> '<dir>/config/ahorro.json'.
+
+    Parameters:
+    notebook_filename (str): Full path of the notebook or script filename.
+
+    Returns:
+    str: The configuration file path.
+    """
+    base_name = os.path.splitext(os.path.basename(notebook_filename))[0].split('_')[0]
+    base_path = os.path.abspath(os.path.join(os.path.dirname(notebook_filename), '..'))
+    return os.path.join(base_path, 'config', f'{base_name}.json')
+
+
+def load_config(notebook_filename):
+    """
+    Loads the configuration from a JSON file based on the script or notebook filename.
+
+    The function attempts to determine the base name from the filename,
+    constructs the path to the corresponding JSON configuration file located in the '../config' directory,
+    and reads the configuration into a dictionary.
+
+    Parameters:
+    - notebook_filename (str): Full path of the notebook or script filename.
+
+    Raises:
+        ConfigError: If the configuration does not match the schema.
+        RuntimeError: If the configuration file does not exist or cannot be read.
+
+    Returns:
+        dict: The configuration data.
+    """
+    try:
+        return read_config_file(config_file_for_script(notebook_filename))
+
+    except ConfigError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error loading config: {str(e)}")
@@ -0,0 +1,59 @@
+"""
+Process-wide connection pools.
+
+Pools are created on first use and shared by every pipeline that runs in the
+same process, so a warm runner does not reconnect for each table.
+"""
+import threading
+
+from ._optional import import_optional
+
+
+_mysql_pools = {}
+_mysql_pools_lock = threading.Lock()
+
+
+def get_mysql_connection(host, username, password, database, pool_size=5):
+    """
+    Get a connection from the shared MySQL pool for the given server and database.
+
+    Closing the returned connection hands it back to the pool.
+
+    Parameters:
+    - host (str): MySQL server host address.
+    - username (str): MySQL username.
+    - password (str): MySQL password.
+    - database (str): MySQL database name.
+    - pool_size (int): Number of connections kept open per pool. Only used when the pool is created.
+
+    Returns:
+    PooledMySQLConnection: An open connection.
+    """
+    key = (host, username, database)
+
+    with _mysql_pools_lock:
+        pool = _mysql_pools.get(key)
+        if pool is None:
+            pooling = import_optional('mysql.connector.pooling')
+            pool = pooling.MySQLConnectionPool(
+                pool_name=f"dwh_{len(_mysql_pools)}",
+                pool_size=pool_size,
+                host=host,
+                user=username,
+                password=password,
+                database=database
+            )
+            _mysql_pools[key] = pool
+
+    return pool.get_connection()
+
+
+def decode_text(value):
+    """A value read from MySQL as str: some mysql.connector versions return information_schema strings as bytes."""
+    return value.decode('utf-8') if isinstance(value, (bytes, bytearray)) else value
+
+
+def close_pools():
+    """Forget all pools. Connections still checked out are closed by their owners."""
+    with _mysql_pools_lock:
+        _mysql_pools.clear()
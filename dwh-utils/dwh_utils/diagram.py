@@ -0,0 +1,383 @@
+"""
+ER diagrams (draw.io / mxGraph XML) of a database schema.
+
+The schema comes straight from MySQL's information_schema, over the shared
+connection pool, or from a schema dump such as rest_of_scripts/table_schema.csv
+(columns TABLE_NAME, COLUMN_NAME, DATA_TYPE, CHARACTER_MAXIMUM_LENGTH, COLUMN_KEY):
+
+    from dwh_utils import diagram
+
+    columns, foreign_keys = diagram.read_schema_mysql(host, username, password, 'intranet')
+    diagram.write_er_diagram(columns, 'intranet.drawio', foreign_keys)
+
+Foreign keys that are not declared are inferred from column names. Tables
+linked by foreign keys are laid out in layers (referenced tables above the
+tables that reference them), and the groups of linked tables and the
+unlinked tables are packed into a roughly square page. Everything runs in
+near-linear time and the XML is written to the file as it is generated, so
+schemas with thousands of tables take seconds.
+"""
+import math
+from collections import defaultdict
+from xml.sax.saxutils import escape
+
+import pandas as pd
+
+from ._optional import import_optional
+from .connections import decode_text, get_mysql_connection
+
+
+SCHEMA_COLUMNS = ['TABLE_NAME', 'COLUMN_NAME', 'DATA_TYPE', 'CHARACTER_MAXIMUM_LENGTH', 'COLUMN_KEY']
+FOREIGN_KEY_COLUMNS = ['TABLE_NAME', 'COLUMN_NAME', 'REFERENCED_TABLE_NAME', 'REFERENCED_COLUMN_NAME']
+
+TABLE_WIDTH = 200
+ROW_HEIGHT = 20
+HEADER_HEIGHT = 40
+H_GAP = 60
+V_GAP = 80
+
+TABLE_STYLE = 'swimlane'
+COLUMN_STYLE = ('text;html=1;strokeColor=none;fillColor=none;align=left;verticalAlign=middle;whiteSpace=wrap;'
+                'rounded=0;overflow=hidden;rotatable=0;fontSize=12;spacingLeft=3;spacingRight=3;')
+EDGE_STYLE = 'edgeStyle=orthogonalEdgeStyle;rounded=0;html=1;endArrow=ERmandOne;startArrow=ERmany;'
+INFERRED_EDGE_STYLE = EDGE_STYLE + 'dashed=1;'
+
+
+def _fetch_frame(cursor, columns):
+    rows = [[decode_text(value) for value in row] for row in cursor.fetchall()]
+    return pd.DataFrame(rows, columns=columns)
+
+
+def read_schema_mysql(host, username, password, database):
+    """
+    Reads the columns and declared foreign keys of a MySQL database from information_schema.
+
+    Parameters:
+    host, username, password, database (str): Connection details, as for download_from_mysql.
+
+    Returns:
+    pd.DataFrame: The columns (SCHEMA_COLUMNS), in table and ordinal order.
+    pd.DataFrame: The declared foreign keys (FOREIGN_KEY_COLUMNS).
+    """
+    mysql = import_optional('mysql.connector')
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join(SCHEMA_COLUMNS)} FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = %s ORDER BY TABLE_NAME, ORDINAL_POSITION", (database,))
+            columns = _fetch_frame(cursor, SCHEMA_COLUMNS)
+
+            cursor.execute(
+                f"SELECT {', '.join(FOREIGN_KEY_COLUMNS)} FROM information_schema.KEY_COLUMN_USAGE "
+                "WHERE TABLE_SCHEMA = %s AND REFERENCED_TABLE_NAME IS NOT NULL", (database,))
+            foreign_keys = _fetch_frame(cursor, FOREIGN_KEY_COLUMNS)
+            cursor.close()
+        finally:
+            conn.close()
+
+    except mysql.Error as e:
+        print(f"Error reading the schema of {database}: {e}")
+        return None, None
+
+    print(f"Read {columns['TABLE_NAME'].nunique()} tables and {len(foreign_keys)} foreign keys from {database}")
+    return columns, foreign_keys
+
+
+def read_schema_csv(path):
+    """
+    Reads a schema dump with the SCHEMA_COLUMNS headers, e.g. the output of merge_excel.py.
+
+    Returns:
+    pd.DataFrame: The columns.
+    """
+    columns = pd.read_csv(path, dtype=str, keep_default_na=False)
+    for column in SCHEMA_COLUMNS:
+        if column not in columns.columns:
+            columns[column] = ''
+    return columns[SCHEMA_COLUMNS]
+
+
+def infer_foreign_keys(columns):
+    """
+    Infers foreign keys from column names.
+
+    A column references a table when it has the name of that table's single-column
+    primary key (e.g. id_ma_cantidad_apertura), or is named id_<table> or <table>_id.
+
+    Parameters:
+    columns (pd.DataFrame): The columns, as returned by read_schema_mysql or read_schema_csv.
+
+    Returns:
+    pd.DataFrame: The inferred foreign keys (FOREIGN_KEY_COLUMNS).
+    """
+    primary = columns[columns['COLUMN_KEY'] == 'PRI']
+    single_pk = primary[~primary['TABLE_NAME'].duplicated(keep=False)]
+
+    # Candidate referenced (table, column) per column name. Generic names shared by several
+    # primary keys (e.g. 'id') are ambiguous and skipped.
+    by_pk_name = single_pk[~single_pk['COLUMN_NAME'].duplicated(keep=False)][['COLUMN_NAME', 'TABLE_NAME']]
+    by_pattern = pd.concat([
+        pd.DataFrame({'COLUMN_NAME': 'id_' + single_pk['TABLE_NAME'], 'TABLE_NAME': single_pk['TABLE_NAME']}),
+        pd.DataFrame({'COLUMN_NAME': single_pk['TABLE_NAME'] + '_id', 'TABLE_NAME': single_pk['TABLE_NAME']}),
+    ])
+    targets = (pd.concat([by_pk_name, by_pattern])
+               .drop_duplicates('COLUMN_NAME')
+               .merge(single_pk[['TABLE_NAME', 'COLUMN_NAME']].rename(columns={'COLUMN_NAME': 'REFERENCED_COLUMN_NAME'}),
+                      on='TABLE_NAME')
+               .rename(columns={'TABLE_NAME': 'REFERENCED_TABLE_NAME'}))
+
+    matches = columns[['TABLE_NAME', 'COLUMN_NAME']].merge(targets, on='COLUMN_NAME')
+    matches = matches[matches['TABLE_NAME'] != matches['REFERENCED_TABLE_NAME']]
+    return matches[FOREIGN_KEY_COLUMNS].reset_index(drop=True)
+
+
+def _components(tables, edges):
+    """Connected components of the table graph, with a union-find."""
+    parent = {table: table for table in tables}
+
+    def find(table):
+        while parent[table] != table:
+            parent[table] = parent[parent[table]]
+            table = parent[table]
+        return table
+
+    for source, target in edges:
+        parent[find(source)] = find(target)
+
+    groups = defaultdict(list)
+    for table in tables:
+        groups[find(table)].append(table)
+    return list(groups.values())
+
+
+def _layers(nodes, references, referenced_by):
+    """
+    Layer of each table: 0 for tables that reference nothing, else one more than the deepest table it references.
+    Cycles are broken by placing a remaining table as soon as nothing else can be placed.
+    """
+    pending = {node: len(references[node]) for node in nodes}
+
+    layer = {}
+    ready = [node for node in nodes if pending[node] == 0]
+    remaining = iter(nodes)
+
+    while len(layer) < len(nodes):
+        if not ready:
+            # Cycle: take the next unplaced table, in name order
+            node = next(node for node in remaining if node not in layer)
+            ready.append(node)
+
+        node = ready.pop()
+        if node in layer:
+            continue
+        layer[node] = 1 + max((layer[target] for target in references[node] if target in layer), default=-1)
+        for source in referenced_by[node]:
+            pending[source] -= 1
+            if pending[source] == 0 and source not in layer:
+                ready.append(source)
+
+    return layer
+
+
+def _order_layers(layer, references, referenced_by):
+    """Group tables by layer and order each layer by the barycenter of its neighbours (one down and one up sweep)."""
+    rows = defaultdict(list)
+    for node in sorted(layer):
+        rows[layer[node]].append(node)
+    rows = [rows[idx] for idx in sorted(rows)]
+
+    position = {node: idx for row in rows for idx, node in enumerate(row)}
+    for sweep in (range(1, len(rows)), range(len(rows) - 2, -1, -1)):
+        neighbours = references if sweep.step == 1 else referenced_by
+        for idx in sweep:
+            def barycenter(node):
+                placed = [position[other] for other in neighbours[node] if other in position]
+                return sum(placed) / len(placed) if placed else position[node]
+            rows[idx].sort(key=barycenter)
+            position.update({node: pos for pos, node in enumerate(rows[idx])})
+    return rows
+
+
+def _pack(boxes):
+    """
+    Shelf-pack (width, height) boxes, tallest first, into a page of roughly square proportions.
+
+    Returns:
+    list: (x, y) of each box, in input order.
+    """
+    if not boxes:
+        return []
+    total_area = sum((width + H_GAP) * (height + V_GAP) for width, height in boxes)
+    page_width = max(max(width for width, _ in boxes), math.sqrt(total_area) * 1.5)
+
+    origins = [None] * len(boxes)
+    x = y = shelf_height = 0
+    for idx in sorted(range(len(boxes)), key=lambda idx: -boxes[idx][1]):
+        width, height = boxes[idx]
+        if x and x + width > page_width:
+            x, y = 0, y + shelf_height + V_GAP
+            shelf_height = 0
+        origins[idx] = (x, y)
+        x += width + H_GAP
+        shelf_height = max(shelf_height, height)
+    return origins
+
+
+def layout_tables(heights, foreign_keys):
+    """
+    Computes the position of every table.
+
+    Parameters:
+    heights (dict): Table name -> height in pixels.
+    foreign_keys (pd.DataFrame): FOREIGN_KEY_COLUMNS edges between the tables.
+
+    Returns:
+    dict: Table name -> (x, y) of its top-left corner.
+    """
+    tables = sorted(heights)
+    references = defaultdict(set)
+    referenced_by = defaultdict(set)
+    edges = []
+    for source, target in zip(foreign_keys['TABLE_NAME'], foreign_keys['REFERENCED_TABLE_NAME']):
+        if source != target and source in heights and target in heights:
+            references[source].add(target)
+            referenced_by[target].add(source)
+            edges.append((source, target))
+
+    # Lay out each group of linked tables in layers, relative to its own origin
+    groups = []
+    for nodes in _components(tables, edges):
+        nodes.sort()
+        rows = _order_layers(_layers(nodes, references, referenced_by), references, referenced_by)
+
+        local = {}
+        row_widths = [len(row) * (TABLE_WIDTH + H_GAP) - H_GAP for row in rows]
+        group_width = max(row_widths)
+        y = 0
+        for row, row_width in zip(rows, row_widths):
+            x = (group_width - row_width) // 2
+            for node in row:
+                local[node] = (x, y)
+                x += TABLE_WIDTH + H_GAP
+            y += max(heights[node] for node in row) + V_GAP
+        groups.append((local, (group_width, y - V_GAP)))
+
+    positions = {}
+    origins = _pack([size for _, size in groups])
+    for (local, _), (origin_x, origin_y) in zip(groups, origins):
+        for node, (x, y) in local.items():
+            positions[node] = (origin_x + x + 20, origin_y + y + 20)
+    return positions
+
+
+def _column_labels(columns):
+    """Label of every column, e.g. 'Key : id_familia : int' or ' : nombre : varchar (50)', computed vectorized."""
+    # Lengths come back as floats when some are NULL (and as '50.0' from some dumps)
+    length = pd.to_numeric(columns['CHARACTER_MAXIMUM_LENGTH'], errors='coerce').astype('Int64')
+    length = (' (' + length.astype(str) + ')').where(length.notna(), '')
+    prefix = columns['COLUMN_KEY'].eq('PRI').map({True: 'Key', False: ''})
+    return prefix + ' : ' + columns['COLUMN_NAME'].astype(str) + ' : ' + columns['DATA_TYPE'].astype(str) + length
+
+
+def _attr(value):
+    return escape(str(value), {'"': '&quot;', '\n': '&#10;'})
+
+
+def _cell(cell_id, parent, geometry, value, style, vertex=True, source=None, target=None):
+    # Ids are generated and styles are constants, so only the value needs escaping
+    kind = 'vertex="1"' if vertex else f'edge="1" source="{source}" target="{target}"'
+    return f'<mxCell id="{cell_id}" value="{_attr(value)}" style="{style}" {kind} parent="{parent}">{geometry}</mxCell>\n'
+
+
+def iter_mxgraph(columns, foreign_keys=None, infer=True):
+    """
+    Generates the draw.io document piece by piece.
+
+    Parameters:
+    columns (pd.DataFrame): The columns, as returned by read_schema_mysql or read_schema_csv.
+    foreign_keys (pd.DataFrame): Declared foreign keys. Drawn as solid edges.
+    infer (bool): Whether to add foreign keys inferred from column names, drawn dashed. Default is True.
+
+    Returns:
+    generator: Chunks of XML text.
+    """
+    declared = foreign_keys if foreign_keys is not None else pd.DataFrame(columns=FOREIGN_KEY_COLUMNS)
+    declared = declared.assign(inferred=False)
+    # Two tables can be linked by several foreign keys; an inferred key is dropped only if it was declared
+    edge_key = ['TABLE_NAME', 'COLUMN_NAME', 'REFERENCED_TABLE_NAME']
+    if infer:
+        inferred = infer_foreign_keys(columns).assign(inferred=True)
+        edges = pd.concat([declared, inferred]).drop_duplicates(edge_key)
+    else:
+        edges = declared.drop_duplicates(edge_key)
+
+    columns = columns.sort_values('TABLE_NAME', kind='stable')
+    tables = columns['TABLE_NAME'].tolist()
+    labels = _column_labels(columns).tolist()
+    counts = columns['TABLE_NAME'].value_counts(sort=False)
+    heights = {table: HEADER_HEIGHT + int(count) * ROW_HEIGHT for table, count in counts.items()}
+    positions = layout_tables(heights, edges)
+    table_ids = {table: f"t{idx}" for idx, table in enumerate(sorted(heights))}
+
+    yield ('<mxfile host="app.diagrams.net"><diagram name="ER Diagram"><mxGraphModel dx="1170" dy="825" grid="1" '
+           'gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" fold="1" page="1" pageScale="1" '
+           'pageWidth="827" pageHeight="1169" math="0" shadow="0"><root>\n'
+           '<mxCell id="0" />\n<mxCell id="1" parent="0" />\n')
+
+    # Rows are sorted by table, so each table is a contiguous run of rows
+    start = 0
+    while start < len(tables):
+        table = tables[start]
+        end = start + int(counts[table])
+        table_id = table_ids[table]
+        x, y = positions[table]
+        geometry = f'<mxGeometry x="{x}" y="{y}" width="{TABLE_WIDTH}" height="{heights[table]}" as="geometry" />'
+        parts = [_cell(table_id, '1', geometry, table, TABLE_STYLE)]
+
+        for idx, label in enumerate(labels[start:end]):
+            geometry = (f'<mxGeometry x="20" y="{20 + idx * ROW_HEIGHT}" width="{TABLE_WIDTH - 40}" '
+                        f'height="{ROW_HEIGHT}" as="geometry" />')
+            parts.append(_cell(f"{table_id}c{idx}", table_id, geometry, label, COLUMN_STYLE))
+        yield "".join(parts)
+        start = end
+
+    for idx, edge in enumerate(edges.itertuples(index=False)):
+        if edge.TABLE_NAME not in table_ids or edge.REFERENCED_TABLE_NAME not in table_ids:
+            continue
+        style = INFERRED_EDGE_STYLE if edge.inferred else EDGE_STYLE
+        yield _cell(f"e{idx}", '1', '<mxGeometry relative="1" as="geometry" />', edge.COLUMN_NAME, style,
+                    vertex=False, source=table_ids[edge.TABLE_NAME], target=table_ids[edge.REFERENCED_TABLE_NAME])
+
+    yield '</root></mxGraphModel></diagram></mxfile>\n'
+
+
+def write_er_diagram(columns, path, foreign_keys=None, infer=True):
+    """
+    Writes a draw.io ER diagram of a schema, streaming the XML to the file.
+
+    Parameters:
+    columns (pd.DataFrame): The columns, as returned by read_schema_mysql or read_schema_csv.
+    path (str): The output file, e.g. 'diagram.xml' or 'schema.drawio'.
+    foreign_keys (pd.DataFrame): Declared foreign keys, e.g. from read_schema_mysql.
+    infer (bool): Whether to add foreign keys inferred from column names. Default is True.
+
+    Raises:
+    ValueError: If columns is None, e.g. because read_schema_mysql failed.
+
+    Returns:
+    str: The path of the written file.
+    """
+    if columns is None:
+        raise ValueError("No schema to draw: columns is None, as read_schema_mysql returns when it cannot read the schema")
+    if columns.empty:
+        print(f"The schema has no tables, {path} will be an empty diagram")
+
+    with open(path, 'w', encoding='utf-8') as file:
+        for chunk in iter_mxgraph(columns, foreign_keys, infer):
+            file.write(chunk)
+
+    print(f"ER diagram of {columns['TABLE_NAME'].nunique()} tables written to {path}")
+    return path
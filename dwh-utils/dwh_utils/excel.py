@@ -0,0 +1,551 @@
+"""
+Fast Excel reading, and streaming Excel export for deliverables that must be .xlsx.
+
+Workbooks are read with the Rust calamine parser when python-calamine is
+installed (see read_sheets and excel_engine), several sheets in one pass and
+optionally in parallel processes.
+
+Workbooks are written straight as SpreadsheetML: the XML of each sheet is
+rendered column by column with vectorized string operations, a few thousand
+rows at a time, and streamed into the zip file. No cell objects are kept, so
+memory stays flat whatever the size of the data, and there is no per-cell
+Python call as with the openpyxl or xlsxwriter engines of DataFrame.to_excel.
+
+Sheets longer than the Excel row limit continue on sheets named
+'<sheet> (2)', '<sheet> (3)', ..., which group_sheets (and staging.load_staged)
+put back together. Sheets can be rendered in parallel worker processes, and
+independent workbooks written in parallel too. Processes are only used when
+asked for with workers > 1; under the spawn start method (Windows, macOS) the
+calling script must then guard its entry point with `if __name__ == '__main__':`.
+
+    from dwh_utils.excel import write_excel, write_excel_files
+
+    write_excel({'ahorro': df, 'profile': profile}, 'deliverables/ahorro.xlsx', workers=2)
+    write_excel_files({'ine.xlsx': {'ine': ine_df}, 'ahorro.xlsx': {'ahorro': df}}, workers=2)
+"""
+import contextlib
+import os
+import re
+import shutil
+import importlib.util
+import zipfile
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+import pandas as pd
+
+
+EXCEL_MAX_ROWS = 1_048_576
+MAX_SHEET_NAME_LENGTH = 31
+MAX_CELL_LENGTH = 32_767
+# Rows rendered at a time, which bounds the memory on top of the data itself
+RENDER_CHUNK_ROWS = 20_000
+# Deflate level of the sheets. XML compresses well even at level 1, and higher levels cost far more time
+COMPRESS_LEVEL = 1
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Cell styles (indexes into cellXfs of the styles part): 1 for datetimes, 2 for dates
+_DATETIME_STYLE, _DATE_STYLE = 1, 2
+_EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+# Largest integer a double holds exactly
+_MAX_EXACT_INTEGER = 2 ** 53
+
+_CONTINUATION = re.compile(r'^(.*) \((\d+)\)$')
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+_INVALID_XML_CHARS = r'[\x00-\x08\x0b\x0c\x0e-\x1f]'
+
+_MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_PACKAGE_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_SHEET_HEADER = f'{_XML_DECLARATION}<worksheet xmlns="{_MAIN_NS}"><sheetData>'
+_SHEET_FOOTER = '</sheetData></worksheet>'
+_STYLES = (
+    f'{_XML_DECLARATION}<styleSheet xmlns="{_MAIN_NS}">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/>'
+    '<numFmt numFmtId="165" formatCode="yyyy-mm-dd"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_WORKSHEET_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+
+@lru_cache(maxsize=None)
+def excel_engine():
+    """
+    The pandas engine to read .xlsx files with.
+
+    Returns:
+    str: 'calamine' if python-calamine is installed (several times faster than openpyxl), else None
+         for pandas' default.
+    """
+    return 'calamine' if importlib.util.find_spec('python_calamine') is not None else None
+
+
+def _read_sheet_group(path, sheet_names, read_options):
+    # Module-level so it can run in a process pool
+    return pd.read_excel(path, sheet_name=list(sheet_names), engine=excel_engine(), **read_options)
+
+
+def read_sheets(path, sheets=None, workers=1, **read_options):
+    """
+    Reads several sheets of a workbook in one pass.
+
+    Parameters:
+    path (str): The workbook.
+    sheets (list or str): Sheets to read. None reads all of them, an empty list none.
+    workers (int): Processes parsing sheets at the same time, each taking a share of the sheets.
+                   Worth it for several large sheets. Default is 1 (no processes).
+    **read_options: Passed on to pd.read_excel, e.g. header=1 or usecols.
+
+    Returns:
+    dict: Sheet name -> DataFrame, in the order requested (workbook order for all sheets).
+    """
+    if isinstance(sheets, str):
+        sheets = [sheets]
+    if sheets is None:
+        sheets = pd.ExcelFile(path, engine=excel_engine()).sheet_names
+    if not sheets:
+        return {}
+
+    workers = min(workers, len(sheets))
+    if workers <= 1:
+        return _read_sheet_group(path, sheets, read_options)
+
+    # Round-robin, so large consecutive sheets land on different workers
+    groups = [sheets[idx::workers] for idx in range(workers)]
+    frames = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(_read_sheet_group, [path] * workers, groups, [read_options] * workers):
+            frames.update(result)
+    return {name: frames[name] for name in sheets}
+
+
+def continuation_sheet_name(sheet_name, part):
+    """Name of the part-th sheet (from 2) of a split sheet, shortened to fit Excel's 31 characters."""
+    suffix = f" ({part})"
+    return sheet_name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+
+def _next_part(sheet_name, part, taken):
+    """
+    Number of the continuation sheet that follows part `part` of a split sheet.
+
+    Numbers whose name an earlier sheet already holds are skipped (`taken` holds casefolded names),
+    so the writer and group_sheets agree on the names of the continuation sheets.
+    """
+    part += 1
+    while continuation_sheet_name(sheet_name, part).casefold() in taken:
+        part += 1
+    return part
+
+
+def _clean_sheet_name(sheet_name):
+    """Sheet name without the characters Excel rejects, shortened to 31 characters."""
+    return _INVALID_SHEET_CHARS.sub('_', str(sheet_name))[:MAX_SHEET_NAME_LENGTH] or 'Sheet1'
+
+
+def _unique_sheet_name(sheet_name, taken):
+    """
+    Make a cleaned sheet name unique in a workbook, adding '_2', '_3', ... and shortening again if needed.
+
+    Excel compares sheet names case-insensitively, so `taken` holds casefolded names. The suffix is not
+    ' (2)' so the sheet is not mistaken for a continuation sheet by group_sheets.
+    """
+    name, idx = sheet_name, 1
+    while name.casefold() in taken:
+        idx += 1
+        suffix = f"_{idx}"
+        name = sheet_name[:MAX_SHEET_NAME_LENGTH - len(suffix)] + suffix
+    return name
+
+
+def group_sheets(sheet_names):
+    """
+    Group the continuation sheets of split sheets with their first sheet.
+
+    A sheet is a continuation if it is named as the next part of an earlier sheet, see write_excel.
+
+    Parameters:
+    sheet_names (list): Sheet names of a workbook, in order.
+
+    Returns:
+    dict: First sheet name -> list of its sheet names, in order.
+    """
+    groups = {}
+    # First sheet name -> number of its last part
+    parts = {}
+    seen = set()
+    for name in sheet_names:
+        first = None
+        if _CONTINUATION.match(name):
+            # Only a continuation if it follows its first sheet, so a sheet really called 'Total (2)' stays on its own
+            first = next((first for first, part in parts.items()
+                          if continuation_sheet_name(first, _next_part(first, part, seen)) == name), None)
+        if first is None:
+            groups[name] = [name]
+            parts[name] = 1
+        else:
+            groups[first].append(name)
+            parts[first] = _next_part(first, parts[first], seen)
+        seen.add(name.casefold())
+    return groups
+
+
+def _escape(values):
+    """XML-escape an array of strings, dropping the control characters XML cannot hold."""
+    text = pd.Series(values, dtype=object).str.slice(0, MAX_CELL_LENGTH)
+    text = text.str.replace('&', '&amp;', regex=False).str.replace('<', '&lt;', regex=False)
+    text = text.str.replace('>', '&gt;', regex=False).str.replace(_INVALID_XML_CHARS, '', regex=True)
+    return text.to_numpy(dtype=object)
+
+
+def _string_cells(values):
+    # Text columns repeat a lot, so each distinct value is escaped once; missing values get empty cells
+    codes, uniques = pd.factorize(values)
+    cells = '<c t="inlineStr"><is><t xml:space="preserve">' + _escape(uniques) + '</t></is></c>'
+    return np.append(cells, '<c/>').astype(object)[codes]
+
+
+def _bool_cells(flags):
+    return np.where(flags, '<c t="b"><v>1</v></c>', '<c t="b"><v>0</v></c>').astype(object)
+
+
+def _number_cells(numbers, style=None):
+    """Cells of a float array. Infinities, which Excel has no value for, are written as #NUM!."""
+    text = numbers.astype(str).astype(object)
+    if style is None:
+        cells = '<c><v>' + text + '</v></c>'
+    else:
+        cells = f'<c s="{style}"><v>' + text + '</v></c>'
+    return np.where(np.isinf(numbers), '<c t="e"><v>#NUM!</v></c>', cells)
+
+
+def _integer_cells(integers):
+    """
+    Cells of an array of integers (int64, uint64 or Python ints). Excel holds numbers as doubles, so
+    integers beyond 2**53 are written as text instead of being rounded.
+    """
+    text = integers.astype(str).astype(object)
+    cells = '<c><v>' + text + '</v></c>'
+    inexact = ((integers > _MAX_EXACT_INTEGER) | (integers < -_MAX_EXACT_INTEGER)).astype(bool)
+    if inexact.any():
+        cells[inexact] = _string_cells(text[inexact])
+    return cells
+
+
+def _datetime_cells(series):
+    """Cells of a datetime column, as Excel serial days with a date or datetime format."""
+    series = pd.to_datetime(series)
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    days = ((series - _EXCEL_EPOCH) / pd.Timedelta(days=1)).to_numpy(dtype='float64', na_value=np.nan)
+    style = _DATE_STYLE if np.all(np.isnan(days) | (days == np.floor(days))) else _DATETIME_STYLE
+    return _number_cells(days, style)
+
+
+def _column_cells(series):
+    """
+    XML of the cells of a column, one string per row ('<c/>' for missing values).
+
+    The cell type is chosen once per column from its dtype (or, for object columns, the
+    inferred type of its values), so cells are never inspected one at a time.
+    """
+    missing = series.isna().to_numpy()
+
+    if pd.api.types.is_bool_dtype(series):
+        cells = _bool_cells(series.to_numpy(dtype=bool, na_value=False))
+    elif pd.api.types.is_integer_dtype(series):
+        # Nullable Int64 columns would come out as float64 without an explicit dtype
+        cells = _integer_cells(series.to_numpy(dtype=getattr(series.dtype, 'numpy_dtype', series.dtype), na_value=0))
+    elif pd.api.types.is_numeric_dtype(series):
+        cells = _number_cells(series.to_numpy(dtype='float64', na_value=np.nan))
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        cells = _datetime_cells(series)
+    else:
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in ('string', 'empty'):
+            cells = _string_cells(series.to_numpy(dtype=object))
+        elif kind == 'integer':
+            # Python ints may exceed int64, so they are kept as objects rather than going through float
+            cells = _integer_cells(series.where(~missing, 0).to_numpy(dtype=object))
+        elif kind in ('floating', 'mixed-integer-float', 'decimal'):
+            cells = _number_cells(pd.to_numeric(series).to_numpy(dtype='float64', na_value=np.nan))
+        elif kind in ('datetime', 'datetime64', 'date'):
+            cells = _datetime_cells(series)
+        elif kind == 'boolean':
+            cells = _bool_cells(series.to_numpy(dtype=object) == True)
+        else:
+            # Mixed values are written as their text
+            cells = _string_cells(series.astype(str).to_numpy(dtype=object))
+
+    cells[missing] = '<c/>'
+    return cells
+
+
+def _render_rows(chunk, first_row):
+    """XML of a chunk of rows, numbered from first_row (1-based)."""
+    rows = '<row r="' + np.arange(first_row, first_row + len(chunk)).astype(str).astype(object) + '">'
+    for column in chunk.columns:
+        rows = rows + _column_cells(chunk[column])
+    return ''.join(rows + '</row>')
+
+
+class _SheetRenderer:
+    """
+    Renders DataFrame chunks as sheet XML, moving on to a continuation sheet at the row limit.
+
+    open_part(sheet_name, part) is called for every sheet, with part 1 for the first one, and returns a
+    binary stream to write its XML to.
+    """
+
+    def __init__(self, sheet_name, max_rows, open_part):
+        self.sheet_name = sheet_name
+        self.max_rows = max_rows
+        self.open_part = open_part
+        self.parts = 0
+        self.stream = None
+        self.row = 0
+        self.header = None
+
+    def _new_sheet(self):
+        self._close_sheet()
+        self.parts += 1
+        self.stream = self.open_part(self.sheet_name, self.parts)
+        self.stream.write((_SHEET_HEADER + self.header).encode('utf-8'))
+        self.row = 1
+
+    def _close_sheet(self):
+        if self.stream is not None:
+            self.stream.write(_SHEET_FOOTER.encode('utf-8'))
+            self.stream.close()
+            self.stream = None
+
+    def write(self, chunk):
+        if self.header is None:
+            header = np.array([str(column) for column in chunk.columns], dtype=object)
+            self.header = '<row r="1">' + ''.join(_string_cells(header)) + '</row>'
+            self._new_sheet()
+
+        start = 0
+        while start < len(chunk):
+            if self.row >= self.max_rows:
+                self._new_sheet()
+            part = chunk.iloc[start:start + min(self.max_rows - self.row, RENDER_CHUNK_ROWS)]
+            self.stream.write(_render_rows(part, self.row + 1).encode('utf-8'))
+            self.row += len(part)
+            start += len(part)
+
+    def close(self):
+        if self.header is None:
+            # No data at all: still write the sheet, empty
+            self.header = ''
+            self._new_sheet()
+        self._close_sheet()
+
+
+def _render_sheet(sheet_name, data, max_rows, open_part):
+    renderer = _SheetRenderer(sheet_name, max_rows, open_part)
+    try:
+        for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+            renderer.write(chunk)
+    finally:
+        renderer.close()
+
+
+def _render_sheet_to_files(sheet_name, df, max_rows, folder):
+    """Render a sheet to XML files in folder. Module-level so it can run in a process pool."""
+    files = []
+
+    def open_part(sheet_name, part):
+        path = os.path.join(folder, f"{len(files)}.xml")
+        files.append((part, path))
+        return open(path, 'wb')
+
+    os.makedirs(folder, exist_ok=True)
+    _render_sheet(sheet_name, df, max_rows, open_part)
+    return files
+
+
+class _Package:
+    """
+    The zip file of a workbook, written one sheet at a time.
+
+    Sheets are named as they are added, in workbook order: first sheets get a unique name, and the
+    continuation sheets of a split sheet the next free part names, as group_sheets reads them back.
+    """
+
+    def __init__(self, path):
+        self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL)
+        self.sheet_names = []
+        self.taken = set()
+        # First sheet name -> number of its last part
+        self.parts = {}
+        self.first = None
+
+    def _first_sheet_name(self, sheet_name):
+        # Nor a name group_sheets would read as the next part of an earlier sheet
+        blocked = self.taken | {continuation_sheet_name(first, _next_part(first, part, self.taken)).casefold()
+                                for first, part in self.parts.items()}
+        name = _unique_sheet_name(_clean_sheet_name(sheet_name), blocked)
+        self.parts[name] = 1
+        self.first = name
+        return name
+
+    def open_part(self, sheet_name, part):
+        if part == 1:
+            name = self._first_sheet_name(sheet_name)
+        else:
+            self.parts[self.first] = _next_part(self.first, self.parts[self.first], self.taken)
+            name = continuation_sheet_name(self.first, self.parts[self.first])
+        self.taken.add(name.casefold())
+        self.sheet_names.append(name)
+        return self.zip.open(f"xl/worksheets/sheet{len(self.sheet_names)}.xml", 'w', force_zip64=True)
+
+    def add_rendered(self, sheet_name, files):
+        for part, path in files:
+            with open(path, 'rb') as source, self.open_part(sheet_name, part) as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            os.remove(path)
+
+    def close(self):
+        if not self.sheet_names:
+            # Excel refuses to open a workbook without a sheet
+            raise ValueError("No sheets to write: a workbook needs at least one")
+        ids = range(1, len(self.sheet_names) + 1)
+        sheets = ''.join(f'<sheet name={quoteattr(name)} sheetId="{idx}" r:id="rId{idx}"/>'
+                         for idx, name in zip(ids, self.sheet_names))
+        self.zip.writestr('xl/workbook.xml', (
+            f'{_XML_DECLARATION}<workbook xmlns="{_MAIN_NS}" xmlns:r="{_REL_NS}">'
+            f'<sheets>{sheets}</sheets></workbook>'))
+
+        relationships = ''.join(f'<Relationship Id="rId{idx}" Type="{_REL_NS}/worksheet" '
+                                f'Target="worksheets/sheet{idx}.xml"/>' for idx in ids)
+        self.zip.writestr('xl/_rels/workbook.xml.rels', (
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_REL_NS}">{relationships}'
+            f'<Relationship Id="rId{len(ids) + 1}" Type="{_REL_NS}/styles" Target="styles.xml"/></Relationships>'))
+        self.zip.writestr('xl/styles.xml', _STYLES)
+        self.zip.writestr('_rels/.rels', (
+            f'{_XML_DECLARATION}<Relationships xmlns="{_PACKAGE_REL_NS}">'
+            f'<Relationship Id="rId1" Type="{_REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'))
+
+        overrides = ''.join(f'<Override PartName="/xl/worksheets/sheet{idx}.xml" ContentType="{_WORKSHEET_TYPE}"/>'
+                            for idx in ids)
+        self.zip.writestr('[Content_Types].xml', (
+            f'{_XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'))
+        self.zip.close()
+
+
+def _write_sheets_parallel(package, items, max_rows, workers, folder):
+    # Like merge._ordered_results: a bounded window of sheets in flight, added to the zip in order
+    with tempfile.TemporaryDirectory(dir=folder, prefix='.xlsx_') as tmp_dir, \
+            ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for idx, (sheet_name, data) in enumerate(items):
+            if isinstance(data, pd.DataFrame):
+                future = executor.submit(_render_sheet_to_files, sheet_name, data, max_rows, os.path.join(tmp_dir, str(idx)))
+                pending.append((sheet_name, future))
+            else:
+                # Chunk iterables cannot be sent to a process; render them here, in order
+                while pending:
+                    package.add_rendered(*_rendered(pending.popleft()))
+                _render_sheet(sheet_name, data, max_rows, package.open_part)
+            if len(pending) >= workers:
+                package.add_rendered(*_rendered(pending.popleft()))
+        while pending:
+            package.add_rendered(*_rendered(pending.popleft()))
+
+
+def _rendered(entry):
+    # A (sheet name, future) entry of the window, as add_rendered takes it
+    sheet_name, future = entry
+    return sheet_name, future.result()
+
+
+def write_excel(sheets, path, max_rows=EXCEL_MAX_ROWS, workers=1):
+    """
+    Writes DataFrames to an .xlsx workbook in constant memory.
+
+    Parameters:
+    sheets (dict or iterable): Sheet name -> DataFrame, or an iterable of (sheet name, data) pairs so
+                               frames can be produced one at a time. The data of a sheet may also be an
+                               iterable of DataFrame chunks, e.g. LazyTable.iter_chunks().
+    path (str): The workbook to write. It is replaced only once complete.
+    max_rows (int): Rows per sheet, header included, before continuing on a new sheet. Default is Excel's limit.
+                    Continuation sheets are named '<sheet> (2)', '<sheet> (3)', ..., skipping names already
+                    used by earlier sheets, and group_sheets joins them back.
+    workers (int): Processes rendering DataFrame sheets at the same time. At most `workers` frames are
+                   taken from `sheets` ahead of the one being written. Default is 1 (no processes).
+
+    Raises:
+    ValueError: If there are no sheets: Excel cannot open a workbook without one.
+
+    Returns:
+    str: The path of the workbook.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    tmp_path = path + '.tmp'
+
+    items = sheets.items() if isinstance(sheets, dict) else sheets
+    package = _Package(tmp_path)
+    try:
+        if workers <= 1:
+            for sheet_name, data in items:
+                _render_sheet(sheet_name, data, max_rows, package.open_part)
+        else:
+            _write_sheets_parallel(package, items, max_rows, workers, folder)
+        package.close()
+    except BaseException:
+        # Never let the cleanup mask the error being raised, e.g. a sheet part still open for writing
+        with contextlib.suppress(Exception):
+            package.zip.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def _write_excel_job(path, sheets, max_rows):
+    # Module-level so it can run in a process pool
+    return write_excel(sheets, path, max_rows)
+
+
+def write_excel_files(workbooks, workers=1, max_rows=EXCEL_MAX_ROWS):
+    """
+    Writes several workbooks at the same time, one per worker process.
+
+    Parameters:
+    workbooks (dict): Workbook path -> {sheet name: DataFrame}.
+    workers (int): Worker processes, e.g. DEFAULT_WORKERS. Default is 1 (one workbook after the other).
+    max_rows (int): See write_excel.
+
+    Returns:
+    list: The paths of the written workbooks.
+    """
+    if workers <= 1 or len(workbooks) <= 1:
+        return [write_excel(sheets, path, max_rows) for path, sheets in workbooks.items()]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(workbooks))) as executor:
+        futures = [executor.submit(_write_excel_job, path, sheets, max_rows) for path, sheets in workbooks.items()]
+        return [future.result() for future in futures]
@@ -0,0 +1,520 @@
+import io
+import json
+
+import pandas as pd
+
+from ._optional import import_optional
+from .config import DEFAULT_TEMP_FOLDER, SOURCE_SCHEMAS, compile_plan
+from .excel import read_sheets
+from .connections import get_mysql_connection
+from .probes import ProbeStore, probe_mysql_table
+from .memory import SpillStore
+from .http_client import DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, http_get
+from .staging import RunCheckpoint, script_base_name, stage_temp_file, staged_reader, write_staging_arrow, write_staging_workbook
+from .transform import enforce_dtypes, infer_dtypes
+
+
+def download_and_parse_csv(url, column_delimiter=None, load_s3=False, output_folder=DEFAULT_TEMP_FOLDER, script_filename=None, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, rate_limit=None):
+    """
+    Downloads a CSV file from a given URL, parses it into a Pandas DataFrame, and optionally uploads it as a CSV to a specified folder.
+
+    Parameters:
+    url (str): The URL of the CSV file.
+    column_delimiter (str): The delimiter for columns in the CSV file.
+    load_s3 (bool): Whether to save the DataFrame as a CSV file in the specified folder.
+    output_folder (str): The folder to save the CSV file if load_s3 is True.
+    script_filename (str): The full path of the script file for naming the output file.
+    timeout (float or tuple): Request timeout in seconds, or a (connect, read) pair.
+    max_retries (int): Retries on connection errors, timeouts and retryable HTTP statuses.
+    rate_limit (float): Maximum requests per second to the URL's host.
+
+    Returns:
+    pd.DataFrame: The CSV content as a Pandas DataFrame.
+    """
+    requests = import_optional('requests')
+
+    try:
+        # Download the CSV file
+        response = http_get(url, timeout=timeout, max_retries=max_retries, rate_limit=rate_limit)
+
+        print(f"CSV file successfully downloaded from {url}")
+
+        df = parse_csv_bytes(response.content, column_delimiter)
+
+        print("CSV file successfully loaded into DataFrame")
+
+        if load_s3:
+            stage_temp_file(df, output_folder, script_filename)
+
+        return df
+
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to download the file: {e}")
+        return None
+
+def flatten_json(json_data):
+    """
+    Flatten a JSON object by recursively extracting nested dictionaries into a flat dictionary.
+
+    Parameters:
+    json_data (dict): The JSON data to be flattened.
+
+    Returns:
+    dict: The flattened dictionary.
+    """
+    flattened = {}
+
+    def flatten_helper(item, prefix=''):
+        if isinstance(item, dict):
+            for key, value in item.items():
+                new_key = f"{prefix}_{key}" if prefix else key
+                flatten_helper(value, new_key)
+        else:
+            flattened[prefix] = item
+
+    flatten_helper(json_data)
+    return flattened
+
+def parse_csv_bytes(content, column_delimiter=None):
+    """Parse a downloaded CSV body into a DataFrame, straight from memory."""
+    return pd.read_csv(io.BytesIO(content), delimiter=column_delimiter)
+
+
+def parse_json_bytes(content):
+    """Parse a downloaded JSON array body into a DataFrame, flattening nested objects."""
+    data = json.loads(content)
+
+    # Flatten each item in the JSON array
+    return pd.DataFrame([flatten_json(item) for item in data])
+
+
+def download_and_parse_json(url, load_s3=False, output_folder=DEFAULT_TEMP_FOLDER, script_filename=None, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, rate_limit=None):
+    """
+    Downloads a JSON file from a given URL, parses it into a Pandas DataFrame, and optionally uploads it as a CSV to a specified folder.
+
+    Parameters:
+    url (str): The URL of the JSON file.
+    load_s3 (bool): Whether to save the DataFrame as a CSV file in the specified folder.
+    output_folder (str): The folder to save the CSV file if load_s3 is True.
+    script_filename (str): The full path of the script file for naming the output file.
+    timeout (float or tuple): Request timeout in seconds, or a (connect, read) pair.
+    max_retries (int): Retries on connection errors, timeouts and retryable HTTP statuses.
+    rate_limit (float): Maximum requests per second to the URL's host.
+
+    Returns:
+    pd.DataFrame or None: The JSON content as a Pandas DataFrame, or None if failed to download or parse.
+    """
+    requests = import_optional('requests')
+
+    try:
+        response = http_get(url, timeout=timeout, max_retries=max_retries, rate_limit=rate_limit)
+
+        df = parse_json_bytes(response.content)
+
+        print(f"JSON file successfully downloaded and parsed")
+
+        if load_s3:
+            stage_temp_file(df, output_folder, script_filename)
+
+        return df
+
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Failed to download or parse the JSON file: {e}")
+        return None
+
+
+def download_from_mysql(host, username, password, database, table, load_s3=False, output_folder=DEFAULT_TEMP_FOLDER, script_filename=None):
+    """
+    Downloads data from a MySQL database table and returns it as a Pandas DataFrame, optionally saving it as a CSV.
+
+    Connections come from the shared pool in dwh_utils.connections, so repeated
+    pulls from the same database inside one process reuse the same sessions.
+
+    Parameters:
+    - host (str): MySQL server host address.
+    - username (str): MySQL username.
+    - password (str): MySQL password.
+    - database (str): MySQL database name.
+    - table (str): Name of the table from which to download data.
+    - load_s3 (bool): Whether to save the DataFrame as a CSV file in the specified folder.
+    - output_folder (str): The folder to save the CSV file if load_s3 is True.
+    - script_filename (str): The full path of the script file for naming the output file.
+
+    Returns:
+    pd.DataFrame: DataFrame containing the downloaded data.
+    """
+    mysql = import_optional('mysql.connector')
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+
+        try:
+            cursor = conn.cursor()
+
+            # Query to select all data from the specified table
+            cursor.execute(f"SELECT * FROM {table};")
+
+            data = cursor.fetchall()
+
+            # Get column names from the cursor description
+            columns = [desc[0] for desc in cursor.description]
+
+            df = pd.DataFrame(data, columns=columns)
+
+            cursor.close()
+        finally:
+            # Hands the connection back to the pool
+            conn.close()
+
+        if load_s3:
+            stage_temp_file(df, output_folder, script_filename)
+
+        return df
+
+    except mysql.Error as e:
+        print(f"Error downloading data from MySQL: {e}")
+        return None
+
+def read_excel_file(path, sheets=None, header=0, dtype=None, sheet_column="sheet", workers=1, load_s3=False, output_folder=DEFAULT_TEMP_FOLDER, script_filename=None):
+    """
+    Reads sheets of an Excel workbook into a single DataFrame, optionally saving it as a CSV.
+
+    All requested sheets are parsed in one pass, with the calamine engine when python-calamine
+    is installed (see excel.read_sheets). Columns listed in dtype are converted to that type;
+    the types of the others are inferred from their values. 'str' columns are read as text, so
+    codes such as '007' keep their leading zeros.
+
+    Parameters:
+    path (str): The workbook.
+    sheets (str or list): The sheet, or sheets, to read. None reads all sheets, an empty list none.
+    header (int): Row (0-indexed) holding the column names. Default is 0.
+    dtype (dict): Column -> type, see transform.enforce_dtypes.
+    sheet_column (str): When several sheets are read, they are stacked and this column holds the sheet
+                        of each row. None leaves it out.
+    workers (int): Processes parsing sheets in parallel. Default is 1.
+    load_s3 (bool): Whether to save the DataFrame as a CSV file in the specified folder.
+    output_folder (str): The folder to save the CSV file if load_s3 is True.
+    script_filename (str): The full path of the script file for naming the output file.
+
+    Returns:
+    pd.DataFrame: The content of the sheets, or None if the workbook could not be read.
+    """
+    try:
+        # pd.read_excel turns text that looks like a number into a number unless told otherwise
+        text_columns = {column: str for column, kind in (dtype or {}).items() if kind == 'str'}
+        frames = read_sheets(path, sheets, workers, header=header, dtype=text_columns or None)
+    except (OSError, ValueError) as e:
+        print(f"Failed to read the Excel file {path}: {e}")
+        return None
+
+    print(f"Read {len(frames)} sheet(s) from {path}")
+
+    if len(frames) > 1 and sheet_column:
+        frames = {name: df.assign(**{sheet_column: name}) for name, df in frames.items()}
+    if not frames:
+        # sheets=[] asks for nothing
+        df = pd.DataFrame()
+    elif len(frames) > 1:
+        df = infer_dtypes(pd.concat(frames.values(), ignore_index=True))
+    else:
+        df = infer_dtypes(next(iter(frames.values())))
+
+    if dtype:
+        enforce_dtypes(df, dtype)
+
+    if load_s3:
+        stage_temp_file(df, output_folder, script_filename)
+
+    return df
+
+
+def _http_options(options):
+    """HTTP client settings of a source entry, with the client defaults for missing keys."""
+    timeout = options.get("timeout")
+    return {
+        "timeout": tuple(timeout) if isinstance(timeout, list) else (timeout or DEFAULT_TIMEOUT),
+        "max_retries": options.get("max_retries", DEFAULT_MAX_RETRIES),
+        "rate_limit": options.get("rate_limit"),
+    }
+
+
+def extract_source(source, script_filename=None):
+    """
+    Runs a single compiled source of an extraction plan.
+
+    Parameters:
+    source (SourcePlan): The source to extract.
+    script_filename (str): The full path of the script file for naming the staged outputs.
+
+    Returns:
+    pd.DataFrame or None: The extracted data, or None if the extraction failed.
+    """
+    options = source.options
+
+    if source.kind == "json":
+        print("Performing JSON extraction...")
+        return download_and_parse_json(
+            url=options["url"],
+            load_s3=options["load_s3"],
+            output_folder=options["output_folder"],
+            script_filename=script_filename,
+            **_http_options(options)
+        )
+
+    if source.kind == "sql":
+        print("Performing SQL extraction...")
+        return download_from_mysql(
+            host=options["host"],
+            username=options["username"],
+            password=options["password"],
+            database=options["database"],
+            table=options["table"],
+            load_s3=options["load_s3"],
+            output_folder=options["output_folder"],
+            script_filename=script_filename
+        )
+
+    if source.kind == "csv":
+        print("Performing CSV extraction...")
+        return download_and_parse_csv(
+            url=options["url"],
+            column_delimiter=options.get("column_delimiter"),
+            load_s3=options["load_s3"],
+            output_folder=options["output_folder"],
+            script_filename=script_filename,
+            **_http_options(options)
+        )
+
+    if source.kind == "excel":
+        print("Performing Excel extraction...")
+        return read_excel_file(
+            path=options["path"],
+            sheets=options.get("sheets"),
+            header=options.get("header", 0),
+            dtype=options.get("dtype"),
+            sheet_column=options.get("sheet_column", "sheet"),
+            workers=options.get("workers", 1),
+            load_s3=options["load_s3"],
+            output_folder=options["output_folder"],
+            script_filename=script_filename
+        )
+
+    raise ValueError(f"Unknown source type '{source.kind}'")
+
+
+HTTP_KINDS = ("json", "csv")
+
+
+def _prefetch_http_sources(sources, concurrency, on_result):
+    """
+    Fetch JSON/CSV sources concurrently through the asyncio engine.
+
+    Each frame is handed to on_result(source, df) as soon as it is parsed, so it can be
+    checkpointed and released before the others finish.
+
+    Returns:
+    dict: Source name -> what on_result returned, or the error of a source that failed to download,
+          to parse or in on_result.
+    """
+    from .async_extraction import HttpRequest, fetch_many
+
+    # The same client settings as a sequential download of each source
+    http_requests = [
+        HttpRequest(source.options["url"], source.kind, source.options.get("column_delimiter"), **_http_options(source.options))
+        for source in sources
+    ]
+    print(f"Fetching {len(http_requests)} HTTP sources with up to {concurrency} concurrent requests...")
+    results = fetch_many(http_requests, concurrency=concurrency, return_exceptions=True,
+                         on_result=lambda idx, df: on_result(sources[idx], df))
+    return {source.name: result for source, result in zip(sources, results)}
+
+
+def _run_source(source, script_filename, probe_store):
+    """
+    Extract a source, first checking its change probe if it has one.
+
+    The fingerprint is taken before the pull, so a table that changes while it
+    is being read is simply extracted again on the next run.
+    """
+    options = source.options
+
+    method = options.get("change_probe")
+    if not method:
+        return extract_source(source, script_filename)
+
+    fingerprint = probe_mysql_table(
+        host=options["host"],
+        username=options["username"],
+        password=options["password"],
+        database=options["database"],
+        table=options["table"],
+        method=method,
+        probe_column=options.get("probe_column")
+    )
+
+    df = probe_store.lookup(options, fingerprint)
+    if df is not None:
+        print(f"{options['database']}.{options['table']} unchanged since the last extraction, reusing it")
+        return df
+
+    df = extract_source(source, script_filename)
+    if df is not None:
+        probe_store.remember(options, fingerprint, df)
+    return df
+
+
+class ExtractionError(RuntimeError):
+    """Raised when one or more sources of an extraction run failed."""
+
+
+def perform_extraction(config, script_filename = "output", plan=None, run_id=None):
+    """
+    Performs data extraction based on the provided configuration.
+
+    The configuration is validated and compiled into a plan before the first
+    source runs, so configuration errors surface before anything is downloaded.
+
+    Each source is checkpointed to the staging area as soon as it finishes (see
+    staging.RunCheckpoint). If a source fails, the remaining sources still run,
+    and an ExtractionError is raised at the end naming the run id. The next call
+    resumes that run and only re-runs the failed sources. Once the run is staged,
+    its checkpoints are removed.
+
+    SQL sources with a "change_probe" are fingerprinted first (see probes.py);
+    if the table has not changed since the last run, its previous extract is reused.
+
+    When the extraction config sets "concurrency", all JSON/CSV sources are
+    fetched up front through the asyncio engine (see async_extraction.py).
+
+    The run is staged as an Excel workbook, or as memory-mappable Arrow files
+    when "staging_format" is "arrow", for the transformation stage to pick up
+    with staging.load_staged. "staging_workers" renders the workbook's sheets in
+    that many processes; the calling script then needs an `if __name__ == '__main__':`
+    guard on Windows and macOS.
+
+    With a "memory_budget", the extracted frames are held in a memory.SpillStore:
+    once the budget is reached, the least recently used sources are dropped from
+    memory and read back from their checkpoints (from the staged output, once the
+    run is staged) when accessed. The returned lists
+    then load each frame on access. Both staging formats are written one source
+    at a time, so the whole run stays within the budget. With "concurrency" too,
+    each downloaded source is checkpointed and put in the store as soon as it is
+    parsed. Every frame in the store can be read back from a file, so it never
+    writes spill files. If the run fails, the store is closed.
+
+    Parameters:
+    config (dict): Configuration dictionary containing extraction details for JSON, SQL, CSV and Excel.
+    script_filename (str): The full path of the script file for naming the staged outputs.
+    plan (PipelinePlan): An already compiled plan, e.g. from config.load_plan. Compiled from config when omitted.
+    run_id (str): Identifier of the run to create or resume. Defaults to the pipeline's last incomplete
+                  run, or a new one (see staging.new_run_id).
+
+    Raises:
+    ExtractionError: If any source failed. Completed sources stay checkpointed.
+
+    Returns:
+    dict: Dictionary containing the extracted DataFrames (lists, or list-like views with a memory budget).
+    """
+    pipeline = script_base_name(script_filename, split_stage=True)
+
+    if plan is None:
+        plan = compile_plan(config, pipeline)
+
+    checkpoint = RunCheckpoint(pipeline, run_id, plan.staging_folder)
+
+    probe_store = None
+    if any(source.options.get("change_probe") for source in plan.sources):
+        probe_store = ProbeStore(pipeline, plan.staging_folder)
+
+    store = None
+    if plan.memory_budget is not None:
+        store = SpillStore(plan.memory_budget)
+
+    def keep(source, df):
+        """Checkpoint a finished source and hand it to the memory store. Returns what extracted_data lists."""
+        checkpoint.save(source, df)
+        if store is None:
+            return df
+        # The checkpoint is already on disk, so an evicted source is simply read back from it
+        store.put(source.name, df, checkpoint.loader(source))
+        return source.name
+
+    def keep_prefetched(source, df):
+        if source.options["load_s3"]:
+            stage_temp_file(df, source.options["output_folder"], script_filename)
+        return keep(source, df)
+
+    extracted_data = {kind: [] for kind in SOURCE_SCHEMAS}
+    failed = []
+
+    try:
+        prefetched = {}
+        if plan.concurrency:
+            pending = [source for source in plan.sources if source.kind in HTTP_KINDS and not checkpoint.is_done(source)]
+            if pending:
+                # Frames are checkpointed (and held under the memory budget) as each download completes
+                prefetched = _prefetch_http_sources(pending, plan.concurrency, keep_prefetched)
+
+        for source in plan.sources:
+            if source.name in prefetched:
+                # Already checkpointed when its download completed, unless it failed
+                kept = prefetched.pop(source.name)
+                if isinstance(kept, Exception):
+                    kept, error = None, kept
+            elif checkpoint.is_done(source):
+                print(f"Skipping {source.name}, already extracted in run {checkpoint.run_id}")
+                if store is None:
+                    extracted_data[source.kind].append(checkpoint.load(source))
+                else:
+                    store.add_lazy(source.name, checkpoint.loader(source))
+                    extracted_data[source.kind].append(source.name)
+                continue
+            else:
+                try:
+                    df = _run_source(source, script_filename, probe_store)
+                except Exception as e:
+                    df = None
+                    error = e
+                else:
+                    error = "extraction returned no data"
+                # Leave the store as the only holder of the frame, so evicting it frees the memory
+                kept = None if df is None else keep(source, df)
+                del df
+
+            if kept is None:
+                checkpoint.fail(source, error)
+                failed.append((source.name, error))
+                continue
+            extracted_data[source.kind].append(kept)
+
+        if failed:
+            raise ExtractionError(
+                f"Sources {', '.join(name for name, _ in failed)} failed in run {checkpoint.run_id}. "
+                f"Re-run to resume it (or pass run_id='{checkpoint.run_id}'); state is in {checkpoint.state_path}\n"
+                + "\n".join(f"  {name}: {error}" for name, error in failed)
+            )
+
+        if store is not None:
+            extracted_data = {kind: store.view(names) for kind, names in extracted_data.items()}
+
+        if plan.staging_format == "arrow":
+            staged_path = write_staging_arrow(extracted_data, plan.staging_folder, script_filename, checkpoint.run_id)
+        else:
+            # Sheets are rendered in parallel only on request, and never when a memory budget asks for one frame at a time
+            workers = 1 if store is not None else plan.staging_workers
+            staged_path = write_staging_workbook(extracted_data, plan.staging_folder, script_filename, checkpoint.run_id, workers)
+
+        if store is not None:
+            # Evicted frames are read back from the staged output once the checkpoints are gone
+            _, read = staged_reader(staged_path)
+            for kind, view in extracted_data.items():
+                for idx, name in enumerate(view.keys):
+                    store.relocate(name, lambda staged=f"{kind}_{idx}": read(staged))
+        checkpoint.complete()
+    except BaseException:
+        # Everything finished is checkpointed; drop the frames and any spill files
+        if store is not None:
+            store.close()
+        raise
+
+    return extracted_data
@@ -0,0 +1,192 @@
+"""
+Shared HTTP client for the extraction sources.
+
+- One keep-alive requests.Session per thread, so repeated calls to the same host reuse connections.
+- Connect/read timeouts on every request.
+- Exponential backoff with full jitter on connection errors, timeouts and retryable status codes,
+  honoring the Retry-After header when the server sends one. No wait is longer than max_backoff:
+  a request whose server asks for a longer one fails instead.
+- Optional per-host token-bucket rate limits, shared by all threads of the process. A 429 response
+  pauses the whole host, not just the request that received it.
+"""
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from ._optional import import_optional
+
+
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) seconds
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+# Longest wait between two attempts, in seconds, whether from the backoff or from Retry-After
+BACKOFF_MAX = 60.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: allows `rate` requests per second on average with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Stop handing out tokens for the given number of seconds, e.g. after a 429."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def try_acquire(self):
+        """Take a token if one is available. Returns 0, or the seconds to wait before trying again."""
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+_local = threading.local()
+
+
+def set_rate_limit(host, rate, burst=None):
+    """
+    Limit the request rate to a host for the whole process.
+
+    Parameters:
+    host (str): The host name, e.g. 'www.ine.es'.
+    rate (float): Allowed requests per second.
+    burst (int): Maximum burst size. Defaults to max(1, rate).
+    """
+    with _buckets_lock:
+        _buckets[host] = TokenBucket(rate, burst)
+
+
+def bucket_for(host, rate=None):
+    """The rate-limit bucket of a host, created with `rate` if it has none yet. None if the host is unlimited."""
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None and rate:
+            bucket = _buckets[host] = TokenBucket(rate)
+        return bucket
+
+
+def get_session():
+    """
+    Get this thread's keep-alive session, creating it on first use.
+
+    Returns:
+    requests.Session: The session.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        requests = import_optional('requests')
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header, or None."""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def http_get(url, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES, rate_limit=None, max_backoff=BACKOFF_MAX, **kwargs):
+    """
+    GET a URL through the shared session with timeouts, retries and rate limiting.
+
+    Parameters:
+    url (str): The URL to fetch.
+    timeout (float or tuple): Timeout in seconds, or a (connect, read) pair.
+    max_retries (int): Number of retries after the first attempt.
+    rate_limit (float): Requests per second allowed to this host. Only applied if the host has no limit yet.
+    max_backoff (float): Longest wait between attempts, in seconds. A Retry-After asking for more fails the request.
+    **kwargs: Passed on to requests.Session.get.
+
+    Raises:
+    requests.exceptions.RequestException: If the request still fails after all retries, or the server
+                                          asks to retry after more than max_backoff seconds.
+
+    Returns:
+    requests.Response: The successful response.
+    """
+    requests = import_optional('requests')
+
+    host = urlsplit(url).hostname
+    session = get_session()
+
+    attempt = 0
+    while True:
+        bucket = bucket_for(host, rate_limit)
+        if bucket is not None:
+            bucket.acquire()
+
+        response = None
+        try:
+            response = session.get(url, timeout=timeout, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                return response
+            error = requests.exceptions.HTTPError(f"{response.status_code} {response.reason} for url: {url}", response=response)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = e
+
+        if attempt >= max_retries:
+            if response is not None:
+                response.raise_for_status()
+            raise error
+
+        delay = retry_after_seconds(response)
+        if delay is None:
+            delay = backoff_delay(attempt, cap=max_backoff)
+        elif delay > max_backoff:
+            raise requests.exceptions.HTTPError(
+                f"{response.status_code} {response.reason} for url: {url}, and the server asks to retry "
+                f"after {delay:.0f}s, more than max_backoff ({max_backoff:.0f}s)", response=response)
+        elif bucket is not None:
+            bucket.pause(delay)
+
+        print(f"Request to {url} failed ({error}), retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        time.sleep(delay)
+        attempt += 1
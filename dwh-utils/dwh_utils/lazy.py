@@ -0,0 +1,416 @@
+"""
+Lazy, chunked transformations over staged files.
+
+A LazyTable records transformation steps without running them. Nothing is read
+until the result is consumed with iter_chunks(), collect() or one of the
+to_* writers (CSV, Parquet or Excel), and then the data streams through the
+steps one chunk at a time:
+
+    from dwh_utils.lazy import scan_staged
+
+    table = (scan_staged('../../s3/temp_files/20240624', chunksize=50_000)
+             .map_column('Provincias')
+             .force_int_conversion('Total')
+             .adjust_dtype()
+             .select(['Provincias', 'Periodo', 'Total']))
+    table.to_csv('ine_clean.csv')
+
+Staged CSV and Parquet files are read in chunks, and Arrow IPC files are
+memory-mapped and sliced into chunks without copying. Pickle checkpoints and Excel
+sheets are read one partition (file or sheet) at a time. When the output is
+narrowed with select(), only the selected columns plus those the steps need
+are read from disk (projection pushdown).
+"""
+import os
+from collections import namedtuple
+from datetime import date
+
+import pandas as pd
+
+from ._optional import import_optional
+from .config import DEFAULT_MAPPING_PATH
+from .excel import excel_engine, write_excel
+from .staging import open_arrow
+from .profiling import ColumnProfiler
+from .mapping import index_keys, load_mapping_index
+from .transform import adjust_dtype, apply_mapping, apply_mapping_index, convert_to_int, export_dq, load_mapping
+
+
+DEFAULT_CHUNKSIZE = 100_000
+SUPPORTED_SUFFIXES = ('.csv', '.parquet', '.arrow', '.feather', '.pkl', '.xlsx')
+
+# func: (chunk, unmatched) -> chunk, where unmatched collects column -> set of unmapped values;
+# columns: the columns the step reads, or None if it only touches what is present;
+# creates: columns the step adds, which are therefore not read from disk for the later steps and the output.
+Step = namedtuple('Step', ['name', 'func', 'columns', 'creates'], defaults=((),))
+
+
+def list_partitions(path):
+    """
+    List the staged files behind a path: the file itself, or every supported file in a directory.
+
+    Parameters:
+    path (str): A staged file or a directory of staged files.
+
+    Returns:
+    list: Sorted file paths.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                 if name.endswith(SUPPORTED_SUFFIXES) and not name.startswith(('.', '~'))]
+        if not files:
+            raise FileNotFoundError(f"No staged files ({', '.join(SUPPORTED_SUFFIXES)}) found in {path}")
+        return files
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Staged file {path} not found.")
+    return [path]
+
+
+def _slice(df, chunksize):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def read_chunks(path, columns=None, chunksize=DEFAULT_CHUNKSIZE, sheets=None, **read_options):
+    """
+    Stream a staged file as DataFrame chunks, reading only the requested columns.
+
+    Parameters:
+    path (str): A .csv, .parquet, .arrow/.feather, .pkl or .xlsx staged file.
+    columns (list): Columns to read. None reads all columns.
+    chunksize (int): Rows per chunk for formats that support chunked reads.
+    sheets (list): Sheets to read from an Excel workbook. None reads all sheets.
+    **read_options: Passed on to pd.read_csv or pd.read_excel.
+
+    Returns:
+    generator: DataFrame chunks.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+
+    if suffix == '.csv':
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize, **read_options)
+
+    elif suffix == '.parquet':
+        parquet = import_optional('pyarrow.parquet')
+        parquet_file = parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+
+    elif suffix in ('.arrow', '.feather'):
+        table = open_arrow(path, columns)
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas(split_blocks=True)
+
+    elif suffix == '.pkl':
+        df = pd.read_pickle(path)
+        yield from _slice(df if columns is None else df[columns], chunksize)
+
+    elif suffix == '.xlsx':
+        sheet_names = sheets or pd.ExcelFile(path, engine=excel_engine()).sheet_names
+        for sheet_name in sheet_names:
+            yield pd.read_excel(path, sheet_name=sheet_name, usecols=columns, engine=excel_engine(), **read_options)
+
+    else:
+        raise ValueError(f"Unsupported staged file type '{suffix}' for {path}")
+
+
+class LazyTable:
+    """
+    A chain of transformation steps over one or more staged files.
+
+    Every method that adds a step returns a new LazyTable, so a partially built
+    chain can be reused as the base of several outputs.
+    """
+
+    def __init__(self, partitions, steps=(), output_columns=None, chunksize=DEFAULT_CHUNKSIZE, read_options=None):
+        self.partitions = list(partitions)
+        self.steps = tuple(steps)
+        self.output_columns = output_columns
+        self.chunksize = chunksize
+        # File suffix -> options of its reader, e.g. {'.csv': {'sep': ';'}}, since pd.read_csv and
+        # pd.read_excel take different options and a directory may mix both
+        self.read_options = dict(read_options or {})
+        # Filled while running: column -> set of values that had no mapping
+        self.unmatched = {}
+
+    def _with(self, steps=None, output_columns=None):
+        return LazyTable(
+            self.partitions,
+            self.steps if steps is None else steps,
+            self.output_columns if output_columns is None else output_columns,
+            self.chunksize,
+            self.read_options
+        )
+
+    def pipe(self, func, columns=None, name=None):
+        """
+        Add a custom step.
+
+        Parameters:
+        func (callable): Takes a DataFrame chunk and returns the transformed chunk. It must work on any
+                         subset of rows, since it is called once per chunk.
+        columns (list): Columns the step reads, so they are kept when the input is projected.
+        name (str): Label shown by explain().
+
+        Returns:
+        LazyTable: The extended chain.
+        """
+        return self._step(lambda chunk, unmatched: func(chunk), columns, name or getattr(func, '__name__', 'step'))
+
+    def _step(self, func, columns, name, creates=()):
+        return self._with(steps=self.steps + (Step(name, func, columns, creates),))
+
+    def map_column(self, df_column_name, mapping_column_name=None, full_map=False, dq=True, mapping_path=DEFAULT_MAPPING_PATH,
+                   keys=None, range_column=None, valid_on=None):
+        """
+        Map a column through a mapping sheet, like transform.map_column.
+
+        Unmatched values from all chunks are collected in `unmatched` of the table that is executed.
+
+        Parameters:
+        df_column_name (str): The column to map.
+        mapping_column_name (str): The mapping sheet. Defaults to df_column_name.
+        full_map (bool): Whether to replace unmatched values with NaN. Default is False.
+        dq (bool): Whether to collect unmatched values. Default is True.
+        mapping_path (str): Path of the mapping workbook.
+        keys, range_column, valid_on: Lookup columns of composite-key, range and validity-date sheets,
+                                      see transform.map_column. With full_map, df_column_name may then
+                                      be a new column.
+
+        Returns:
+        LazyTable: The extended chain.
+        """
+        sheet_name = mapping_column_name or df_column_name
+        keys = index_keys(df_column_name, keys, range_column, valid_on)
+
+        if keys is None:
+            def step(chunk, unmatched):
+                mapping_dict = load_mapping(sheet_name, mapping_path)
+                chunk[df_column_name], unmatched_values = apply_mapping(chunk[df_column_name], mapping_dict, full_map)
+                if dq:
+                    unmatched.setdefault(df_column_name, set()).update(unmatched_values)
+                return chunk
+
+            return self._step(step, [df_column_name], f"map_column({df_column_name!r})")
+
+        lookup_columns = keys + [column for column in (range_column, valid_on) if column is not None]
+
+        def step(chunk, unmatched):
+            index = load_mapping_index(sheet_name, mapping_path, len(keys), range_column is not None, valid_on is not None)
+            chunk[df_column_name], unmatched_values = apply_mapping_index(chunk, df_column_name, index, keys, range_column, valid_on, full_map)
+            if dq:
+                unmatched.setdefault(df_column_name, set()).update(unmatched_values)
+            return chunk
+
+        # The mapped column is only read as the fallback of unmatched rows; with full_map it may be a new column
+        if full_map:
+            return self._step(step, lookup_columns, f"map_column({df_column_name!r})", creates=(df_column_name,))
+        return self._step(step, lookup_columns + [df_column_name], f"map_column({df_column_name!r})")
+
+    def map_columns_from_dict(self, mapping_dict):
+        """
+        Add a map_column step per entry of a 'mapping' config section, like transform.map_columns_from_dict.
+
+        Returns:
+        LazyTable: The extended chain.
+        """
+        table = self
+        for df_column_name, settings in mapping_dict.items():
+            table = table.map_column(
+                df_column_name,
+                settings.get('mapping_column_name', df_column_name),
+                settings.get('full_map', False),
+                settings.get('dq', True),
+                settings.get('mapping_path', DEFAULT_MAPPING_PATH),
+                settings.get('keys'),
+                settings.get('range'),
+                settings.get('valid_on')
+            )
+        return table
+
+    def force_int_conversion(self, column_name):
+        """Add a transform.force_int_conversion step for a column."""
+        def step(chunk):
+            # A new column rather than edits in place: Arrow chunks are read-only views of the staged file
+            return chunk.assign(**{column_name: convert_to_int(chunk[column_name])})
+
+        return self.pipe(step, [column_name], f"force_int_conversion({column_name!r})")
+
+    def adjust_dtype(self):
+        """Add a transform.adjust_dtype step over the columns present in each chunk."""
+        def step(chunk):
+            adjust_dtype(chunk)
+            return chunk
+
+        return self.pipe(step, None, "adjust_dtype()")
+
+    def select(self, columns):
+        """
+        Keep only the given columns in the output. Unneeded columns are not read from disk.
+
+        Returns:
+        LazyTable: The narrowed chain.
+        """
+        return self._with(output_columns=list(columns))
+
+    def required_columns(self):
+        """Columns that must be read from the staged files, or None for all of them."""
+        if self.output_columns is None:
+            return None
+
+        # Walk back from the output: a column created by a step is only read if an earlier step needs it
+        required = list(self.output_columns)
+        for step in reversed(self.steps):
+            required = [column for column in required if column not in step.creates]
+            for column in step.columns or ():
+                if column not in required:
+                    required.append(column)
+        return required
+
+    def explain(self):
+        """Describe the plan: partitions, projected columns and steps."""
+        lines = [f"scan {len(self.partitions)} partition(s), columns={self.required_columns() or 'all'}"]
+        lines += [f"  -> {step.name}" for step in self.steps]
+        if self.output_columns is not None:
+            lines.append(f"  -> select({self.output_columns})")
+        return "\n".join(lines)
+
+    def iter_chunks(self):
+        """
+        Run the chain, yielding one transformed chunk at a time.
+
+        Returns:
+        generator: DataFrame chunks.
+        """
+        columns = self.required_columns()
+        self.unmatched = {}
+
+        for partition in self.partitions:
+            read_options = self.read_options.get(os.path.splitext(partition)[1].lower(), {})
+            # No copy: with pandas copy-on-write a step that assigns copies only what it changes,
+            # so chunks sliced from memory-mapped Arrow files stay zero-copy otherwise
+            for chunk in read_chunks(partition, columns, self.chunksize, **read_options):
+                for step in self.steps:
+                    chunk = step.func(chunk, self.unmatched)
+                if self.output_columns is not None:
+                    chunk = chunk[self.output_columns]
+                yield chunk
+
+    def collect(self):
+        """
+        Run the chain and concatenate the result into a single DataFrame.
+
+        Returns:
+        pd.DataFrame: The transformed data.
+        """
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame(columns=self.output_columns)
+        return pd.concat(chunks, ignore_index=True)
+
+    def to_csv(self, path, **to_csv_options):
+        """
+        Run the chain and append each chunk to a CSV file as it is produced.
+
+        Returns:
+        int: The number of rows written.
+        """
+        rows = 0
+        for idx, chunk in enumerate(self.iter_chunks()):
+            chunk.to_csv(path, mode='w' if idx == 0 else 'a', header=idx == 0, index=False, **to_csv_options)
+            rows += len(chunk)
+        print(f"Wrote {rows} rows to {path}")
+        return rows
+
+    def to_parquet(self, path):
+        """
+        Run the chain and write each chunk as a row group of a Parquet file.
+
+        All chunks must share the schema of the first one.
+
+        Returns:
+        int: The number of rows written.
+        """
+        pa = import_optional('pyarrow')
+        parquet = import_optional('pyarrow.parquet')
+
+        rows = 0
+        writer = None
+        try:
+            for chunk in self.iter_chunks():
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        print(f"Wrote {rows} rows to {path}")
+        return rows
+
+    def to_excel(self, path, sheet_name='Sheet1'):
+        """
+        Run the chain and stream the chunks into an Excel workbook, see excel.write_excel.
+
+        Rows beyond the Excel row limit continue on '<sheet_name> (2)', ...
+
+        Returns:
+        int: The number of rows written.
+        """
+        rows = 0
+
+        def chunks():
+            nonlocal rows
+            for chunk in self.iter_chunks():
+                rows += len(chunk)
+                yield chunk
+
+        write_excel({sheet_name: chunks()}, path)
+        print(f"Wrote {rows} rows to {path}")
+        return rows
+
+    def profile(self, dq_export=False, script_name=None, **options):
+        """
+        Run the chain and profile its output chunk by chunk with mergeable sketches, see transform.profile_columns.
+
+        Parameters:
+        dq_export (bool): Whether to write the profile to the 'profile' sheet of the DQ workbook. Default is False.
+        script_name (str): Name of the DQ workbook, dq/<script_name>_dq.xlsx. Required with dq_export.
+        **options: See profiling.ColumnProfiler.
+
+        Returns:
+        pd.DataFrame: The profile, one row per column.
+        """
+        profiler = ColumnProfiler(**options)
+        for chunk in self.iter_chunks():
+            profiler.update(chunk)
+
+        profile = profiler.result()
+        profile['date'] = date.today()
+
+        if dq_export:
+            if not script_name:
+                raise ValueError("script_name is required to export the profile")
+            export_dq(profile, script_name, sheet_name='profile')
+        return profile
+
+
+def scan_staged(path, chunksize=DEFAULT_CHUNKSIZE, csv_options=None, excel_options=None):
+    """
+    Start a lazy transformation over staged data.
+
+    Parameters:
+    path (str): A staged .csv, .parquet, .pkl or .xlsx file, or a directory of them (one partition per file).
+    chunksize (int): Rows per chunk.
+    csv_options (dict): Passed on to pd.read_csv for the CSV partitions, e.g. {'sep': ';'}.
+    excel_options (dict): Passed on to pd.read_excel for the Excel partitions, e.g. {'header': 1},
+                          plus 'sheets' to read only some sheets, e.g. {'sheets': ['sql_0']}.
+
+    Returns:
+    LazyTable: An empty chain over the staged data.
+    """
+    read_options = {'.csv': dict(csv_options or {}), '.xlsx': dict(excel_options or {})}
+    return LazyTable(list_partitions(path), chunksize=chunksize, read_options=read_options)
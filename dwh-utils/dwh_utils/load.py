@@ -0,0 +1,221 @@
+import pandas as pd
+
+from ._optional import import_optional
+from .connections import get_mysql_connection
+from .schema import SchemaRegistry, coerce_frame, execute_ddl, migrate_table
+
+
+def _to_rows(df):
+    """Convert a DataFrame to a list of tuples with NaN/NaT replaced by None, as the MySQL driver expects."""
+    columns = []
+    for _, series in df.items():
+        # Column by column, so each keeps its own values (Int64 gives ints, not floats) and only misses are replaced
+        missing = series.isna().to_numpy()
+        values = series.to_numpy(dtype=object, copy=bool(missing.any()))
+        if missing.any():
+            values[missing] = None
+        columns.append(values)
+    return list(zip(*columns))
+
+
+def _insert_rows(cursor, df, table, chunksize):
+    """INSERT a DataFrame in batches of chunksize rows through an open cursor."""
+    columns = ", ".join(f"`{column}`" for column in df.columns)
+    placeholders = ", ".join(["%s"] * len(df.columns))
+    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
+
+    rows = _to_rows(df)
+    for start in range(0, len(rows), chunksize):
+        cursor.executemany(query, rows[start:start + chunksize])
+
+
+def load_to_mysql(df, host, username, password, database, table, truncate=False, chunksize=1000, schema=None, create=False, migrate=False):
+    """
+    Bulk inserts a DataFrame into a MySQL table.
+
+    Rows are sent with executemany in chunks, which mysql.connector rewrites into
+    multi-row INSERT statements, over a connection taken from the shared pool.
+
+    With a target schema (see dwh_utils.schema), every column is first converted
+    to its target type by schema.coerce_frame, so the server does no implicit
+    conversions. The rows are then built column by column from the converted
+    arrays; the driver still takes them as Python values.
+
+    Creating or altering the table (create=True, migrate=True) runs before the
+    load, as its own step. MySQL commits DDL implicitly, so that step is not
+    rolled back if the load fails. The load itself is one transaction: emptying
+    the table (with DELETE, not TRUNCATE, which would also commit) and the
+    inserts are rolled back together.
+
+    Parameters:
+    - df (pd.DataFrame): The data to load. Column names must match the target table.
+    - host (str): MySQL server host address.
+    - username (str): MySQL username.
+    - password (str): MySQL password.
+    - database (str): MySQL database name.
+    - table (str): Name of the target table.
+    - truncate (bool): Whether to empty the table before loading. Default is False.
+    - chunksize (int): Number of rows sent per INSERT batch.
+    - schema (TableSchema or SchemaRegistry): Target schema of the table, or a registry to look it up in.
+    - create (bool): Whether to create the table from the schema if it does not exist. Default is False.
+    - migrate (bool): Whether to ALTER an existing table that no longer fits the schema, e.g. after the
+      registry widened it. Default is False, which only prints the statement. See schema.migration_sql.
+
+    Returns:
+    int: The number of rows inserted, or None if the load failed.
+    """
+    mysql = import_optional('mysql.connector')
+
+    if isinstance(schema, SchemaRegistry):
+        registry = schema
+        schema = registry.get(table)
+        if schema is None:
+            print(f"No schema registered for {table} in {registry.folder}, loading the data as is")
+
+    if schema is not None:
+        df = coerce_frame(df, schema)
+    elif create:
+        raise ValueError("create=True needs a schema to create the table from")
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+
+        try:
+            cursor = conn.cursor()
+
+            # DDL step, committed by MySQL as it runs
+            pending = None
+            if create:
+                pending = execute_ddl(cursor, schema, migrate=migrate)
+            elif schema is not None:
+                pending = migrate_table(cursor, schema, migrate)
+            if pending:
+                print(f"Warning: {table} no longer matches its schema, values may be truncated or rejected. "
+                      f"Review and run this statement, or load with migrate=True:\n{pending}")
+
+            # Load transaction
+            try:
+                if truncate:
+                    cursor.execute(f"DELETE FROM {table};")
+
+                _insert_rows(cursor, df, table, chunksize)
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            cursor.close()
+        finally:
+            conn.close()
+
+        print(f"Loaded {len(df)} rows into {database}.{table}")
+
+        return len(df)
+
+    except mysql.Error as e:
+        print(f"Error loading data into MySQL: {e}")
+        return None
+
+
+def load_chunks_to_mysql(chunks, host, username, password, database, table, truncate=False, chunksize=1000):
+    """
+    Bulk inserts a stream of DataFrames into a MySQL table in a single transaction.
+
+    Unlike calling load_to_mysql per chunk, a failure at any chunk rolls the
+    whole load back, so the table is never left emptied or half loaded. The
+    table is emptied with DELETE rather than TRUNCATE, which would commit.
+
+    Parameters:
+    - chunks (iterable): DataFrames to load, e.g. from SqlEngine.iter_query. Column names must match the table.
+    - host, username, password, database (str): Connection details, as for load_to_mysql.
+    - table (str): Name of the target table.
+    - truncate (bool): Whether to empty the table before loading. Default is False.
+    - chunksize (int): Number of rows sent per INSERT batch.
+
+    Returns:
+    int: The number of rows inserted, or None if the load failed and was rolled back.
+    """
+    mysql = import_optional('mysql.connector')
+
+    rows = 0
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+
+        try:
+            cursor = conn.cursor()
+
+            if truncate:
+                cursor.execute(f"DELETE FROM {table};")
+
+            for df in chunks:
+                _insert_rows(cursor, df, table, chunksize)
+                rows += len(df)
+
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        print(f"Loaded {rows} rows into {database}.{table}")
+
+        return rows
+
+    except mysql.Error as e:
+        print(f"Error loading data into MySQL, nothing was loaded: {e}")
+        return None
+
+
+def apply_scd2_to_mysql(changes, host, username, password, database, table, chunksize=1000):
+    """
+    Writes the operations of an SCD2 merge (see scd.scd2_merge) to a MySQL dimension table.
+
+    Expired versions are closed with batched UPDATEs on the surrogate key and new
+    versions are bulk inserted, in a single transaction. Only changed rows are written.
+
+    Parameters:
+    - changes (Scd2Changes): The result of scd.scd2_merge.
+    - host, username, password, database (str): Connection details, as for load_to_mysql.
+    - table (str): Name of the dimension table.
+    - chunksize (int): Number of rows per UPDATE/INSERT batch.
+
+    Returns:
+    tuple: (rows expired, rows inserted), or None if the load failed.
+    """
+    mysql = import_optional('mysql.connector')
+
+    columns = changes.columns
+    expire_query = (
+        f"UPDATE {table} SET `{columns.valid_to}` = %s, `{columns.is_current}` = 0 "
+        f"WHERE `{columns.surrogate_key}` = %s"
+    )
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+
+        try:
+            cursor = conn.cursor()
+
+            expire_rows = _to_rows(changes.expire[[columns.valid_to, columns.surrogate_key]])
+            for start in range(0, len(expire_rows), chunksize):
+                cursor.executemany(expire_query, expire_rows[start:start + chunksize])
+
+            _insert_rows(cursor, changes.insert, table, chunksize)
+
+            conn.commit()
+            cursor.close()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        print(f"SCD2 merge into {database}.{table}: {len(changes.expire)} expired, {len(changes.insert)} inserted")
+
+        return len(changes.expire), len(changes.insert)
+
+    except mysql.Error as e:
+        print(f"Error applying SCD2 changes to MySQL: {e}")
+        return None
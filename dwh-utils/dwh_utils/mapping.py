@@ -0,0 +1,256 @@
+"""
+Composite-key, range and validity-date lookups for mapping sheets.
+
+A plain mapping sheet has two columns, the mapped value and the source value,
+and is applied as a dictionary (see transform.load_mapping). A MappingIndex
+handles the sheets a dictionary cannot. Their columns are, without a header:
+
+    mapped value | key 1 ... key n | [low | high] | [valid from | valid to]
+
+- keys: rows match on the values of several columns, e.g. (province, town).
+  There may also be no key at all, e.g. for price bands that apply to every row.
+- range: a numeric or date column falls in the band low <= value < high.
+- validity: a date column falls in the window valid from <= date < valid to,
+  so the same key can map to different values over time.
+
+An empty high or valid to leaves the band open-ended. As in pd.merge_asof, the
+band (or window) with the greatest low not above the value is used, so bands of
+the same key should not overlap.
+
+Lookups are vectorized over the whole DataFrame. Key values are matched through
+hash tables and combined into one integer per row, and bands are found by
+binary search over arrays sorted by (key, low) when the index is built:
+
+    from dwh_utils.mapping import load_mapping_index
+
+    index = load_mapping_index('Tarifas', key_count=1, ranged=True)
+    rows = index.lookup(df, ['Provincia'], range_column='Importe')
+"""
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .config import DEFAULT_MAPPING_PATH
+from .excel import excel_engine
+
+
+def index_keys(df_column_name, keys=None, range_column=None, valid_on=None):
+    """
+    Resolves the key columns of a mapping entry.
+
+    Parameters:
+    df_column_name (str): The mapped column.
+    keys (list): Columns matched against the key columns of the sheet. Defaults to [df_column_name].
+    range_column (str): Column looked up in the low/high bands of the sheet.
+    valid_on (str): Column looked up in the validity windows of the sheet.
+
+    Returns:
+    list: The key columns, or None for a plain two-column mapping applied as a dictionary.
+    """
+    if keys is None and range_column is None and valid_on is None:
+        return None
+    return [df_column_name] if keys is None else list(keys)
+
+
+def _combine(codes, sizes):
+    # Exact mixed-radix key while it fits in 64 bits, a hash of the code tuple otherwise
+    if math.prod(sizes) < 2 ** 62:
+        combined = np.zeros(len(codes[0]) if codes else 0, dtype=np.int64)
+        for column_codes, size in zip(codes, sizes):
+            combined = combined * size + column_codes
+        return combined
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(dict(enumerate(codes))), index=False)
+    return hashes.to_numpy(dtype=np.uint64).view(np.int64)
+
+
+def _as_bounds(values, datetimes):
+    """Numeric or datetime64 array of band bounds, with NaN/NaT for empty or unparseable values."""
+    if datetimes:
+        return pd.to_datetime(pd.Series(values), errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+
+
+class _Asof:
+    """Rows sorted by (group, bound), searched for the greatest bound <= value within a group."""
+
+    def __init__(self, groups, bounds):
+        self.bounds = np.unique(bounds)
+        self.width = max(len(self.bounds), 1)
+        keys = groups * self.width + np.searchsorted(self.bounds, bounds)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def find(self, groups, values):
+        """Row of the matching band for each (group, value), -1 where there is none."""
+        if not len(self.keys):
+            return np.full(len(groups), -1)
+
+        ranks = np.searchsorted(self.bounds, values, side='right') - 1
+        found = (groups >= 0) & (ranks >= 0) & ~pd.isna(values)
+        positions = np.searchsorted(self.keys, groups * self.width + ranks, side='right') - 1
+        found &= positions >= 0
+        positions = np.maximum(positions, 0)
+        # Ties keep the last row of the sheet, as a dictionary would
+        found &= self.keys[positions] // self.width == groups
+        return np.where(found, self.order[positions], -1)
+
+
+class MappingIndex:
+    """
+    A mapping sheet indexed for composite-key, range and validity-date lookups.
+
+    Parameters:
+    frame (pd.DataFrame): The sheet, with its columns in the order described in the module docstring.
+    key_count (int): Number of key columns. Default is 1.
+    ranged (bool): Whether the sheet has low/high band columns. Default is False.
+    validity (bool): Whether the sheet has valid from/valid to columns. Default is False.
+    """
+
+    def __init__(self, frame, key_count=1, ranged=False, validity=False):
+        names = (['mapped'] + [f'key_{i}' for i in range(1, key_count + 1)]
+                 + (['low', 'high'] if ranged else []) + (['valid_from', 'valid_to'] if validity else []))
+        if frame.shape[1] < len(names):
+            raise ValueError(f"Expected {len(names)} columns in the mapping sheet, got {frame.shape[1]}")
+
+        frame = frame.iloc[:, :len(names)].set_axis(names, axis=1)
+        self.key_count = key_count
+        self.ranged = ranged
+        self.validity = validity
+
+        if ranged:
+            self.range_datetimes = pd.api.types.is_datetime64_any_dtype(frame['low'])
+            frame = frame.assign(low=_as_bounds(frame['low'], self.range_datetimes),
+                                 high=_as_bounds(frame['high'], self.range_datetimes))
+        if validity:
+            self.validity_datetimes = pd.api.types.is_datetime64_any_dtype(frame['valid_from'])
+            frame = frame.assign(valid_from=_as_bounds(frame['valid_from'], self.validity_datetimes),
+                                 valid_to=_as_bounds(frame['valid_to'], self.validity_datetimes))
+
+        # Rows without a key or a lower bound can never match
+        required = names[1:key_count + 1] + (['low'] if ranged else []) + (['valid_from'] if validity else [])
+        self.frame = frame.dropna(subset=required).reset_index(drop=True)
+
+        codes = []
+        self.key_values = []
+        for name in names[1:key_count + 1]:
+            column_codes, uniques = pd.factorize(self.frame[name])
+            codes.append(column_codes)
+            self.key_values.append(pd.Index(uniques))
+        self.key_sizes = [len(values) for values in self.key_values]
+        self.group_keys, groups = np.unique(_combine(codes, self.key_sizes), return_inverse=True)
+        groups = groups.astype(np.int64)
+        if not key_count:
+            groups = np.zeros(len(self.frame), dtype=np.int64)
+
+        rows = len(self.frame)
+        if validity:
+            self.windows = _Asof(groups, self.frame['valid_from'].to_numpy())
+            # A version is a (key, valid from) pair; bands are searched within the version in force
+            _, versions = np.unique(groups * self.windows.width + np.searchsorted(self.windows.bounds, self.frame['valid_from'].to_numpy()),
+                                    return_inverse=True)
+            self.versions = versions.astype(np.int64)
+            groups = self.versions
+        if ranged:
+            self.bands = _Asof(groups, self.frame['low'].to_numpy())
+        if not ranged and not validity:
+            # Last row of each key, as dict(zip(...)) keeps it
+            _, last = np.unique(groups[::-1], return_index=True)
+            self.row_of_group = rows - 1 - last
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _groups(self, df, keys):
+        if len(keys) != self.key_count:
+            raise ValueError(f"The mapping sheet has {self.key_count} key column(s), got {len(keys)}")
+        if not self.key_count:
+            return np.zeros(len(df), dtype=np.int64)
+
+        codes = [values.get_indexer(df[key]) for values, key in zip(self.key_values, keys)]
+        known = np.logical_and.reduce([column_codes >= 0 for column_codes in codes])
+        combined = _combine([np.maximum(column_codes, 0) for column_codes in codes], self.key_sizes)
+        positions = np.minimum(np.searchsorted(self.group_keys, combined), max(len(self.group_keys) - 1, 0))
+        found = known & (self.group_keys[positions] == combined) if len(self.group_keys) else np.zeros(len(df), dtype=bool)
+        return np.where(found, positions, -1)
+
+    def lookup(self, df, keys, range_column=None, valid_on=None):
+        """
+        Finds the row of the mapping sheet that applies to each row of a DataFrame.
+
+        Parameters:
+        df (pd.DataFrame): The rows to look up.
+        keys (list): Columns matched, in order, against the key columns of the sheet.
+        range_column (str): Column looked up in the low/high bands. Required if the sheet has them.
+        valid_on (str): Column looked up in the validity windows. Required if the sheet has them.
+
+        Returns:
+        np.ndarray: Position in self.frame of the matching row, -1 where none matched.
+        """
+        if self.ranged != (range_column is not None) or self.validity != (valid_on is not None):
+            raise ValueError("range_column and valid_on must be given exactly when the mapping sheet has bands or validity dates")
+
+        rows = self._groups(df, keys)
+
+        if self.validity:
+            at = _as_bounds(df[valid_on], self.validity_datetimes)
+            rows = self.windows.find(rows, at)
+            matched = rows >= 0
+            valid_to = self.frame['valid_to'].to_numpy()[np.maximum(rows, 0)]
+            rows = np.where(matched & (pd.isna(valid_to) | (at < valid_to)), rows, -1)
+            if self.ranged:
+                rows = np.where(rows >= 0, self.versions[np.maximum(rows, 0)], -1)
+
+        if self.ranged:
+            values = _as_bounds(df[range_column], self.range_datetimes)
+            rows = self.bands.find(rows, values)
+            high = self.frame['high'].to_numpy()[np.maximum(rows, 0)]
+            rows = np.where((rows >= 0) & (pd.isna(high) | (values < high)), rows, -1)
+
+        if not self.ranged and not self.validity:
+            rows = np.where(rows >= 0, self.row_of_group[np.maximum(rows, 0)], -1)
+
+        return rows
+
+    def map(self, df, keys, range_column=None, valid_on=None):
+        """
+        Maps each row of a DataFrame to the mapped value of its matching row, see lookup.
+
+        Returns:
+        pd.Series: The mapped values, NaN where no row matched, aligned with df.
+        np.ndarray: Boolean mask of the rows that matched.
+        """
+        rows = self.lookup(df, keys, range_column, valid_on)
+        matched = rows >= 0
+        if not len(self.frame):
+            return pd.Series(np.nan, index=df.index, dtype=object), matched
+
+        mapped = self.frame['mapped'].take(np.maximum(rows, 0)).set_axis(df.index)
+        return mapped.where(matched), matched
+
+
+@lru_cache(maxsize=128)
+def _read_mapping_index(mapping_path, sheet_name, mtime, key_count, ranged, validity):
+    # mtime is part of the cache key so an edited workbook is picked up on the next call
+    frame = pd.read_excel(mapping_path, sheet_name=sheet_name, header=None, engine=excel_engine())
+    return MappingIndex(frame, key_count, ranged, validity)
+
+
+def load_mapping_index(sheet_name, mapping_path=DEFAULT_MAPPING_PATH, key_count=1, ranged=False, validity=False):
+    """
+    Loads a mapping sheet as a MappingIndex. Indexes are cached per process, like transform.load_mapping.
+
+    Parameters:
+    sheet_name (str): The sheet of the mapping workbook to read.
+    mapping_path (str): Path of the mapping workbook.
+    key_count (int): Number of key columns in the sheet. Default is 1.
+    ranged (bool): Whether the sheet has low/high band columns. Default is False.
+    validity (bool): Whether the sheet has valid from/valid to columns. Default is False.
+
+    Returns:
+    MappingIndex: The index.
+    """
+    mapping_path = os.path.abspath(mapping_path)
+    return _read_mapping_index(mapping_path, sheet_name, os.path.getmtime(mapping_path), key_count, ranged, validity)
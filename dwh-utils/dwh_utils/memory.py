@@ -0,0 +1,251 @@
+"""
+Memory budget for the DataFrames of a run.
+
+A SpillStore holds named DataFrames and keeps the approximate size of those in
+memory under a budget. When a new frame would exceed it, the least recently
+used frames are evicted: written to a compressed pickle in the spill folder, or
+simply dropped if they can be reloaded from a file that already exists (a run
+checkpoint, a staged file). Evicted frames are reloaded on their next access:
+
+    from dwh_utils.memory import SpillStore
+
+    with SpillStore('2GB', 'stage/ahorro/spill') as store:
+        store['stock'] = big_df
+        store.add_lazy('tienda', lambda: pd.read_parquet('tienda.parquet'))
+        df = store['stock']        # read back from disk if it was evicted
+
+perform_extraction uses it when the extraction config sets "memory_budget",
+and staging.load_staged accepts a memory_budget for the transformation stage.
+A single frame larger than the budget is still held while it is in use.
+"""
+import os
+import re
+import shutil
+import tempfile
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import pandas as pd
+
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+
+
+def parse_size(size):
+    """
+    Convert a memory size to bytes.
+
+    Parameters:
+    size (int or str): A number of bytes, or a string such as '512MB' or '4 GB'.
+
+    Returns:
+    int: The size in bytes.
+    """
+    if isinstance(size, (int, float)):
+        return int(size)
+
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?B?)\s*', size.upper())
+    if not match:
+        raise ValueError(f"Invalid memory size '{size}', expected e.g. '512MB' or '4GB'")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+
+def frame_nbytes(df):
+    """Approximate memory held by a DataFrame, including the Python strings of object columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _spill_compression():
+    # zstd when the optional 'zstandard' package is installed, otherwise fast gzip
+    try:
+        import zstandard  # noqa: F401
+        return {'method': 'zstd', 'level': 1}, '.pkl.zst'
+    except ImportError:
+        return {'method': 'gzip', 'compresslevel': 1}, '.pkl.gz'
+
+
+class SpillStore:
+    """
+    Named DataFrames kept under a memory budget, evicting least recently used ones to disk.
+
+    Parameters:
+    budget (int or str): Memory budget, in bytes or as a size string like '4GB'. None disables eviction.
+    spill_dir (str): Folder for spilled frames, created on the first spill. Defaults to a
+                     temporary folder removed by close().
+    """
+
+    def __init__(self, budget, spill_dir=None):
+        self.budget = None if budget is None else parse_size(budget)
+        self._own_spill_dir = spill_dir is None
+        self.spill_dir = spill_dir
+        self.compression, self.suffix = _spill_compression()
+
+        # key -> DataFrame, in least to most recently used order
+        self._frames = OrderedDict()
+        self._sizes = {}
+        # key -> callable that reloads an evicted frame
+        self._loaders = {}
+        self.nbytes = 0
+        self.spilled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, key):
+        return key in self._loaders
+
+    def __len__(self):
+        return len(self._loaders)
+
+    def __iter__(self):
+        return iter(self._loaders)
+
+    def keys(self):
+        return self._loaders.keys()
+
+    def items(self):
+        """(key, frame) pairs, loading each frame only when its turn comes."""
+        for key in list(self._loaders):
+            yield key, self.get(key)
+
+    def put(self, key, df, loader=None):
+        """
+        Add a frame, evicting others first if it would not fit in the budget.
+
+        Parameters:
+        key (str): The name of the frame.
+        df (pd.DataFrame): The frame.
+        loader (callable): Reloads the frame from a file that already exists, e.g. a checkpoint.
+                           Frames with a loader are dropped on eviction instead of being written.
+        """
+        self.discard(key)
+        size = frame_nbytes(df)
+        self._evict(size)
+
+        self._frames[key] = df
+        self._sizes[key] = size
+        self._loaders[key] = loader
+        self.nbytes += size
+
+    __setitem__ = put
+
+    def add_lazy(self, key, loader):
+        """Register a frame that is only loaded, with loader(), on its first access."""
+        self.discard(key)
+        self._loaders[key] = loader
+
+    def relocate(self, key, loader):
+        """
+        Point a frame at another file it can be reloaded from, e.g. before the file of its current loader is removed.
+
+        Raises:
+        KeyError: If the key is unknown.
+        """
+        if key not in self._loaders:
+            raise KeyError(key)
+        spill_path = self._spill_path(key)
+        if self._loaders[key] is None and spill_path and os.path.exists(spill_path):
+            os.remove(spill_path)
+        self._loaders[key] = loader
+
+    def get(self, key):
+        """
+        Return a frame, reloading it from disk if it was evicted.
+
+        Raises:
+        KeyError: If the key is unknown.
+        """
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return self._frames[key]
+
+        if key not in self._loaders:
+            raise KeyError(key)
+
+        loader = self._loaders[key]
+        if loader is None:
+            df = pd.read_pickle(self._spill_path(key), compression=self.compression)
+        else:
+            df = loader()
+
+        # put() also removes the spill file, the frame is back in memory
+        self.put(key, df, loader)
+        return df
+
+    __getitem__ = get
+
+    def discard(self, key):
+        """Forget a frame, in memory and on disk."""
+        if key in self._frames:
+            del self._frames[key]
+            self.nbytes -= self._sizes.pop(key)
+        spill_path = self._spill_path(key)
+        if self._loaders.pop(key, False) is None and spill_path and os.path.exists(spill_path):
+            os.remove(spill_path)
+
+    def view(self, keys):
+        """A read-only sequence of frames that are fetched from the store one at a time."""
+        return StoreView(self, keys)
+
+    def close(self):
+        """Drop all frames and remove spill files."""
+        self._frames.clear()
+        self._sizes.clear()
+        self._loaders.clear()
+        self.nbytes = 0
+        if self.spill_dir is None or not os.path.isdir(self.spill_dir):
+            return
+        if self._own_spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+        else:
+            for name in os.listdir(self.spill_dir):
+                if name.endswith(self.suffix):
+                    os.remove(os.path.join(self.spill_dir, name))
+
+    def _spill_path(self, key):
+        if self.spill_dir is None:
+            return None
+        return os.path.join(self.spill_dir, re.sub(r'[^\w.-]+', '_', key) + self.suffix)
+
+    def _write_spill(self, key, df):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='dwh_spill_')
+        os.makedirs(self.spill_dir, exist_ok=True)
+        df.to_pickle(self._spill_path(key), compression=self.compression)
+
+    def _evict(self, incoming):
+        if self.budget is None:
+            return
+
+        while self._frames and self.nbytes + incoming > self.budget:
+            key, df = self._frames.popitem(last=False)
+            size = self._sizes.pop(key)
+            self.nbytes -= size
+
+            if self._loaders[key] is None:
+                self._write_spill(key, df)
+                where = f"spilled to {self.spill_dir}"
+            else:
+                where = "will be reloaded from its file"
+            self.spilled += 1
+            print(f"Memory budget reached, evicted {key} ({size / 1024 ** 2:.1f} MB), {where}")
+
+
+class StoreView(Sequence):
+    """A list-like view over frames of a SpillStore, loading each one only when it is accessed."""
+
+    def __init__(self, store, keys):
+        self.store = store
+        self.keys = list(keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self.store.get(key) for key in self.keys[idx]]
+        return self.store.get(self.keys[idx])
@@ -0,0 +1,256 @@
+"""
+Merge many staged or exported files into one, dropping duplicate rows on the way.
+
+Files are read in parallel, in a pool of threads or processes, and each chunk
+is deduplicated against the rows already written through a set of 64-bit row
+hashes. Only the hashes (8 bytes per distinct row) and the files being read are
+held in memory, and the output is written chunk by chunk:
+
+    from dwh_utils.merge import merge_files
+
+    merge_files('tables needed/', 'table_schema.csv', workers=8)
+
+The first occurrence of a row wins, in file order, as with drop_duplicates.
+CSV and Excel values are read as text, so '5' in one file and 5 in another are
+the same row and values such as 'NULL' are kept verbatim. A file that lacks some
+of the columns of the first file is lined up with it before hashing, so its rows
+match those of other files where these columns are empty.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from ._optional import import_optional
+from .lazy import DEFAULT_CHUNKSIZE, list_partitions, read_chunks
+
+
+# Read CSV and Excel cells as they are written instead of guessing types per file
+TEXT_READ_OPTIONS = {'dtype': str, 'keep_default_na': False}
+
+
+class RowHashSet:
+    """
+    A set of uint64 row hashes kept as a few sorted arrays, merged as they grow.
+
+    Membership checks are vectorized binary searches, and an added batch costs
+    O(n log n) however many hashes are already stored.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def add_new(self, hashes):
+        """
+        Add a batch of hashes.
+
+        Returns:
+        np.ndarray: Boolean mask of the hashes that were not seen before (first occurrence within the batch).
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        _, first = np.unique(hashes, return_index=True)
+        is_new = np.zeros(len(hashes), dtype=bool)
+        is_new[first] = True
+
+        for run in self.runs:
+            candidates = np.flatnonzero(is_new)
+            positions = np.minimum(np.searchsorted(run, hashes[candidates]), len(run) - 1)
+            is_new[candidates[run[positions] == hashes[candidates]]] = False
+
+        if is_new.any():
+            self.runs.append(np.sort(hashes[is_new]))
+            # Keep the runs in decreasing size so there are only O(log n) of them
+            while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+                newest = self.runs.pop()
+                self.runs[-1] = np.sort(np.concatenate([self.runs[-1], newest]))
+
+        return is_new
+
+
+def input_files(inputs):
+    """
+    Expand the inputs of merge_files into a list of files.
+
+    Parameters:
+    inputs (str or list): A folder, a glob pattern such as 'dumps/*.csv', a file, or a list of those.
+
+    Returns:
+    list: File paths, in order.
+    """
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+
+    files = []
+    for entry in inputs:
+        entry = os.fspath(entry)
+        if glob.has_magic(entry):
+            matches = sorted(glob.glob(entry))
+            if not matches:
+                raise FileNotFoundError(f"No files match {entry}")
+            files.extend(matches)
+        else:
+            files.extend(list_partitions(entry))
+    return files
+
+
+def _reader_options(path, read_options):
+    # pd.read_csv / pd.read_excel options mean nothing to the other readers
+    if os.path.splitext(path)[1].lower() not in ('.csv', '.xlsx'):
+        return {}
+    return dict(read_options)
+
+
+def _first_columns(path, read_options):
+    """Columns of the first chunk of a file, or None if it has no chunks."""
+    for chunk in read_chunks(path, chunksize=1, **_reader_options(path, read_options)):
+        return list(chunk.columns)
+    return None
+
+
+def _read_file(path, chunksize, subset, read_options, columns=None):
+    """
+    Read a file and hash its rows. Module-level so it can run in a process pool.
+
+    With columns, the chunks are lined up with them before hashing, so a file that lacks a column
+    dedupes against the rows of other files where it is empty. Absent columns are empty text when
+    cells are read verbatim (keep_default_na=False), as an empty CSV cell would be, and NA otherwise.
+    """
+    options = _reader_options(path, read_options)
+    fill = '' if options.get('keep_default_na', True) is False else np.nan
+
+    chunks = []
+    for chunk in read_chunks(path, chunksize=chunksize, **options):
+        if columns is not None:
+            extra = [column for column in chunk.columns if column not in columns]
+            if extra:
+                raise ValueError(f"{path} has column(s) {', '.join(map(str, extra))} not in the first file")
+            chunk = chunk.reindex(columns=columns, fill_value=fill)
+        if subset is not None:
+            missing = [column for column in subset if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"{path} has no column(s) {', '.join(missing)}")
+        # Columns in a fixed order, so files that list them differently still hash rows the same
+        key_columns = sorted(chunk.columns, key=str) if subset is None else subset
+        hashes = pd.util.hash_pandas_object(chunk[key_columns], index=False)
+        chunks.append((chunk, hashes.to_numpy(dtype=np.uint64)))
+    return path, chunks
+
+
+def _ordered_results(executor, files, window, *args):
+    # Like executor.map, but with at most `window` files in flight so memory stays bounded
+    pending = deque()
+    for path in files:
+        pending.append(executor.submit(_read_file, path, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class _Writer:
+    """
+    Incremental CSV or Parquet writer with the column order of the first chunk.
+
+    Chunks go to '<path>.partial', which only replaces path when the writer is
+    closed with commit=True, so a failed merge never leaves a truncated output.
+    """
+
+    def __init__(self, path, to_csv_options):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.to_csv_options = to_csv_options
+        self.columns = None
+        self.parquet_writer = None
+
+    def write(self, chunk, source):
+        first = self.columns is None
+        if first:
+            self.columns = list(chunk.columns)
+        else:
+            extra = [column for column in chunk.columns if column not in self.columns]
+            if extra:
+                raise ValueError(f"{source} has column(s) {', '.join(map(str, extra))} not in the first file")
+            chunk = chunk.reindex(columns=self.columns)
+
+        if self.path.lower().endswith('.parquet'):
+            pa = import_optional('pyarrow')
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self.parquet_writer is None:
+                self.parquet_writer = import_optional('pyarrow.parquet').ParquetWriter(self.partial_path, table.schema)
+            self.parquet_writer.write_table(table.cast(self.parquet_writer.schema))
+        else:
+            chunk.to_csv(self.partial_path, mode='w' if first else 'a', header=first, index=False, **self.to_csv_options)
+
+    def close(self, commit):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if not os.path.exists(self.partial_path):
+            return
+        if commit:
+            os.replace(self.partial_path, self.path)
+        else:
+            os.remove(self.partial_path)
+
+
+def merge_files(inputs, output, dedup=True, subset=None, workers=4, use_processes=False,
+                chunksize=DEFAULT_CHUNKSIZE, read_options=None, **to_csv_options):
+    """
+    Merges CSV, Excel and other staged files into one CSV or Parquet file, dropping duplicate rows.
+
+    Parameters:
+    inputs (str or list): A folder, a glob pattern, a file, or a list of those. See input_files.
+    output (str): The output file. Parquet if it ends in .parquet, CSV otherwise.
+    dedup (bool): Whether to drop rows already written. Default is True.
+    subset (list): Columns that identify a duplicate. Defaults to all columns.
+    workers (int): Files read at the same time. Default is 4.
+    use_processes (bool): Read in worker processes instead of threads, worth it for many Excel files
+                          since their parsing holds the GIL. Default is False.
+    chunksize (int): Rows per chunk for CSV files.
+    read_options (dict): Options for pd.read_csv / pd.read_excel. Defaults to TEXT_READ_OPTIONS.
+    **to_csv_options: Passed on to DataFrame.to_csv, e.g. sep=';'.
+
+    Raises:
+    ValueError: If a file has columns the first file does not have, or lacks a subset column.
+                The output is then left as it was.
+
+    Returns:
+    tuple: (rows read, rows written).
+    """
+    # The output may live in the input folder, e.g. when re-running a merge
+    files = [path for path in input_files(inputs) if os.path.abspath(path) != os.path.abspath(output)]
+    read_options = TEXT_READ_OPTIONS if read_options is None else read_options
+    seen = RowHashSet() if dedup else None
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    writer = _Writer(output, to_csv_options)
+    rows_read = rows_written = 0
+
+    # Every file is lined up with the columns of the first one before its rows are hashed
+    columns = _first_columns(files[0], read_options) if files else None
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    merged = False
+    try:
+        with executor_class(max_workers=workers) as executor:
+            for path, chunks in _ordered_results(executor, files, 2 * workers, chunksize, subset, read_options, columns):
+                for chunk, hashes in chunks:
+                    rows_read += len(chunk)
+                    if seen is not None:
+                        chunk = chunk[seen.add_new(hashes)]
+                    if len(chunk) or writer.columns is None:
+                        writer.write(chunk, path)
+                        rows_written += len(chunk)
+        merged = True
+    finally:
+        # An existing output is only replaced by a complete merge
+        writer.close(commit=merged)
+
+    print(f"Merged {len(files)} files into {output}: {rows_read} rows read, {rows_written} written")
+
+    return rows_read, rows_written
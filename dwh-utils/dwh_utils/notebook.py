@@ -0,0 +1,27 @@
+import sys
+
+
+def is_notebook():
+    """Check if the code is running in a Jupyter notebook."""
+    # IPython is never imported here: if nothing has loaded it yet we cannot be inside a kernel.
+    ipython = sys.modules.get('IPython')
+    if ipython is None:
+        return False
+
+    shell = ipython.get_ipython()
+    return shell is not None and shell.__class__.__name__ == 'ZMQInteractiveShell'
+
+
+def get_notebook_filename():
+    """
+    Helper function to get the notebook filename in a Jupyter environment.
+    Returns None if not in a Jupyter notebook.
+    """
+    ipython = sys.modules.get('IPython')
+    if ipython is None:
+        return None
+
+    try:
+        return ipython.get_ipython().ev('__file__')
+    except (AttributeError, NameError):
+        return None
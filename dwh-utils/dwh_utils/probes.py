@@ -0,0 +1,152 @@
+"""
+Cheap source-side change probes for MySQL tables.
+
+Before a full SELECT * pull, a probe asks the server for a small fingerprint of
+the table. If it matches the fingerprint stored by the previous run, the
+previous extract is reused and the table is not transferred again.
+
+Probe methods, set per sql source with "change_probe":
+- "update_time": information_schema.TABLES.UPDATE_TIME. Free, but UPDATE_TIME can be NULL
+  (e.g. InnoDB after a server restart); the table is then always extracted. MySQL 8 caches it for
+  information_schema_stats_expiry seconds (a day by default), so the probe turns the cache off for
+  its session. TABLE_ROWS is not used: it is an InnoDB estimate that drifts on its own.
+  UPDATE_TIME has a resolution of one second: a write later in the same second as the probe
+  would leave it unchanged, so a table written to in the probe's own second is reported as
+  unknown and extracted in full.
+- "checksum": CHECKSUM TABLE. Exact, but reads the whole table on the server side.
+- "fingerprint": COUNT(*) plus MAX(<probe_column>), e.g. an updated_at column. probe_column is
+  required, since COUNT(*) alone misses updates.
+"""
+import os
+import json
+
+import pandas as pd
+
+from ._optional import import_optional
+from .connections import get_mysql_connection
+from .staging import write_json_atomic
+
+
+PROBE_METHODS = ("update_time", "checksum", "fingerprint")
+
+
+def _fetchone(conn, query, params=()):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params)
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def _execute(conn, query):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query)
+    finally:
+        cursor.close()
+
+
+def probe_mysql_table(host, username, password, database, table, method="update_time", probe_column=None):
+    """
+    Compute a change fingerprint of a MySQL table.
+
+    Parameters:
+    - host, username, password, database (str): Connection details, as for download_from_mysql.
+    - table (str): The table to probe.
+    - method (str): One of 'update_time', 'checksum' or 'fingerprint'.
+    - probe_column (str): Column whose MAX() is part of the 'fingerprint' method, required by it.
+
+    Returns:
+    str: The fingerprint, or None if the server cannot tell (the table must then be extracted).
+    """
+    if method not in PROBE_METHODS:
+        raise ValueError(f"Unknown change probe '{method}', expected one of {', '.join(PROBE_METHODS)}")
+    if method == "fingerprint" and not probe_column:
+        raise ValueError("The 'fingerprint' change probe needs a probe_column")
+
+    mysql = import_optional('mysql.connector')
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+        try:
+            if method == "update_time":
+                try:
+                    # Read the current statistics rather than MySQL 8's cached copy
+                    _execute(conn, "SET SESSION information_schema_stats_expiry = 0")
+                except mysql.Error:
+                    pass  # MySQL 5.7 and MariaDB have no such cache
+                # NOW() has no fractional seconds: UPDATE_TIME >= NOW() means it is the probe's own second
+                row = _fetchone(conn,
+                    "SELECT UPDATE_TIME, UPDATE_TIME >= NOW() FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                    (database, table))
+                if row is None or row[0] is None or row[1]:
+                    return None
+                row = row[:1]
+
+            elif method == "checksum":
+                row = _fetchone(conn, f"CHECKSUM TABLE {table}")
+                if row is None or row[1] is None:
+                    return None
+                row = row[1:]
+
+            else:
+                row = _fetchone(conn, f"SELECT COUNT(*), MAX({probe_column}) FROM {table}")
+        finally:
+            conn.close()
+
+    except mysql.Error as e:
+        print(f"Change probe on {database}.{table} failed, extracting it in full: {e}")
+        return None
+
+    return json.dumps([method, *row], default=str)
+
+
+class ProbeStore:
+    """
+    Last known fingerprint and extract of each probed table of a pipeline.
+
+    Stored in <staging_path>/<pipeline>/probes/: probes.json with the fingerprints,
+    and one <host>_<database>.<table>.pkl per table with the extract that matches it.
+    """
+
+    def __init__(self, pipeline, staging_path=''):
+        self.probe_dir = os.path.join(os.path.abspath(staging_path), pipeline, 'probes')
+        os.makedirs(self.probe_dir, exist_ok=True)
+
+        self.state_path = os.path.join(self.probe_dir, 'probes.json')
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as file:
+                self.state = json.load(file)
+        else:
+            self.state = {}
+
+    @staticmethod
+    def key(options):
+        return f"{options['host']}_{options['database']}.{options['table']}"
+
+    def lookup(self, options, fingerprint):
+        """
+        Return the stored extract if the table still has the given fingerprint, else None.
+        """
+        entry = self.state.get(self.key(options))
+        if fingerprint is None or entry is None or entry['fingerprint'] != fingerprint:
+            return None
+
+        path = os.path.join(self.probe_dir, entry['file'])
+        if not os.path.exists(path):
+            return None
+        return pd.read_pickle(path)
+
+    def remember(self, options, fingerprint, df):
+        """Store an extract together with the fingerprint taken before it was pulled."""
+        if fingerprint is None:
+            return
+
+        key = self.key(options)
+        file_name = f"{key}.pkl"
+        df.to_pickle(os.path.join(self.probe_dir, file_name))
+
+        self.state[key] = {'fingerprint': fingerprint, 'file': file_name, 'rows': len(df)}
+        write_json_atomic(self.state_path, self.state)
@@ -0,0 +1,220 @@
+"""
+Slowly-changing-dimension (type 2) merge.
+
+scd2_merge compares an incoming dimension snapshot with the current dimension
+and returns only the operations needed to bring it up to date:
+
+- expire: surrogate keys of current versions to close (valid_to, is_current = 0),
+- insert: new versions with fresh surrogate keys.
+
+Business keys are matched through a hash index and attributes are compared by
+a 64-bit row hash, so the work is vectorized and the write volume is
+proportional to the number of changes. The hash is stored in the dimension
+(row_hash column, a signed BIGINT) so later merges compare against it without rehashing
+history. Pass the result to load.apply_scd2_to_mysql to write it.
+"""
+import decimal
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Names of the SCD2 housekeeping columns in the dimension table
+Scd2Columns = namedtuple('Scd2Columns', ['surrogate_key', 'valid_from', 'valid_to', 'is_current', 'row_hash'])
+DEFAULT_COLUMNS = Scd2Columns('sk', 'valid_from', 'valid_to', 'is_current', 'row_hash')
+
+# expire: DataFrame [surrogate_key, valid_to]; insert: DataFrame of new versions;
+# unchanged: number of incoming rows that matched their current version.
+Scd2Changes = namedtuple('Scd2Changes', ['expire', 'insert', 'unchanged', 'columns'])
+
+
+# Enough digits for any DECIMAL(65, 30) value, so normalizing never rounds
+_DECIMAL_CONTEXT = decimal.Context(prec=100)
+
+
+def _number_text(value):
+    """Exact text of a number, the same for 3, 3.0 and Decimal('3.00'): '3'."""
+    if isinstance(value, np.integer):
+        value = int(value)
+    elif isinstance(value, (float, np.floating)):
+        # Shortest text that reads back as the same float, so 0.1 matches Decimal('0.10')
+        value = repr(float(value))
+    return format(decimal.Decimal(value).normalize(_DECIMAL_CONTEXT), 'f')
+
+
+def _canonical(series):
+    """
+    The values of a column as text that does not depend on where they were read from.
+
+    The same dimension comes back from MySQL with other dtypes than the incoming
+    frame has: DECIMAL as Decimal objects, DATE as datetime.date, integers with
+    NULLs as floats, all-NULL columns as None objects. Every column becomes an
+    object column of exact text (see _number_text; integers are never rounded
+    through float64), with None for every kind of missing value.
+    """
+    missing = series.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        text = series.astype('Int64').astype(str).to_numpy(dtype=object)
+    elif pd.api.types.is_float_dtype(series):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        # Integral floats, e.g. an INT column with NULLs, hash like the integers
+        integral = np.isfinite(values) & (values == np.trunc(values)) & (np.abs(values) < 2 ** 63)
+        text = np.empty(len(values), dtype=object)
+        text[integral] = values[integral].astype(np.int64).astype(str)
+        rest = ~integral & ~missing
+        text[rest] = [_number_text(value) for value in values[rest]]
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        text = series.dt.strftime('%Y-%m-%d %H:%M:%S.%f').to_numpy(dtype=object)
+    else:
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in ('integer', 'floating', 'decimal', 'mixed-integer-float', 'boolean'):
+            text = series.map(_number_text, na_action='ignore').to_numpy(dtype=object)
+        elif kind in ('date', 'datetime', 'datetime64'):
+            text = pd.to_datetime(series, errors='coerce').dt.strftime('%Y-%m-%d %H:%M:%S.%f').to_numpy(dtype=object)
+        else:
+            text = series.map(str, na_action='ignore').to_numpy(dtype=object)
+
+    text = np.array(text, dtype=object)
+    text[missing] = None
+    return pd.Series(text, index=series.index, dtype=object)
+
+
+def row_hash(df, columns):
+    """
+    64-bit hash of the given columns of every row, computed vectorized.
+
+    Columns are normalized first (see _canonical), so a row hashes the same
+    whether it comes from the incoming frame or from the dimension table.
+
+    Returns:
+    np.ndarray: int64 hashes, one per row. They are signed so they fit a BIGINT column.
+    """
+    canonical = pd.DataFrame({column: _canonical(df[column]) for column in columns}, index=df.index)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype='uint64').view('int64')
+
+
+def _stored_hash(live, column, attributes):
+    """
+    The stored row hashes of the current rows as int64, hashing the rows that have none.
+
+    Rows loaded before the row_hash column existed hold NULL. A column with NULLs read back as
+    float64 cannot hold 64-bit hashes exactly, so all of its rows are hashed again.
+    """
+    if column not in live.columns:
+        return row_hash(live, attributes)
+
+    stored = live[column]
+    missing = stored.isna().to_numpy()
+    if missing.all() or pd.api.types.is_float_dtype(stored):
+        return row_hash(live, attributes)
+
+    known = stored[~missing].to_numpy(dtype=getattr(stored.dtype, 'numpy_dtype', None))
+    live_hash = np.empty(len(live), dtype='int64')
+    # Dimensions written before the hash was stored signed hold it as uint64
+    live_hash[~missing] = known.view('int64') if known.dtype == 'uint64' else known.astype('int64')
+    if missing.any():
+        live_hash[missing] = row_hash(live[missing], attributes)
+    return live_hash
+
+
+def _key_index(df, business_keys):
+    if len(business_keys) == 1:
+        return pd.Index(df[business_keys[0]])
+    return pd.MultiIndex.from_frame(df[business_keys])
+
+
+def scd2_merge(incoming, current, business_keys, attributes=None, effective_date=None, expire_missing=False, columns=DEFAULT_COLUMNS):
+    """
+    Computes the type 2 changes between an incoming dimension snapshot and the current dimension.
+
+    Parameters:
+    incoming (pd.DataFrame): The new state of the dimension, one row per business key.
+    current (pd.DataFrame): The dimension as stored, with the SCD2 columns. May contain history;
+                            only rows with is_current = 1 are compared.
+    business_keys (str or list): Column(s) identifying a dimension member.
+    attributes (list): Columns whose changes create a new version. Defaults to every
+                       incoming column that is not a business key or an SCD2 column.
+    effective_date: valid_from of the new versions and valid_to of the expired ones. Defaults to today.
+    expire_missing (bool): Whether to expire current members absent from the incoming snapshot.
+                           Use it only when incoming is a full snapshot. Default is False.
+    columns (Scd2Columns): Names of the SCD2 columns.
+
+    Raises:
+    ValueError: If business keys are duplicated in incoming or among the current rows.
+
+    Returns:
+    Scd2Changes: The expire and insert operations.
+    """
+    if isinstance(business_keys, str):
+        business_keys = [business_keys]
+    if attributes is None:
+        attributes = [c for c in incoming.columns if c not in business_keys and c not in columns]
+    if effective_date is None:
+        effective_date = pd.Timestamp.today().normalize()
+
+    if incoming.duplicated(business_keys).any():
+        raise ValueError(f"Incoming dimension has duplicated business keys {business_keys}")
+
+    if columns.is_current in current.columns:
+        live = current[current[columns.is_current] == 1]
+    else:
+        live = current
+
+    live_index = _key_index(live, business_keys)
+    if not live_index.is_unique:
+        raise ValueError(f"Current dimension has more than one current version for some business keys {business_keys}")
+
+    incoming_hash = row_hash(incoming, attributes)
+    live_hash = _stored_hash(live, columns.row_hash, attributes)
+
+    # Position of each incoming key among the current rows, -1 for new members
+    positions = live_index.get_indexer(_key_index(incoming, business_keys))
+    is_new = positions == -1
+
+    is_changed = np.zeros(len(incoming), dtype=bool)
+    is_changed[~is_new] = incoming_hash[~is_new] != live_hash[positions[~is_new]]
+
+    expire_positions = positions[is_changed]
+    if expire_missing:
+        seen = np.zeros(len(live), dtype=bool)
+        seen[positions[~is_new]] = True
+        expire_positions = np.concatenate([expire_positions, np.flatnonzero(~seen)])
+
+    expire = pd.DataFrame({
+        columns.surrogate_key: live[columns.surrogate_key].to_numpy()[expire_positions],
+        columns.valid_to: effective_date,
+    })
+
+    insert_mask = is_new | is_changed
+    next_key = int(current[columns.surrogate_key].max()) + 1 if len(current) else 1
+
+    insert = incoming.loc[insert_mask].copy()
+    insert[columns.surrogate_key] = np.arange(next_key, next_key + len(insert), dtype='int64')
+    insert[columns.valid_from] = effective_date
+    insert[columns.valid_to] = None
+    insert[columns.is_current] = 1
+    insert[columns.row_hash] = incoming_hash[insert_mask]
+
+    return Scd2Changes(expire, insert.reset_index(drop=True), int((~insert_mask).sum()), columns)
+
+
+def apply_scd2_in_memory(current, changes):
+    """
+    Applies SCD2 changes to an in-memory dimension, e.g. one kept as a staged file.
+
+    Returns:
+    pd.DataFrame: The updated dimension, history included.
+    """
+    columns = changes.columns
+    updated = current.copy()
+
+    valid_to = changes.expire.set_index(columns.surrogate_key)[columns.valid_to]
+    expired = updated[columns.surrogate_key].isin(valid_to.index)
+
+    if expired.any():
+        updated[columns.valid_to] = updated[columns.valid_to].astype(object)
+        updated.loc[expired, columns.valid_to] = updated.loc[expired, columns.surrogate_key].map(valid_to)
+        updated.loc[expired, columns.is_current] = 0
+
+    return pd.concat([updated, changes.insert], ignore_index=True)
@@ -0,0 +1,805 @@
+"""
+Target table schemas: inference, DDL and a registry used by the loader.
+
+A schema is derived from the data itself, so every column gets the smallest
+exact MySQL type that holds it (TINYINT..BIGINT from the value range,
+DECIMAL(p,s) from the digits actually used, VARCHAR(n) from the longest
+value), plus primary key and index hints from id-like column names:
+
+    from dwh_utils import schema, staging
+
+    extracted = staging.load_staged('ahorro', '../../s3/staging')
+    table_schema = schema.infer_schema(extracted['sql_0'], 'ahorro')
+    print(schema.create_table_sql(table_schema))
+
+Large inputs can be inferred chunk by chunk (e.g. LazyTable.iter_chunks()),
+and MySQL sources from cursor.description (see schema_from_description).
+
+Schemas registered in a SchemaRegistry are widened, never narrowed, by later
+runs. load.load_to_mysql takes a schema or a registry, creates the table if
+asked to and converts every column to its target type before the rows are
+sent (see coerce_frame), so the server does no implicit conversions. An
+existing table that no longer fits its widened schema is reported with the
+ALTER TABLE it needs, which only runs with migrate=True.
+"""
+import os
+import re
+import json
+import decimal
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from ._optional import import_optional
+from .config import DEFAULT_SCHEMA_FOLDER
+from .connections import decode_text, get_mysql_connection
+from .merge import RowHashSet
+from .staging import load_staged, write_json_atomic
+
+
+# sql_type: MySQL column type, e.g. 'VARCHAR(40)'; nullable: whether NULLs were seen (or are allowed)
+ColumnSpec = namedtuple('ColumnSpec', ['name', 'sql_type', 'nullable'])
+
+# columns: tuple of ColumnSpec in table order; primary_key: tuple of column names, possibly empty;
+# indexes: tuple of column names that get a secondary index (foreign key hints)
+TableSchema = namedtuple('TableSchema', ['table', 'columns', 'primary_key', 'indexes'])
+
+# Integer types from smallest to largest, with their signed range and display digits
+INT_TYPES = (
+    ('TINYINT', -2 ** 7, 2 ** 7 - 1, 3),
+    ('SMALLINT', -2 ** 15, 2 ** 15 - 1, 5),
+    ('MEDIUMINT', -2 ** 23, 2 ** 23 - 1, 7),
+    ('INT', -2 ** 31, 2 ** 31 - 1, 10),
+    ('BIGINT', -2 ** 63, 2 ** 63 - 1, 19),
+)
+_INT_RANK = {name: rank for rank, (name, _, _, _) in enumerate(INT_TYPES)}
+
+# Text types with their maximum length in characters. VARCHAR is capped far below the 65,535 byte row size
+# (4 bytes per character in utf8mb4), so a table with several wide columns still fits; longer text is TEXT
+TEXT_TYPES = (('VARCHAR', 1024), ('TEXT', 16383), ('MEDIUMTEXT', 2 ** 24 - 1), ('LONGTEXT', 2 ** 32 - 1))
+_TEXT_RANK = {name: rank for rank, (name, _) in enumerate(TEXT_TYPES)}
+
+MAX_DECIMAL_PRECISION = 65
+# Enough precision to round any DECIMAL value exactly
+_DECIMAL_CONTEXT = decimal.Context(prec=MAX_DECIMAL_PRECISION + 2)
+# Floats with more decimals than this are stored as DOUBLE
+MAX_DECIMAL_SCALE = 6
+# Type of columns without a single non-null value
+DEFAULT_TYPE = 'VARCHAR(255)'
+
+# Width of a value of each non-text type once written as text, used when a column mixes text and numbers
+_DISPLAY_WIDTHS = {'DOUBLE': 24, 'FLOAT': 24, 'DATE': 10, 'DATETIME': 26, 'TIME': 16, 'JSON': 16383}
+
+# Types of cursor.description codes (MySQL protocol field types), used when there is no data to size them
+_FIELD_TYPES = {
+    0: 'DECIMAL(38,10)', 1: 'TINYINT', 2: 'SMALLINT', 3: 'INT', 4: 'DOUBLE', 5: 'DOUBLE', 7: 'DATETIME',
+    8: 'BIGINT', 9: 'MEDIUMINT', 10: 'DATE', 11: 'TIME', 12: 'DATETIME', 13: 'SMALLINT', 14: 'DATE',
+    15: DEFAULT_TYPE, 16: 'BIGINT', 245: 'JSON', 246: 'DECIMAL(38,10)', 247: DEFAULT_TYPE, 248: DEFAULT_TYPE,
+    249: 'TEXT', 250: 'MEDIUMTEXT', 251: 'LONGTEXT', 252: 'TEXT', 253: DEFAULT_TYPE, 254: DEFAULT_TYPE,
+}
+# Column flags of cursor.description (mysql.connector.constants.FieldFlag)
+_NOT_NULL_FLAG, _PRI_KEY_FLAG, _UNIQUE_KEY_FLAG, _MULTIPLE_KEY_FLAG, _UNSIGNED_FLAG = 1, 2, 4, 8, 32
+
+_TYPE_PATTERN = re.compile(r'^\s*(\w+)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?\s*(UNSIGNED)?', re.IGNORECASE)
+
+
+def parse_type(sql_type):
+    """
+    Split a MySQL column type into its parts.
+
+    Returns:
+    tuple: (name, size, scale, unsigned), e.g. ('DECIMAL', 10, 2, False) for 'DECIMAL(10,2)'.
+    """
+    match = _TYPE_PATTERN.match(sql_type)
+    if match is None:
+        raise ValueError(f"Cannot parse column type '{sql_type}'")
+    name, size, scale, unsigned = match.groups()
+    return name.upper(), int(size) if size else None, int(scale) if scale else 0, bool(unsigned)
+
+
+def _int_type(low, high):
+    for name, min_value, max_value, _ in INT_TYPES:
+        if min_value <= low and high <= max_value:
+            return name
+    digits = len(str(max(abs(int(low)), abs(int(high)))))
+    return f"DECIMAL({digits},0)" if digits <= MAX_DECIMAL_PRECISION else 'DOUBLE'
+
+
+def _decimal_type(int_digits, scale):
+    if int_digits + scale > MAX_DECIMAL_PRECISION:
+        return 'DOUBLE'
+    return f"DECIMAL({max(int_digits + scale, 1)},{scale})"
+
+
+def _text_type(length):
+    length = int(length)
+    for name, max_length in TEXT_TYPES:
+        if length <= max_length:
+            return f"VARCHAR({max(length, 1)})" if name == 'VARCHAR' else name
+    return 'LONGTEXT'
+
+
+def _int_digits(max_abs):
+    return len(str(int(max_abs))) if max_abs >= 1 else 0
+
+
+def _float_type(values):
+    """Smallest exact type of float values: an integer type, DECIMAL(p,s) up to MAX_DECIMAL_SCALE, or DOUBLE."""
+    values = np.asarray(values, dtype='float64')
+    if not np.isfinite(values).all():
+        return 'DOUBLE'
+
+    magnitude = np.abs(values)
+    for scale in range(MAX_DECIMAL_SCALE + 1):
+        scaled = values * 10 ** scale
+        # Relative tolerance absorbs binary representation error, e.g. 1.15 * 100 = 114.99999999999999
+        if np.all(np.abs(scaled - np.rint(scaled)) <= 1e-9 * np.maximum(1, np.abs(scaled))):
+            if scale == 0 and magnitude.max() < 2 ** 63:
+                return _int_type(int(values.min()), int(values.max()))
+            return _decimal_type(_int_digits(magnitude.max()), scale)
+    return 'DOUBLE'
+
+
+def _decimal_objects_type(values):
+    """Type of decimal.Decimal values (as returned by MySQL for DECIMAL columns), from their digits."""
+    int_digits = scale = 0
+    for value in values:
+        sign, digits, exponent = value.as_tuple()
+        if not isinstance(exponent, int):
+            return 'DOUBLE'
+        scale = max(scale, -exponent)
+        int_digits = max(int_digits, len(digits) + exponent)
+    return _decimal_type(int_digits, scale)
+
+
+def _datetime_type(values):
+    values = pd.to_datetime(values)
+    if values.dt.tz is None and (values == values.dt.normalize()).all():
+        return 'DATE'
+    return 'DATETIME'
+
+
+def infer_type(series):
+    """
+    Smallest exact MySQL type of a column.
+
+    Parameters:
+    series (pd.Series): The column.
+
+    Returns:
+    str: The type, or None if the column has no non-null value.
+    """
+    values = series.dropna()
+    if values.empty:
+        return None
+
+    if pd.api.types.is_bool_dtype(values):
+        return 'TINYINT(1)'
+    if pd.api.types.is_integer_dtype(values):
+        return _int_type(int(values.min()), int(values.max()))
+    if pd.api.types.is_float_dtype(values):
+        return _float_type(values.to_numpy(dtype='float64'))
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return _datetime_type(values)
+    if pd.api.types.is_timedelta64_dtype(values):
+        return 'TIME'
+
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind == 'string':
+        return _text_type(values.str.len().max())
+    if kind == 'boolean':
+        return 'TINYINT(1)'
+    if kind == 'integer':
+        return _int_type(min(values), max(values))
+    if kind in ('floating', 'mixed-integer-float'):
+        return _float_type(values.astype('float64'))
+    if kind == 'decimal':
+        return _decimal_objects_type(values)
+    if kind in ('datetime', 'datetime64', 'date'):
+        return _datetime_type(values)
+    if kind == 'time':
+        return 'TIME'
+    # Mixed or unknown objects are written as their text
+    return _text_type(values.astype(str).str.len().max())
+
+
+def _display_width(sql_type):
+    name, size, scale, _ = parse_type(sql_type)
+    if name in _INT_RANK:
+        return INT_TYPES[_INT_RANK[name]][3] + 1
+    if name == 'DECIMAL':
+        return (size or 10) + 2
+    if name in _TEXT_RANK:
+        return size or TEXT_TYPES[_TEXT_RANK[name]][1]
+    return _DISPLAY_WIDTHS.get(name, 255)
+
+
+def widen_type(a, b):
+    """
+    Smallest type that holds the values of both types, e.g. SMALLINT and DECIMAL(6,2) give DECIMAL(7,2).
+
+    None stands for "no values seen" and is ignored.
+
+    Returns:
+    str: The combined type.
+    """
+    if a is None or b is None:
+        return a if b is None else b
+    if a == b:
+        return a
+
+    name_a, size_a, scale_a, unsigned_a = parse_type(a)
+    name_b, size_b, scale_b, unsigned_b = parse_type(b)
+
+    if name_a in _INT_RANK and name_b in _INT_RANK:
+        rank = max(_INT_RANK[name_a], _INT_RANK[name_b])
+        # An unsigned type holds twice the positive range, so go one size up unless both are unsigned
+        if unsigned_a != unsigned_b and rank < len(INT_TYPES) - 1:
+            rank += 1
+        return INT_TYPES[rank][0] + (' UNSIGNED' if unsigned_a and unsigned_b else '')
+
+    numeric = set(_INT_RANK) | {'DECIMAL'}
+    if name_a in numeric and name_b in numeric:
+        digits = lambda name, size, scale: INT_TYPES[_INT_RANK[name]][3] if name in _INT_RANK else size - scale
+        return _decimal_type(max(digits(name_a, size_a, scale_a), digits(name_b, size_b, scale_b)), max(scale_a, scale_b))
+
+    if name_a in numeric | {'DOUBLE', 'FLOAT'} and name_b in numeric | {'DOUBLE', 'FLOAT'}:
+        return 'DOUBLE'
+    if {name_a, name_b} == {'DATE', 'DATETIME'}:
+        return 'DATETIME'
+
+    # Anything else mixes text with other values: a text type wide enough for both
+    return _text_type(max(_display_width(a), _display_width(b)))
+
+
+def _family(sql_type):
+    name = parse_type(sql_type)[0]
+    if name in _INT_RANK or name == 'DECIMAL':
+        return 'exact'
+    if name in _TEXT_RANK:
+        return 'text'
+    return name
+
+
+def _is_id_like(name):
+    name = str(name).lower()
+    return name == 'id' or name.startswith('id_') or name.endswith('_id')
+
+
+def _key_candidates(columns, table):
+    """id-like columns, the likeliest primary keys (id, id_<table>, <table>_id) first."""
+    preferred = ['id', f"id_{table}".lower(), f"{table}_id".lower()]
+    candidates = [column for column in columns if _is_id_like(column)]
+    return sorted(candidates, key=lambda column: preferred.index(str(column).lower())
+                  if str(column).lower() in preferred else len(preferred))
+
+
+def infer_schema(data, table, primary_key=None, indexes=None):
+    """
+    Infers the target schema of a table from its data.
+
+    Without an explicit primary key, the first id-like column (id, id_<table>, <table>_id,
+    then other id_*/*_id columns) that is unique and never null is taken. The other
+    id-like columns are indexed, since they usually hold foreign keys.
+
+    Parameters:
+    data (pd.DataFrame or iterable): The data, or an iterable of DataFrame chunks with the same columns.
+    table (str): The target table name.
+    primary_key (list): Primary key columns. Inferred if not given; pass [] for none.
+    indexes (list): Columns to index. Inferred if not given.
+
+    Returns:
+    TableSchema: The schema.
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+
+    columns = None
+    types = {}
+    nullable = {}
+    seen = {}
+
+    for chunk in chunks:
+        if columns is None:
+            columns = list(chunk.columns)
+            candidates = _key_candidates(columns, table) if primary_key is None else []
+            seen = {column: RowHashSet() for column in candidates}
+
+        for column in columns:
+            series = chunk[column]
+            types[column] = widen_type(types.get(column), infer_type(series))
+            nullable[column] = nullable.get(column, False) or bool(series.isna().any())
+
+        # Track uniqueness of the key candidates across chunks through their value hashes
+        for column in list(seen):
+            if nullable[column]:
+                del seen[column]
+                continue
+            hashes = pd.util.hash_pandas_object(chunk[column], index=False).to_numpy()
+            if not seen[column].add_new(hashes).all():
+                del seen[column]
+
+    if columns is None:
+        raise ValueError(f"No data to infer the schema of {table} from")
+
+    if primary_key is None:
+        unique = [column for column in _key_candidates(columns, table) if column in seen]
+        primary_key = unique[:1]
+    if indexes is None:
+        indexes = [column for column in columns if _is_id_like(column) and column not in primary_key]
+
+    specs = tuple(ColumnSpec(column, types[column] or DEFAULT_TYPE, nullable[column] and column not in primary_key)
+                  for column in columns)
+    return TableSchema(table, specs, tuple(primary_key), tuple(indexes))
+
+
+def schema_from_description(description, table, data=None):
+    """
+    Builds a schema from a DB-API cursor.description of a MySQL query.
+
+    Nullability and key flags come from the description. mysql.connector does not
+    report column sizes, so types are sized from the fetched data when it is given,
+    and the generic type of each column family is used otherwise.
+
+    Parameters:
+    description (list): cursor.description after executing the query.
+    table (str): The target table name.
+    data (pd.DataFrame): The rows fetched by the query, to size the types.
+
+    Returns:
+    TableSchema: The schema.
+    """
+    specs = []
+    primary_key = []
+    indexes = []
+
+    for entry in description:
+        name, type_code = entry[0], entry[1]
+        flags = entry[7] if len(entry) > 7 and entry[7] is not None else 0
+
+        sql_type = _FIELD_TYPES.get(type_code, DEFAULT_TYPE)
+        if flags & _UNSIGNED_FLAG and sql_type in _INT_RANK:
+            sql_type += ' UNSIGNED'
+        if data is not None and name in data.columns:
+            inferred = infer_type(data[name])
+            # Size from the data, but keep the declared family, e.g. a DATETIME with only midnights stays DATETIME
+            if inferred is not None and _family(inferred) == _family(sql_type):
+                sql_type = inferred
+
+        if flags:
+            nullable = not flags & _NOT_NULL_FLAG
+        else:
+            nullable = bool(entry[6]) if len(entry) > 6 and entry[6] is not None else True
+        specs.append(ColumnSpec(name, sql_type, nullable))
+
+        if flags & _PRI_KEY_FLAG:
+            primary_key.append(name)
+        elif flags & (_UNIQUE_KEY_FLAG | _MULTIPLE_KEY_FLAG):
+            indexes.append(name)
+
+    return TableSchema(table, tuple(specs), tuple(primary_key), tuple(indexes))
+
+
+def infer_staged_schemas(pipeline, staging_path='', run_id=None, registry=None):
+    """
+    Infers the schema of every source of a staged extraction run, one table per source.
+
+    Parameters:
+    pipeline (str): The pipeline name, e.g. 'ahorro'.
+    staging_path (str): The root staging folder, the "output_excel_path" of the extraction config.
+    run_id (str): The run to read. Defaults to the most recently staged one.
+    registry (SchemaRegistry): If given, every schema is registered (and widened) in it.
+
+    Returns:
+    dict: Source name -> TableSchema, with tables named <pipeline>_<source>.
+    """
+    schemas = {}
+    for name, df in load_staged(pipeline, staging_path, run_id).items():
+        table_schema = infer_schema(df, f"{pipeline}_{name}")
+        schemas[name] = registry.register(table_schema) if registry is not None else table_schema
+    return schemas
+
+
+def widen_schema(old, new):
+    """
+    Merges two schemas of the same table so both sets of data fit.
+
+    Column types are widened, new columns are appended and the key hints of the old schema win.
+
+    Returns:
+    TableSchema: The merged schema.
+    """
+    new_columns = {spec.name: spec for spec in new.columns}
+    specs = []
+    for spec in old.columns:
+        other = new_columns.pop(spec.name, None)
+        if other is None:
+            specs.append(spec)
+        else:
+            specs.append(ColumnSpec(spec.name, widen_type(spec.sql_type, other.sql_type), spec.nullable or other.nullable))
+    # Columns only in the new data were missing (NULL) in the old
+    specs.extend(ColumnSpec(spec.name, spec.sql_type, True) for spec in new_columns.values())
+
+    indexes = tuple(old.indexes) + tuple(column for column in new.indexes if column not in old.indexes)
+    return TableSchema(old.table, tuple(specs), tuple(old.primary_key or new.primary_key), indexes)
+
+
+def _quote(name):
+    return "`" + str(name).replace("`", "``") + "`"
+
+
+def create_table_sql(table_schema, if_not_exists=True):
+    """
+    Generates the CREATE TABLE statement of a schema, with its primary key and indexes.
+
+    Returns:
+    str: The DDL statement.
+    """
+    lines = [f"    {_quote(spec.name)} {spec.sql_type}{'' if spec.nullable else ' NOT NULL'}"
+             for spec in table_schema.columns]
+    if table_schema.primary_key:
+        lines.append(f"    PRIMARY KEY ({', '.join(_quote(column) for column in table_schema.primary_key)})")
+    lines.extend(f"    KEY {_quote('idx_' + str(column))} ({_quote(column)})" for column in table_schema.indexes)
+
+    exists = "IF NOT EXISTS " if if_not_exists else ""
+    return f"CREATE TABLE {exists}{_quote(table_schema.table)} (\n" + ",\n".join(lines) + "\n);"
+
+
+# Types whose range widen_type understands; columns of other types (ENUM, JSON, ...) are never altered
+_WIDENABLE = set(_INT_RANK) | set(_TEXT_RANK) | {'DECIMAL', 'DOUBLE', 'FLOAT', 'DATE', 'DATETIME'}
+
+
+def _covers(existing, wanted):
+    """Whether a column of type `existing` already holds every value of type `wanted`."""
+    name_e, size_e, scale_e, unsigned_e = parse_type(existing)
+    name_w, _, _, unsigned_w = parse_type(wanted)
+    if name_e in _TEXT_RANK and name_w in _TEXT_RANK:
+        return _display_width(existing) >= _display_width(wanted)
+    if name_e == name_w and name_e not in _INT_RANK and name_e not in ('DECIMAL', 'DOUBLE', 'FLOAT'):
+        return True
+    return _range_of(widen_type(existing.upper(), wanted)) == _range_of(existing)
+
+
+def _range_of(sql_type):
+    # Integer display widths, as in INT(11), do not limit the range
+    name, size, scale, unsigned = parse_type(sql_type)
+    return name, None if name in _INT_RANK else size, scale, unsigned
+
+
+def _sql_string(value):
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _column_attributes(default, extra, comment=None):
+    """DEFAULT, AUTO_INCREMENT and COMMENT clauses of an existing column, which MODIFY would otherwise drop."""
+    extra = extra or ''
+    on_update = re.search(r'on update (\S+)', extra, re.IGNORECASE)
+    extra = extra.lower()
+    clauses = ''
+    if default is not None:
+        if 'default_generated' in extra:
+            expression = default if default.upper().startswith('CURRENT_TIMESTAMP') else f"({default})"
+            clauses += f" DEFAULT {expression}"
+        else:
+            clauses += " DEFAULT " + _sql_string(default)
+    if on_update:
+        clauses += f" ON UPDATE {on_update.group(1)}"
+    if 'auto_increment' in extra:
+        clauses += " AUTO_INCREMENT"
+    if comment:
+        clauses += " COMMENT " + _sql_string(comment)
+    return clauses
+
+
+def migration_sql(cursor, table_schema):
+    """
+    Compares an existing table with its schema, e.g. one widened by SchemaRegistry on a later run.
+
+    CREATE TABLE IF NOT EXISTS leaves an existing table as it is, so a column created as TINYINT
+    keeps that type after the registry widened it to INT. This builds the ALTER TABLE that widens
+    such columns (MODIFY) and adds missing ones. Columns are never narrowed, and columns of types
+    the schema does not describe (ENUM, JSON, ...) are left alone. MODIFY replaces the whole column
+    definition, so it restates the column's default, AUTO_INCREMENT, collation and comment.
+
+    Parameters:
+    cursor: An open cursor on the table's database.
+    table_schema (TableSchema): The schema.
+
+    Returns:
+    str: The ALTER TABLE statement, or None if the table does not exist or already fits the schema.
+    """
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA, COLLATION_NAME, COLUMN_COMMENT "
+        "FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table_schema.table,))
+    existing = {decode_text(row[0]): [decode_text(value) for value in row[1:]] for row in cursor.fetchall()}
+    if not existing:
+        return None
+
+    clauses = []
+    for spec in table_schema.columns:
+        if spec.name not in existing:
+            # Rows already in the table have no value for it
+            clauses.append(f"ADD COLUMN {_quote(spec.name)} {spec.sql_type} NULL")
+            continue
+
+        column_type, is_nullable, default, extra, collation, comment = existing[spec.name]
+        if parse_type(column_type)[0] not in _WIDENABLE:
+            continue
+        wider = not _covers(column_type, spec.sql_type)
+        nullable = is_nullable == 'YES' or spec.nullable
+        if wider or nullable != (is_nullable == 'YES'):
+            sql_type = widen_type(column_type.upper(), spec.sql_type) if wider else column_type
+            # Text columns would otherwise fall back to the table's default collation
+            collate = f" COLLATE {collation}" if collation and _family(sql_type) == 'text' else ''
+            clauses.append(f"MODIFY {_quote(spec.name)} {sql_type}{collate}{' NULL' if nullable else ' NOT NULL'}"
+                           f"{_column_attributes(default, extra, comment)}")
+
+    if not clauses:
+        return None
+    return f"ALTER TABLE {_quote(table_schema.table)}\n    " + ",\n    ".join(clauses) + ";"
+
+
+def migrate_table(cursor, table_schema, migrate=False):
+    """
+    Widens an existing table to its schema, only if asked to (see migration_sql).
+
+    Parameters:
+    cursor: An open cursor on the table's database.
+    table_schema (TableSchema): The schema.
+    migrate (bool): Whether to run the ALTER TABLE. Default is False, which only returns it.
+
+    Returns:
+    str: The ALTER TABLE statement the table still needs, or None if it fits the schema (or was altered).
+    """
+    statement = migration_sql(cursor, table_schema)
+    if statement and migrate:
+        print(f"Widening {table_schema.table} to its schema:\n{statement}")
+        cursor.execute(statement)
+        return None
+    return statement
+
+
+def execute_ddl(cursor, table_schema, drop=False, migrate=False):
+    """
+    Create the table of a schema through an open cursor, dropping it first if asked to.
+
+    An existing table that no longer fits the schema is only altered with migrate=True, see migrate_table.
+
+    Returns:
+    str: The ALTER TABLE statement the table still needs, or None.
+    """
+    if drop:
+        cursor.execute(f"DROP TABLE IF EXISTS {_quote(table_schema.table)};")
+    cursor.execute(create_table_sql(table_schema))
+    return None if drop else migrate_table(cursor, table_schema, migrate)
+
+
+def apply_schema(table_schema, host, username, password, database, drop=False, migrate=False):
+    """
+    Creates the target table of a schema in MySQL, and widens an existing table to it if asked to.
+
+    Parameters:
+    table_schema (TableSchema): The schema.
+    host, username, password, database (str): Connection details, as for load_to_mysql.
+    drop (bool): Whether to drop and recreate the table. Default is False.
+    migrate (bool): Whether to ALTER an existing table that no longer fits the schema. Default is False,
+                    which prints the statement instead.
+
+    Returns:
+    bool: True if the statements ran, False if they failed.
+    """
+    mysql = import_optional('mysql.connector')
+
+    try:
+        conn = get_mysql_connection(host, username, password, database)
+        try:
+            cursor = conn.cursor()
+            pending = execute_ddl(cursor, table_schema, drop, migrate)
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    except mysql.Error as e:
+        print(f"Error creating table {database}.{table_schema.table}: {e}")
+        return False
+
+    if pending:
+        print(f"Warning: {database}.{table_schema.table} no longer matches its schema. "
+              f"Review and run this statement, or pass migrate=True:\n{pending}")
+    else:
+        print(f"Applied the schema of {database}.{table_schema.table}")
+    return True
+
+
+def _report(column, failed, sql_type, what):
+    count = int(failed.sum())
+    if count:
+        print(f"Column {column}: {count} value(s) {what} {sql_type}")
+
+
+def _to_decimal(value, exponent):
+    """A value as a Decimal rounded to `exponent` (e.g. Decimal('0.01')), or None if it is not a number."""
+    if isinstance(value, float):
+        # repr is the shortest text that round-trips, so 0.1 becomes Decimal('0.1') and not its binary expansion
+        value = repr(value)
+    try:
+        number = decimal.Decimal(value) if not isinstance(value, decimal.Decimal) else value
+        if not number.is_finite():
+            return None
+        return number.quantize(exponent, rounding=decimal.ROUND_HALF_UP, context=_DECIMAL_CONTEXT)
+    except (decimal.InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def _decimal_column(series, size, scale):
+    """
+    Values as Decimal objects rounded to a DECIMAL(size, scale) type.
+
+    Returns:
+    pd.Series: Object column of Decimal values, None where missing, not a number or out of range.
+    pd.Series: Boolean mask of the values out of range.
+    """
+    # Decimal objects have no vectorized form, so each distinct value is converted once
+    codes, uniques = pd.factorize(series)
+    exponent = decimal.Decimal(1).scaleb(-scale)
+    limit = decimal.Decimal(10) ** (size - scale)
+    decimals = [_to_decimal(value, exponent) for value in uniques]
+    out_of_range = np.array([value is not None and not abs(value) < limit for value in decimals] + [False])
+    decimals = np.array([None if out else value for value, out in zip(decimals, out_of_range)] + [None], dtype=object)
+    return (pd.Series(decimals[codes], index=series.index, dtype=object),
+            pd.Series(out_of_range[codes], index=series.index))
+
+
+def _integer_column(numbers, min_value, max_value):
+    """
+    Numbers as whole numbers in [min_value, max_value], with NULL where they are not finite or out of range.
+
+    Returns:
+    pd.Series: The values, as Int64 (uint64 for BIGINT UNSIGNED values beyond Int64, when all are in range).
+    pd.Series: Boolean mask of the values out of range, NaN and infinities included.
+    """
+    if pd.api.types.is_integer_dtype(numbers):
+        # Compared within the dtype's own range, so the bounds never overflow it
+        limits = np.iinfo(numbers.dtype.numpy_dtype if hasattr(numbers.dtype, 'numpy_dtype') else numbers.dtype)
+        out_of_range = ((numbers < max(min_value, limits.min)) | (numbers > min(max_value, limits.max))).fillna(False)
+        if numbers.dtype.kind == 'u' and limits.max > np.iinfo(np.int64).max and not out_of_range.any():
+            return numbers, out_of_range
+        numbers = numbers.mask(out_of_range)
+        return numbers.astype('Int64'), out_of_range
+
+    values = numbers.astype('float64').round()
+    # Float bounds round up (2**63 - 1 becomes 2**63), so values at 2**63 are caught by the Int64 limit
+    out_of_range = (values.notna() & ~np.isfinite(values)) | (values < min_value) | (values > max_value) | (values >= 2 ** 63)
+    out_of_range = out_of_range.fillna(False)
+    return values.mask(out_of_range).astype('Int64'), out_of_range
+
+
+def coerce_frame(df, table_schema):
+    """
+    Converts every column of a DataFrame to the values of its target type.
+
+    Integers become nullable Int64, dates and times are parsed and text is cast to str, each in one vectorized
+    pass over the column. Decimals become Decimal objects rounded to their scale, converted once per distinct
+    value since Decimal has no vectorized form. Values that cannot be converted, infinities and numbers out of the type's
+    range are loaded as NULL and reported; text longer than the type's length is reported.
+
+    Parameters:
+    df (pd.DataFrame): The data. Columns not in the schema are dropped.
+    table_schema (TableSchema): The target schema.
+
+    Returns:
+    pd.DataFrame: The converted data, in the column order of the schema.
+    """
+    converted = {}
+    for spec in table_schema.columns:
+        if spec.name not in df.columns:
+            continue
+        series = df[spec.name]
+        name, size, scale, unsigned = parse_type(spec.sql_type)
+
+        if name == 'DECIMAL':
+            # Kept as Decimal objects: float64 would round anything beyond 15-17 significant digits
+            decimals, out_of_range = _decimal_column(series, size or 10, scale or 0)
+            _report(spec.name, decimals.isna() & series.notna() & ~out_of_range, spec.sql_type,
+                    "are not numbers, loaded as NULL, for")
+            _report(spec.name, out_of_range, spec.sql_type, "out of range, loaded as NULL, for")
+            converted[spec.name] = decimals
+
+        elif name in _INT_RANK or name in ('DOUBLE', 'FLOAT'):
+            numbers = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors='coerce')
+            _report(spec.name, numbers.isna() & series.notna(), spec.sql_type, "are not numbers, loaded as NULL, for")
+            if name in _INT_RANK:
+                _, min_value, max_value, _ = INT_TYPES[_INT_RANK[name]]
+                if unsigned:
+                    min_value, max_value = 0, max_value * 2 + 1
+                numbers, out_of_range = _integer_column(numbers, min_value, max_value)
+                _report(spec.name, out_of_range, spec.sql_type, "out of range, loaded as NULL, for")
+            elif pd.api.types.is_float_dtype(numbers):
+                # MySQL has no infinity
+                infinite = numbers.notna() & ~np.isfinite(numbers.astype('float64'))
+                _report(spec.name, infinite, spec.sql_type, "are infinite, loaded as NULL, for")
+                numbers = numbers.mask(infinite)
+            converted[spec.name] = numbers
+
+        elif name in ('DATE', 'DATETIME', 'TIMESTAMP'):
+            dates = pd.to_datetime(series, errors='coerce')
+            _report(spec.name, dates.isna() & series.notna(), spec.sql_type, "are not dates, loaded as NULL, for")
+            converted[spec.name] = dates.dt.date if name == 'DATE' else dates
+
+        elif name in _TEXT_RANK:
+            text = series.astype(str).where(series.notna())
+            max_length = size or TEXT_TYPES[_TEXT_RANK[name]][1]
+            _report(spec.name, text.str.len() > max_length, spec.sql_type, "are too long for")
+            converted[spec.name] = text
+
+        else:
+            converted[spec.name] = series
+
+    return pd.DataFrame(converted, index=df.index)
+
+
+def _schema_to_json(table_schema):
+    return {
+        "table": table_schema.table,
+        "columns": [spec._asdict() for spec in table_schema.columns],
+        "primary_key": list(table_schema.primary_key),
+        "indexes": list(table_schema.indexes),
+    }
+
+
+def _schema_from_json(data):
+    return TableSchema(data["table"], tuple(ColumnSpec(**spec) for spec in data["columns"]),
+                       tuple(data["primary_key"]), tuple(data["indexes"]))
+
+
+class SchemaRegistry:
+    """
+    Target schemas kept as one <table>.json per table in a folder.
+
+    Registering a schema for a table that is already known widens the stored one, so a
+    table never gets a type that the data of an earlier run would not fit.
+    """
+
+    def __init__(self, folder=DEFAULT_SCHEMA_FOLDER):
+        self.folder = folder
+        self._cache = {}
+
+    def _path(self, table):
+        return os.path.join(self.folder, f"{table}.json")
+
+    def get(self, table):
+        """The stored schema of a table, or None if it is not registered."""
+        if table not in self._cache:
+            path = self._path(table)
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r') as file:
+                self._cache[table] = _schema_from_json(json.load(file))
+        return self._cache[table]
+
+    def register(self, table_schema):
+        """
+        Store a schema, widened with the one already registered for its table.
+
+        Returns:
+        TableSchema: The stored schema.
+        """
+        current = self.get(table_schema.table)
+        if current is not None:
+            table_schema = widen_schema(current, table_schema)
+            if table_schema == current:
+                return current
+
+        os.makedirs(self.folder, exist_ok=True)
+        write_json_atomic(self._path(table_schema.table), _schema_to_json(table_schema))
+        self._cache[table_schema.table] = table_schema
+        return table_schema
+
+    def tables(self):
+        """Names of the registered tables."""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(name[:-len('.json')] for name in os.listdir(self.folder) if name.endswith('.json'))
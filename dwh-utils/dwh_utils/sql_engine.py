@@ -0,0 +1,253 @@
+"""
+Embedded analytical SQL over staged files, backed by DuckDB.
+
+Staged CSV/Parquet files are queried in place with DuckDB's multi-threaded,
+vectorized engine, and mapping sheets from Mapping.xlsx are exposed as small
+lookup tables, so joins and group-bys across extracts run without pandas
+merges:
+
+    from dwh_utils.sql_engine import SqlEngine
+
+    with SqlEngine(threads=8) as engine:
+        engine.register_staged('stock', 'runs/202406241544/sql_0.parquet')
+        engine.register_staged('tienda', 'runs/202406241544/sql_2.parquet')
+        for chunk in engine.iter_query('''
+                SELECT t.anio, t.nsemana, sum(t.ahorro) AS ahorro_tiendas,
+                       any_value(s.ahorrado_picktolight) AS ahorrado_picktolight
+                FROM tienda t JOIN stock s USING (anio, nsemana)
+                GROUP BY ALL'''):
+            ...
+
+Mapping sheets are registered with register_mapping('Provincias') and joined
+as `LEFT JOIN map_provincias m ON m.value = ...`.
+
+Requires the optional 'duckdb' package.
+"""
+import os
+import re
+
+import pandas as pd
+
+from ._optional import import_optional
+from .config import DEFAULT_MAPPING_PATH
+from .excel import excel_engine, group_sheets, read_sheets
+from .lazy import list_partitions
+from .load import load_chunks_to_mysql
+from .staging import open_arrow
+from .mapping import index_keys, load_mapping_index
+from .transform import load_mapping
+
+
+# DuckDB returns query results in vectors of 2048 rows
+VECTOR_SIZE = 2048
+
+
+def _quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def mapping_table_name(sheet_name):
+    """Default table name of a mapping sheet, e.g. 'Provincias' -> 'map_provincias'."""
+    return 'map_' + re.sub(r'\W+', '_', sheet_name).strip('_').lower()
+
+
+def _read_workbook_table(path):
+    """The table of a workbook, its continuation sheets included. Workbooks of several tables are refused."""
+    parts = group_sheets(pd.ExcelFile(path, engine=excel_engine()).sheet_names)
+    if len(parts) > 1:
+        raise ValueError(f"{path} holds several tables ({', '.join(parts)}); register them one at a time "
+                         f"with register_frame, e.g. from staging.load_staged")
+    sheets = next(iter(parts.values()), [])
+    return pd.concat(read_sheets(path, sheets).values(), ignore_index=True) if sheets else pd.DataFrame()
+
+
+class SqlEngine:
+    """
+    A DuckDB connection with helpers to expose staged files and mapping sheets as tables.
+
+    Parameters:
+    database (str): DuckDB database file. Defaults to an in-memory database.
+    threads (int): Worker threads for query execution. Defaults to DuckDB's choice (all cores).
+    memory_limit (str): Memory cap before DuckDB spills to disk, e.g. '4GB'.
+    """
+
+    def __init__(self, database=':memory:', threads=None, memory_limit=None):
+        duckdb = import_optional('duckdb')
+        self.connection = duckdb.connect(database)
+
+        if threads:
+            self.connection.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self.connection.execute(f"SET memory_limit = {_quote_literal(memory_limit)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def register_staged(self, name, path, **csv_options):
+        """
+        Expose staged data as a view. The files are scanned at query time, not loaded up front.
+
+        CSV and Parquet files (or a directory of them, unioned by column name) are read
+        natively by DuckDB. Arrow IPC files are memory-mapped and scanned in place.
+        Pickle and Excel staging files are loaded through pandas. A workbook must hold a
+        single table, whose continuation sheets (see excel.group_sheets) are read with it.
+
+        Parameters:
+        name (str): The view name to use in queries.
+        path (str): A staged file or a directory of staged files of the same kind.
+        **csv_options: Extra read_csv options, e.g. delim=';'.
+        """
+        partitions = list_partitions(path)
+        suffixes = {os.path.splitext(partition)[1].lower() for partition in partitions}
+        if len(suffixes) > 1:
+            raise ValueError(f"Mixed staged file types in {path}: {', '.join(sorted(suffixes))}")
+        suffix = suffixes.pop()
+
+        files = "[" + ", ".join(_quote_literal(partition) for partition in partitions) + "]"
+
+        if suffix == '.parquet':
+            source = f"read_parquet({files}, union_by_name = true)"
+        elif suffix == '.csv':
+            options = "".join(f", {key} = {_quote_literal(value)}" for key, value in csv_options.items())
+            source = f"read_csv({files}, union_by_name = true{options})"
+        elif suffix in ('.arrow', '.feather'):
+            pa = import_optional('pyarrow')
+            tables = [open_arrow(partition) for partition in partitions]
+            self.register_frame(name, pa.concat_tables(tables, promote_options='permissive') if len(tables) > 1 else tables[0])
+            return
+        else:
+            frames = [pd.read_pickle(p) if suffix == '.pkl' else _read_workbook_table(p) for p in partitions]
+            self.register_frame(name, pd.concat(frames, ignore_index=True))
+            return
+
+        self.connection.execute(f"CREATE OR REPLACE VIEW {_quote_identifier(name)} AS SELECT * FROM {source}")
+
+    def register_frame(self, name, df):
+        """Expose a pandas DataFrame or Arrow table as a table. DuckDB scans it in place without copying."""
+        self.connection.register(name, df)
+
+    def register_mapping(self, sheet_name, mapping_path=DEFAULT_MAPPING_PATH, name=None):
+        """
+        Expose a mapping sheet as a two-column table (value, mapped) for lookups in joins.
+
+        Parameters:
+        sheet_name (str): The sheet of the mapping workbook.
+        mapping_path (str): Path of the mapping workbook.
+        name (str): Table name. Defaults to mapping_table_name(sheet_name).
+
+        Returns:
+        str: The table name.
+        """
+        mapping_dict = load_mapping(sheet_name, mapping_path)
+        name = name or mapping_table_name(sheet_name)
+        self.register_frame(name, pd.DataFrame({'value': list(mapping_dict.keys()), 'mapped': list(mapping_dict.values())}))
+        return name
+
+    def register_mapping_index(self, sheet_name, mapping_path=DEFAULT_MAPPING_PATH, key_count=1, ranged=False, validity=False, name=None):
+        """
+        Expose a composite-key, range or validity-date mapping sheet as a table
+        (mapped, key_1 ... key_n, [low, high], [valid_from, valid_to]) for range joins.
+
+        Parameters:
+        sheet_name (str): The sheet of the mapping workbook.
+        mapping_path (str): Path of the mapping workbook.
+        key_count, ranged, validity: Layout of the sheet, see mapping.MappingIndex.
+        name (str): Table name. Defaults to mapping_table_name(sheet_name).
+
+        Returns:
+        str: The table name.
+        """
+        index = load_mapping_index(sheet_name, mapping_path, key_count, ranged, validity)
+        name = name or mapping_table_name(sheet_name)
+        self.register_frame(name, index.frame)
+        return name
+
+    def register_plan_mappings(self, plan):
+        """
+        Register every mapping sheet a compiled pipeline plan needs.
+
+        Returns:
+        dict: Sheet name -> table name.
+        """
+        tables = {}
+        for mapping in plan.mapping:
+            options = mapping.options
+            sheet = options["mapping_column_name"]
+            if sheet in tables:
+                continue
+
+            keys = index_keys(mapping.column, options.get("keys"), options.get("range"), options.get("valid_on"))
+            if keys is None:
+                tables[sheet] = self.register_mapping(sheet, options["mapping_path"])
+            else:
+                tables[sheet] = self.register_mapping_index(
+                    sheet, options["mapping_path"], len(keys), options.get("range") is not None, options.get("valid_on") is not None
+                )
+        return tables
+
+    def query(self, sql, params=None):
+        """
+        Run a query and return the full result.
+
+        Returns:
+        pd.DataFrame: The result.
+        """
+        return self.connection.execute(sql, params or []).df()
+
+    def iter_query(self, sql, params=None, chunk_rows=100_000):
+        """
+        Run a query and stream the result as DataFrame chunks.
+
+        Parameters:
+        sql (str): The query.
+        params (list): Query parameters for '?' placeholders.
+        chunk_rows (int): Approximate rows per chunk, rounded to DuckDB's 2048-row vectors.
+
+        Returns:
+        generator: DataFrame chunks.
+        """
+        result = self.connection.execute(sql, params or [])
+        vectors = max(1, chunk_rows // VECTOR_SIZE)
+        while True:
+            chunk = result.fetch_df_chunk(vectors)
+            if chunk.empty:
+                break
+            yield chunk
+
+    def copy_to(self, sql, path):
+        """
+        Write a query result straight to a Parquet or CSV file with DuckDB's own writer.
+
+        Parameters:
+        sql (str): The query.
+        path (str): Output path. The format follows the .parquet or .csv suffix.
+        """
+        fmt = 'PARQUET' if path.lower().endswith('.parquet') else 'CSV, HEADER'
+        self.connection.execute(f"COPY ({sql}) TO {_quote_literal(path)} (FORMAT {fmt})")
+        print(f"Query result written to {path}")
+
+    def load_to_mysql(self, sql, host, username, password, database, table, truncate=False, chunk_rows=100_000):
+        """
+        Stream a query result into a MySQL table chunk by chunk, in one transaction (see load.load_chunks_to_mysql).
+
+        Raises:
+        RuntimeError: If the load failed. It is rolled back, so the table is left as it was.
+
+        Returns:
+        int: The number of rows loaded.
+        """
+        rows = load_chunks_to_mysql(self.iter_query(sql, chunk_rows=chunk_rows), host, username, password,
+                                    database, table, truncate=truncate)
+        if rows is None:
+            raise RuntimeError(f"Loading the query result into {database}.{table} failed and was rolled back")
+        return rows
@@ -0,0 +1,442 @@
+import os
+import json
+import shutil
+import uuid
+import hashlib
+from datetime import datetime
+
+import pandas as pd
+
+from ._optional import import_optional
+from .config import DEFAULT_TEMP_FOLDER
+from .excel import excel_engine, group_sheets, read_sheets, write_excel
+
+
+ARROW_SUFFIX = '.arrow'
+
+
+def script_base_name(script_filename, split_stage=False):
+    """
+    Derive the base name used for staged files from a script or notebook filename.
+
+    Parameters:
+    script_filename (str): The full path of the script file, or None.
+    split_stage (bool): Whether to strip the stage suffix, e.g. 'ahorro_e.py' -> 'ahorro'.
+
+    Returns:
+    str: The base name, or 'output' if no filename was given.
+    """
+    if not script_filename:
+        return 'output'
+
+    name = os.path.splitext(os.path.basename(script_filename))[0]
+    if split_stage:
+        name = name.split('_')[0]
+    return name
+
+
+def new_run_id():
+    """
+    A new run id: the current YYYYMMDDHHMMSS timestamp and a short random suffix, e.g. '20240131093015_3fa2c1'.
+
+    The suffix keeps two runs started in the same second from sharing checkpoints and staged files.
+    Ids still sort by start time.
+    """
+    return f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:6]}"
+
+
+def stage_temp_file(df, output_folder=DEFAULT_TEMP_FOLDER, script_filename=None):
+    """
+    Saves a DataFrame as a CSV file in a dated subfolder of the temp staging area.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to save.
+    output_folder (str): The root temp folder. A YYYYMMDD subfolder is created inside it.
+    script_filename (str): The full path of the script file for naming the output file.
+
+    Returns:
+    str: The path of the written CSV file.
+    """
+    current_date = datetime.now().strftime('%Y%m%d')
+    date_folder = os.path.join(output_folder, current_date)
+    os.makedirs(date_folder, exist_ok=True)
+
+    script_name = script_base_name(script_filename)
+    timestamp = datetime.now().strftime('%H%M%S')
+    output_file_path = os.path.join(date_folder, f"{script_name}_{timestamp}.csv")
+
+    df.to_csv(output_file_path, index=False)
+    print(f"File successfully uploaded to {output_file_path}")
+
+    return output_file_path
+
+
+def write_staging_workbook(extracted_data, staging_path='', script_filename=None, run_id=None, workers=1):
+    """
+    Writes the extracted DataFrames to a timestamped Excel workbook in the staging area.
+
+    The workbook is streamed in constant memory (see excel.write_excel). Sources longer
+    than the Excel row limit continue on '<sheet> (2)', ..., and load_staged joins them back.
+
+    Parameters:
+    extracted_data (dict): Source type -> list of DataFrames, as returned by perform_extraction.
+    staging_path (str): The root staging folder. A subfolder per pipeline is created inside it.
+    script_filename (str): The full path of the script file for naming the folder and workbook.
+    run_id (str): Suffix of the workbook name. Defaults to a new_run_id().
+    workers (int): Processes rendering sheets at the same time, see excel.write_excel. Default is 1.
+
+    Returns:
+    str: The path of the written workbook.
+    """
+    timestamp = run_id or new_run_id()
+    base_filename = script_base_name(script_filename, split_stage=True)
+
+    output_folder = os.path.join(os.path.abspath(staging_path), base_filename)
+    os.makedirs(output_folder, exist_ok=True)
+
+    output_excel_path = os.path.join(output_folder, f"{base_filename}_{timestamp}.xlsx")
+
+    # Sheet names like json_0, json_1, etc. Frames are taken one at a time, so a memory-budgeted
+    # run only holds the one being written.
+    sheets = ((f"{key}_{idx}", df) for key, df_list in extracted_data.items() for idx, df in enumerate(df_list))
+    write_excel(sheets, output_excel_path, workers=workers)
+
+    print(f"Extracted data staged to {output_excel_path}")
+
+    return output_excel_path
+
+
+def _arrow_table(df):
+    """Convert a DataFrame to an Arrow table. Object columns Arrow cannot type (mixed values) are stored as strings."""
+    pa = import_optional('pyarrow')
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        pass
+
+    df = df.copy()
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            print(f"Column '{column}' has mixed types, staging it as text")
+            df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_arrow(df, path):
+    """
+    Writes a DataFrame as an uncompressed Arrow IPC (Feather v2) file.
+
+    The file is left uncompressed so readers can memory-map it and use its
+    buffers in place. It is written through a temporary file and renamed, so a
+    reader never maps a half-written file.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to save.
+    path (str): The output path, usually ending in .arrow.
+
+    Returns:
+    str: The path of the written file.
+    """
+    ipc = import_optional('pyarrow.ipc')
+    table = _arrow_table(df)
+
+    tmp_path = path + '.tmp'
+    with ipc.new_file(tmp_path, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def open_arrow(path, columns=None):
+    """
+    Memory-maps a staged Arrow IPC file without reading or copying it.
+
+    The returned table points into the page cache, so several processes that
+    open the same file share one read-only copy of the data.
+
+    Parameters:
+    path (str): A file written by write_arrow.
+    columns (list): Columns to keep. None keeps all columns.
+
+    Returns:
+    pyarrow.Table: The memory-mapped table.
+    """
+    pa = import_optional('pyarrow')
+    ipc = import_optional('pyarrow.ipc')
+
+    table = ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table if columns is None else table.select(columns)
+
+
+def read_arrow(path, columns=None, writable=False):
+    """
+    Reads a staged Arrow IPC file into a DataFrame through a memory map.
+
+    Nothing is parsed, and numeric columns without nulls are views over the
+    mapped file rather than copies. Such columns are read-only: replacing a
+    column works, but in-place edits (df.at, df.loc) raise unless writable=True.
+
+    Parameters:
+    path (str): A file written by write_arrow.
+    columns (list): Columns to read. None reads all columns.
+    writable (bool): Copy the data out of the map so it can be edited in place,
+                     e.g. by transform.force_int_conversion. Default is False.
+
+    Returns:
+    pd.DataFrame: The staged data.
+    """
+    table = open_arrow(path, columns)
+    if writable:
+        return table.to_pandas()
+    return table.to_pandas(split_blocks=True)
+
+
+def write_staging_arrow(extracted_data, staging_path='', script_filename=None, run_id=None):
+    """
+    Writes the extracted DataFrames as Arrow IPC files, the fast alternative to write_staging_workbook.
+
+    Each source becomes <staging_path>/<pipeline>/<pipeline>_<run_id>/<kind>_<idx>.arrow,
+    named like the sheets of the staging workbook. Read it back with load_staged.
+
+    Parameters:
+    extracted_data (dict): Source type -> list of DataFrames, as returned by perform_extraction.
+    staging_path (str): The root staging folder. A subfolder per pipeline is created inside it.
+    script_filename (str): The full path of the script file for naming the folders.
+    run_id (str): Suffix of the run folder name. Defaults to a new_run_id().
+
+    Returns:
+    str: The path of the written folder.
+    """
+    timestamp = run_id or new_run_id()
+    base_filename = script_base_name(script_filename, split_stage=True)
+
+    output_folder = os.path.join(os.path.abspath(staging_path), base_filename, f"{base_filename}_{timestamp}")
+    os.makedirs(output_folder, exist_ok=True)
+
+    for key, df_list in extracted_data.items():
+        for idx, df in enumerate(df_list):
+            write_arrow(df, os.path.join(output_folder, f"{key}_{idx}{ARROW_SUFFIX}"))
+
+    print(f"Extracted data staged to {output_folder}")
+
+    return output_folder
+
+
+def find_staged(pipeline, staging_path='', run_id=None):
+    """
+    Locates the staged output of a pipeline: an Arrow folder or an Excel workbook.
+
+    Parameters:
+    pipeline (str): The pipeline name, e.g. 'ahorro'.
+    staging_path (str): The root staging folder.
+    run_id (str): The run to find. Defaults to the most recently staged one.
+
+    Raises:
+    FileNotFoundError: If nothing was staged for the pipeline (or run).
+
+    Returns:
+    str: The path of the staged folder or workbook.
+    """
+    pipeline_folder = os.path.join(os.path.abspath(staging_path), pipeline)
+    prefix = f"{pipeline}_"
+
+    candidates = []
+    if os.path.isdir(pipeline_folder):
+        for name in os.listdir(pipeline_folder):
+            path = os.path.join(pipeline_folder, name)
+            stem, suffix = os.path.splitext(name)
+            if os.path.isdir(path):
+                stem = name
+            elif suffix.lower() != '.xlsx':
+                continue
+            if stem.startswith(prefix) and (run_id is None or stem == prefix + run_id):
+                candidates.append((stem[len(prefix):], os.path.isdir(path), path))
+
+    if not candidates:
+        run = f" run {run_id}" if run_id else ""
+        raise FileNotFoundError(f"No staged data found for {pipeline}{run} in {pipeline_folder}")
+
+    # For the same run prefer the Arrow folder over the workbook
+    runs = {}
+    for run, _, path in sorted(candidates):
+        runs[run] = path
+    # Run ids are not ordered in time (a resumed run keeps its id, run ids can be given), so the most
+    # recently staged run wins. Runs staged within the clock's resolution fall back to the run id.
+    return max(runs.items(), key=lambda item: (os.path.getmtime(item[1]), item[0]))[1]
+
+
+def staged_reader(path, columns=None, writable=False):
+    """
+    Lists the sources of a staged Arrow folder or workbook and returns a function reading one of them.
+
+    Parameters:
+    path (str): The staged folder or workbook, e.g. from find_staged.
+    columns (list): Columns to read from every source. None reads all columns.
+    writable (bool): Whether the frames will be edited in place, see read_arrow. Default is False.
+
+    Returns:
+    list: The source names (sheet names), e.g. ['json_0', 'sql_0'].
+    callable: read(name) -> pd.DataFrame.
+    """
+    if os.path.isdir(path):
+        names = sorted(name[:-len(ARROW_SUFFIX)] for name in os.listdir(path) if name.endswith(ARROW_SUFFIX))
+        read = lambda name: read_arrow(os.path.join(path, name + ARROW_SUFFIX), columns, writable)
+    else:
+        parts = group_sheets(pd.ExcelFile(path, engine=excel_engine()).sheet_names)
+        names = list(parts)
+        read = lambda name: pd.concat(read_sheets(path, parts[name], usecols=columns).values(), ignore_index=True)
+    return names, read
+
+
+def load_staged(pipeline, staging_path='', run_id=None, sources=None, columns=None, writable=False, memory_budget=None):
+    """
+    Loads the staged output of an extraction run for the transformation stage.
+
+    Arrow folders are memory-mapped (see read_arrow), so the data is available
+    without parsing. Older runs staged as an Excel workbook are read with read_excel.
+
+    Parameters:
+    pipeline (str): The pipeline name, e.g. 'ahorro'.
+    staging_path (str): The root staging folder, the "output_excel_path" of the extraction config.
+    run_id (str): The run to load. Defaults to the most recently staged one.
+    sources (list): Source names to load, e.g. ['sql_0']. None loads all of them.
+    columns (list): Columns to read from every source. None reads all columns.
+    writable (bool): Whether the frames will be edited in place, see read_arrow. Default is False.
+    memory_budget (int or str): If given, return a memory.SpillStore instead of a dict: each source
+                                is read on first access, and the least recently used ones are
+                                dropped when the budget is reached, to be read again when needed.
+
+    Returns:
+    dict: Source name (sheet name) -> DataFrame.
+    """
+    path = find_staged(pipeline, staging_path, run_id)
+    names, read = staged_reader(path, columns, writable)
+
+    if sources is not None:
+        missing = [name for name in sources if name not in names]
+        if missing:
+            raise FileNotFoundError(f"Sources {', '.join(missing)} not staged in {path}")
+        names = list(sources)
+
+    if memory_budget is None:
+        return {name: read(name) for name in names}
+
+    from .memory import SpillStore
+
+    store = SpillStore(memory_budget)
+    for name in names:
+        store.add_lazy(name, lambda name=name: read(name))
+    return store
+
+
+def write_json_atomic(path, data):
+    """Write JSON through a temporary file and rename it, so an interrupted run never leaves a truncated file."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def source_fingerprint(source):
+    """Hash of a source's options, used to tell whether a checkpoint still matches the config."""
+    payload = json.dumps(dict(source.options), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class RunCheckpoint:
+    """
+    Per-run checkpoint of an extraction.
+
+    Every source is written to <staging_path>/<pipeline>/runs/<run_id>/<source>.pkl as soon as it
+    finishes, and its status is recorded in state.json next to it. Re-opening the same run id skips
+    the sources that already completed, as long as their config has not changed.
+
+    The id of the pipeline's open run is kept in runs/current.json until the run completes, so
+    without a run_id an interrupted or failed run is resumed, and a new one is only started once
+    the previous one completed. complete() then removes the run's checkpoints.
+    """
+
+    STATE_FILE = 'state.json'
+    CURRENT_FILE = 'current.json'
+
+    def __init__(self, pipeline, run_id=None, staging_path=''):
+        self.pipeline = pipeline
+        self.runs_dir = os.path.join(os.path.abspath(staging_path), pipeline, 'runs')
+        self.run_id = run_id or self._open_run() or new_run_id()
+        self.run_dir = os.path.join(self.runs_dir, self.run_id)
+        os.makedirs(self.run_dir, exist_ok=True)
+        write_json_atomic(os.path.join(self.runs_dir, self.CURRENT_FILE), {'run_id': self.run_id})
+
+        self.state_path = os.path.join(self.run_dir, self.STATE_FILE)
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as file:
+                self.state = json.load(file)
+            print(f"Resuming run {self.run_id} from {self.state_path}")
+        else:
+            self.state = {'pipeline': pipeline, 'run_id': self.run_id, 'sources': {}}
+
+    def _open_run(self):
+        """The id of the pipeline's last run that did not complete, or None."""
+        current_path = os.path.join(self.runs_dir, self.CURRENT_FILE)
+        if not os.path.exists(current_path):
+            return None
+        with open(current_path, 'r') as file:
+            run_id = json.load(file).get('run_id')
+        return run_id if run_id and os.path.isdir(os.path.join(self.runs_dir, run_id)) else None
+
+    def _save(self):
+        write_json_atomic(self.state_path, self.state)
+
+    def complete(self):
+        """Remove the checkpoints of a run whose output has been staged, so the next run starts afresh."""
+        shutil.rmtree(self.run_dir, ignore_errors=True)
+        current_path = os.path.join(self.runs_dir, self.CURRENT_FILE)
+        if self._open_run() is None and os.path.exists(current_path):
+            os.remove(current_path)
+
+    def is_done(self, source):
+        """Whether the source already completed in this run with the same configuration."""
+        entry = self.state['sources'].get(source.name)
+        return (entry is not None and entry['status'] == 'done'
+                and entry['fingerprint'] == source_fingerprint(source)
+                and os.path.exists(os.path.join(self.run_dir, entry['file'])))
+
+    def save(self, source, df):
+        """Stage a finished source and mark it done."""
+        file_name = f"{source.name}.pkl"
+        df.to_pickle(os.path.join(self.run_dir, file_name))
+
+        self.state['sources'][source.name] = {
+            'status': 'done',
+            'fingerprint': source_fingerprint(source),
+            'file': file_name,
+            'rows': len(df),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._save()
+
+    def load(self, source):
+        """Read back the staged result of a completed source."""
+        entry = self.state['sources'][source.name]
+        return pd.read_pickle(os.path.join(self.run_dir, entry['file']))
+
+    def loader(self, source):
+        """A callable that reads back a completed source, for memory.SpillStore."""
+        return lambda: self.load(source)
+
+    def fail(self, source, error):
+        """Record a failed source."""
+        self.state['sources'][source.name] = {
+            'status': 'failed',
+            'fingerprint': source_fingerprint(source),
+            'error': str(error),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._save()
+
+    def failed_sources(self):
+        """Names of the sources recorded as failed."""
+        return [name for name, entry in self.state['sources'].items() if entry['status'] == 'failed']
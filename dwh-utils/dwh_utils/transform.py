@@ -0,0 +1,435 @@
+import os
+import inspect
+from datetime import date
+from functools import lru_cache
+
+import pandas as pd
+
+from .config import DEFAULT_MAPPING_PATH
+from .excel import excel_engine, group_sheets, read_sheets, write_excel
+from .mapping import index_keys, load_mapping_index
+from .notebook import is_notebook
+from .profiling import ColumnProfiler
+
+
+@lru_cache(maxsize=128)
+def _read_mapping_sheet(mapping_path, sheet_name, mtime):
+    # mtime is part of the cache key so an edited workbook is picked up on the next call
+    mapping_df = pd.read_excel(mapping_path, sheet_name=sheet_name, header=None, engine=excel_engine())
+    return dict(zip(mapping_df.iloc[:, 1], mapping_df.iloc[:, 0]))
+
+
+def load_mapping(sheet_name, mapping_path=DEFAULT_MAPPING_PATH):
+    """
+    Loads a two-column mapping sheet as a {source value: mapped value} dictionary.
+
+    Sheets are cached per process, so mapping several columns against the same
+    workbook only parses each sheet once. Treat the returned dict as read-only.
+
+    Parameters:
+    sheet_name (str): The sheet of the mapping workbook to read.
+    mapping_path (str): Path of the mapping workbook.
+
+    Returns:
+    dict: The mapping dictionary.
+    """
+    mapping_path = os.path.abspath(mapping_path)
+    return _read_mapping_sheet(mapping_path, sheet_name, os.path.getmtime(mapping_path))
+
+
+def apply_mapping(series, mapping_dict, full_map=False):
+    """
+    Maps a Series through a mapping dictionary without modifying it.
+
+    Parameters:
+    series (pd.Series): The values to map.
+    mapping_dict (dict): Source value -> mapped value.
+    full_map (bool): Whether to replace values not in the mapping dictionary with NaN. Default is False.
+
+    Returns:
+    pd.Series: The mapped values.
+    np.ndarray: The distinct values that had no mapping.
+    """
+    unmatched_values = series[~series.isin(mapping_dict.keys())].unique()
+
+    mapped = series.map(mapping_dict)
+    if not full_map:
+        mapped = mapped.fillna(series)
+
+    return mapped, unmatched_values
+
+
+def apply_mapping_index(df, df_column_name, index, keys, range_column=None, valid_on=None, full_map=False):
+    """
+    Maps the rows of a DataFrame through a MappingIndex without modifying it.
+
+    Parameters:
+    df (pd.DataFrame): The rows to map.
+    df_column_name (str): The mapped column. Its current values fill unmatched rows unless full_map is True.
+    index (MappingIndex): The indexed mapping sheet, see mapping.load_mapping_index.
+    keys (list): Columns matched against the key columns of the sheet.
+    range_column (str): Column looked up in the low/high bands of the sheet.
+    valid_on (str): Column looked up in the validity windows of the sheet.
+    full_map (bool): Whether to leave unmatched rows as NaN. Default is False.
+
+    Returns:
+    pd.Series: The mapped values.
+    np.ndarray: The distinct unmatched lookup values, joined with ' | ' when there are several lookup columns.
+    """
+    mapped, matched = index.map(df, keys, range_column, valid_on)
+    if not full_map and df_column_name in df:
+        mapped = mapped.fillna(df[df_column_name])
+
+    lookup_columns = keys + [column for column in (range_column, valid_on) if column is not None]
+    unmatched = df.loc[~matched, lookup_columns].drop_duplicates()
+    if len(lookup_columns) == 1:
+        unmatched_values = unmatched.iloc[:, 0].to_numpy()
+    else:
+        unmatched_values = unmatched.astype(str).agg(' | '.join, axis=1).to_numpy()
+
+    return mapped, unmatched_values
+
+
+def map_column(df, df_column_name, mapping_column_name=None, dq=True, dq_export=False, script_name=None, full_map=False, mapping_path=DEFAULT_MAPPING_PATH,
+               keys=None, range_column=None, valid_on=None):
+    """
+    Maps values in a DataFrame column based on a mapping Excel sheet and handles data quality (DQ) checks.
+    
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the column to be mapped.
+    df_column_name (str): The name of the column in the DataFrame to be mapped.
+    mapping_column_name (str): The name of the column in the Excel sheet used for mapping.
+                               Defaults to the same name as df_column_name.
+    dq (bool): Whether to perform data quality checks. Default is True.
+    dq_export (bool): Whether to export the unmatched values to a DataFrame and an Excel file. Default is False.
+    script_name (str): The name of the script or notebook calling this function. Used for naming the output file in dq_export.
+    full_map (bool): Whether to replace input values not in the mapping dictionary with NaN. Default is False.
+    mapping_path (str): Path of the mapping workbook. Default is 'static/Mapping.xlsx'.
+    keys (list): Columns matched against the key columns of a composite-key sheet (see mapping.MappingIndex).
+                 df_column_name then receives the mapped value and need not exist yet. Defaults to [df_column_name]
+                 when range_column or valid_on is given.
+    range_column (str): Column looked up in the low/high bands of the sheet.
+    valid_on (str): Date column looked up in the validity windows of the sheet.
+    
+    Returns:
+    pd.Series: The mapped column as a Pandas Series.
+    """
+    
+    if mapping_column_name is None:
+        mapping_column_name = df_column_name
+
+    try:
+        keys = index_keys(df_column_name, keys, range_column, valid_on)
+        if keys is None:
+            mapping_dict = load_mapping(mapping_column_name, mapping_path)
+            mapped_column, unmatched_values = apply_mapping(df[df_column_name], mapping_dict, full_map)
+        else:
+            index = load_mapping_index(mapping_column_name, mapping_path, len(keys), range_column is not None, valid_on is not None)
+            mapped_column, unmatched_values = apply_mapping_index(df, df_column_name, index, keys, range_column, valid_on, full_map)
+
+        df[df_column_name] = mapped_column
+
+        # Data Quality (DQ) checks
+        if dq:
+            if len(unmatched_values) > 0:
+                print("------------Unmatched Values------------")
+                for element in unmatched_values:
+                    print(element)
+
+            if dq_export:
+                dq_df = pd.DataFrame({
+                    'value': unmatched_values,
+                    'column_name': df_column_name,
+                    'date': date.today()
+                })
+
+                if is_notebook():
+                    script_name = 'notebook'
+                elif script_name is None:
+                    script_filename = os.path.basename(inspect.stack()[1].filename)
+                    script_name = os.path.splitext(script_filename)[0]
+
+                export_dq(dq_df, script_name)
+
+                return mapped_column, dq_df
+            else:
+                return mapped_column, unmatched_values
+
+        return mapped_column
+
+    except Exception as e:
+        print(f"Error occurred while mapping column: {e}")
+        return None
+
+def map_columns_from_dict(df, mapping_dict):
+    """
+    Maps values in multiple DataFrame columns based on a dictionary and handles data quality (DQ) checks.
+    
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the columns to be mapped.
+    mapping_dict (dict): A dictionary specifying the mapping details for each column.
+                         Keys are column names and values are dicts with keys: 'mapping_column_name', 'full_map', 'dq', 'dq_export',
+                         and optionally 'mapping_path', 'keys', 'range' and 'valid_on' (see map_column).
+    
+    Returns:
+    pd.DataFrame: The DataFrame with all specified columns mapped.
+    pd.DataFrame: The DataFrame containing all DQ information if dq_export is True, otherwise None.
+    """
+    all_dq_data = []
+
+    for df_column_name, settings in mapping_dict.items():
+        mapping_column_name = settings.get('mapping_column_name', df_column_name)
+        full_map = settings.get('full_map', False)
+        dq = settings.get('dq', True)
+        dq_export = settings.get('dq_export', False)
+        script_name = settings.get('script_name', None)
+        mapping_path = settings.get('mapping_path', DEFAULT_MAPPING_PATH)
+
+        mapped_column, dq_data = map_column(
+            df, df_column_name, mapping_column_name, dq, dq_export, script_name, full_map, mapping_path,
+            settings.get('keys'), settings.get('range'), settings.get('valid_on')
+        )
+
+        if dq_export and dq_data is not None:
+            all_dq_data.append(dq_data)
+
+    if all_dq_data:
+        all_dq_df = pd.concat(all_dq_data, ignore_index=True)
+        return df, all_dq_df
+
+    return df, None
+
+def export_dq(dq_df, script_name, sheet_name='Sheet1'):
+    """
+    Writes a DataFrame to a sheet of the DQ workbook dq/<script_name>_dq.xlsx.
+
+    Other sheets of an existing workbook are kept, so the unmatched values of
+    map_column and the profile of profile_columns can share one workbook.
+
+    Parameters:
+    dq_df (pd.DataFrame): The DQ data.
+    script_name (str): The name of the script or notebook, used for naming the workbook.
+    sheet_name (str): The sheet to write. Default is 'Sheet1', the sheet map_column writes.
+
+    Returns:
+    str: The path of the workbook.
+    """
+    dq_dir = 'dq'
+    os.makedirs(dq_dir, exist_ok=True)
+    excel_file_path = os.path.join(dq_dir, f"{script_name}_dq.xlsx")
+
+    # The workbook is streamed (see excel.write_excel), so the other sheets are read back and rewritten
+    sheets = {}
+    if os.path.exists(excel_file_path):
+        frames = read_sheets(excel_file_path)
+        for name, parts in group_sheets(list(frames)).items():
+            if name != sheet_name:
+                sheets[name] = [frames[part] for part in parts]
+    sheets[sheet_name] = dq_df
+    write_excel(sheets, excel_file_path)
+
+    print(f"DataFrame exported to {excel_file_path}")
+    return excel_file_path
+
+
+def profile_columns(df, dq_export=False, script_name=None, columns=None, **options):
+    """
+    Profiles the columns of a DataFrame in a single pass: null rates, distinct counts,
+    min/max, mean/std, quantiles, lengths and the most frequent values and patterns.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to profile.
+    dq_export (bool): Whether to write the profile to the 'profile' sheet of the DQ workbook. Default is False.
+    script_name (str): The name of the script or notebook calling this function. Used for naming the DQ workbook.
+    columns (list): Columns to profile. Defaults to all columns.
+    **options: quantiles, top_k and checks (column -> regex that valid values match), see profiling.ColumnProfiler.
+
+    Returns:
+    pd.DataFrame: The profile, one row per column.
+    """
+    profile = ColumnProfiler(**options).update(df if columns is None else df[columns]).result()
+    profile['date'] = date.today()
+
+    if dq_export:
+        if is_notebook():
+            script_name = 'notebook'
+        elif script_name is None:
+            script_filename = os.path.basename(inspect.stack()[1].filename)
+            script_name = os.path.splitext(script_filename)[0]
+
+        export_dq(profile, script_name, sheet_name='profile')
+
+    return profile
+
+
+def convert_to_int(series):
+    """
+    Attempt to convert all values of a Series to integers, without modifying it.
+
+    Parameters:
+    series (pd.Series): The values to be processed.
+
+    Returns:
+    pd.Series: A new Series with every value that int() accepts converted, and the others unchanged.
+    """
+    # Text columns go to object, since pandas' str dtype would turn the integers back into text
+    converted = series.astype(object) if pd.api.types.is_string_dtype(series) else series.copy()
+    for index, value in series.items():
+        try:
+            int_value = int(value)
+            converted.at[index] = int_value
+        except (ValueError, TypeError):
+            pass
+
+    if pd.api.types.is_integer_dtype(converted):
+        converted = converted.astype(int)
+    return converted
+
+
+def force_int_conversion(df, column_name):
+    """
+    Attempt to convert all values in the specified column to integers.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame containing the column to be processed.
+    column_name (str): The name of the column in the DataFrame to be processed.
+
+    Returns:
+    None. The function replaces the column of the DataFrame in-place.
+    """
+    df[column_name] = convert_to_int(df[column_name])
+
+def adjust_dtype(df):
+    """
+    Adjust the dtype of columns in the DataFrame based on their contents.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be processed.
+
+    Returns:
+    None. The function modifies the DataFrame in-place.
+    """
+
+    for column in df.columns:
+        if pd.api.types.is_integer_dtype(df[column]):
+            df[column] = df[column].astype('int64')
+
+        elif pd.api.types.is_float_dtype(df[column]):
+            if df[column].apply(lambda x: isinstance(x, float) or pd.isna(x)).all():
+                df[column] = df[column].astype('float64')
+
+
+def infer_dtypes(df):
+    """
+    Gives object columns the dtype of their values (numbers, dates, booleans) and integer
+    columns with missing values the nullable Int64 dtype instead of float64.
+
+    Text columns are left as they are, even if their values look like numbers.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be processed.
+
+    Returns:
+    pd.DataFrame: The DataFrame with inferred dtypes.
+    """
+    df = df.infer_objects()
+
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_float_dtype(series) and series.isna().any():
+            values = series.dropna()
+            if len(values) and (values == values.round()).all() and values.abs().max() < 2 ** 53:
+                df[column] = series.astype('Int64')
+
+        elif series.dtype == object:
+            kind = pd.api.types.infer_dtype(series, skipna=True)
+            if kind in ('datetime', 'date'):
+                df[column] = pd.to_datetime(series, errors='coerce')
+            elif kind == 'boolean':
+                df[column] = series.astype('boolean')
+
+    return df
+
+
+# Type names accepted by enforce_dtypes besides pandas dtypes
+DTYPE_ALIASES = ('int', 'float', 'str', 'bool', 'date', 'datetime')
+_BOOLEAN_VALUES = {'true': True, 'false': False, '1': True, '0': False, 'yes': True, 'no': False,
+                   'si': True, 'sí': True, 'y': True, 'n': False, 's': True}
+
+
+def enforce_dtypes(df, dtypes):
+    """
+    Converts columns to the given types, one vectorized conversion per column.
+
+    Values that cannot be converted become missing and are reported, instead of
+    failing the whole column.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to be processed.
+    dtypes (dict): Column -> 'int', 'float', 'str', 'bool', 'date', 'datetime' or any pandas dtype.
+                   'int' and 'bool' are the nullable Int64 and boolean dtypes.
+
+    Returns:
+    None. The function modifies the DataFrame in-place.
+    """
+    for column, dtype in dtypes.items():
+        if column not in df.columns:
+            print(f"Column {column} not found, cannot convert it to {dtype}")
+            continue
+
+        series = df[column]
+        if dtype in ('int', 'float'):
+            converted = pd.to_numeric(series, errors='coerce')
+            if dtype == 'int':
+                converted = converted.where(converted == converted.round()).astype('Int64')
+        elif dtype in ('date', 'datetime'):
+            converted = pd.to_datetime(series, errors='coerce')
+            if dtype == 'date':
+                converted = converted.dt.normalize()
+        elif dtype == 'str':
+            converted = series.astype(str).where(series.notna())
+        elif dtype == 'bool':
+            if pd.api.types.is_bool_dtype(series):
+                converted = series.astype('boolean')
+            else:
+                converted = series.astype(str).str.strip().str.lower().map(_BOOLEAN_VALUES).astype('boolean')
+        else:
+            converted = series.astype(dtype)
+
+        failed = int((converted.isna() & series.notna()).sum())
+        if failed:
+            print(f"Column {column}: {failed} value(s) could not be converted to {dtype} and were set to missing")
+        df[column] = converted
+
+
+def sample_data(df, n=100, frac=None, stratify_by=None, random_state=None):
+
+    """
+    Take a sample from the DataFrame.
+
+    Parameters:
+    df (pd.DataFrame): The DataFrame to sample from.
+    n (int): Number of samples to take (default is 100). Ignored if frac is provided.
+    frac (float): Fraction of samples to take (e.g., 0.1 for 10% of the DataFrame). 
+    stratify_by (str): Column to stratify the sample by.
+    random_state (int): Seed for the random number generator for reproducibility.
+
+    Returns:
+    pd.DataFrame: DataFrame containing the sample.
+    """
+
+    if stratify_by:
+        if stratify_by not in df.columns:
+            raise ValueError(f"Column '{stratify_by}' does not exist in the DataFrame.")
+        if frac:
+            sampled_df = df.groupby(stratify_by, group_keys=False).apply(
+                lambda x: x.sample(frac=frac, random_state=random_state)
+            )
+        else:
+            sampled_df = df.groupby(stratify_by, group_keys=False).apply(
+                lambda x: x.sample(n=n // len(df[stratify_by].unique()), random_state=random_state)
+            )
+    else:
+        sampled_df = df.sample(n=n, frac=frac, random_state=random_state)
+    
+    return sampled_df.reset_index(drop=True)
@@ -1,5 +1,6 @@
 #%%
-from utils import *
+from dwh_utils.extraction import *
+from dwh_utils.transform import *
 
 
 #%%
@@ -0,0 +1,107 @@
+"""fetch_all: a request that fails in any way fails alone, the others complete."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from dwh_utils.async_extraction import HttpRequest, fetch_many  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps([{'path': self.path}]).encode()
+        if self.path == '/missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if self.path == '/truncated':
+            # Announces more bytes than it sends
+            self.send_header('Content-Length', str(len(body) + 100))
+        else:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_failed_requests_do_not_cancel_the_others(server):
+    http_requests = [
+        HttpRequest(f'{server}/ok1'),
+        HttpRequest(f'{server}/missing'),
+        HttpRequest('http://:not-a-url'),
+        HttpRequest(f'{server}/truncated'),
+        HttpRequest(f'{server}/ok2'),
+    ]
+    frames = fetch_many(http_requests, max_retries=0, timeout=5)
+
+    assert [df is not None for df in frames] == [True, False, False, False, True]
+    assert frames[4]['path'].tolist() == ['/ok2']
+
+
+def test_raising_on_result_fails_only_its_request(server):
+    def on_result(idx, df):
+        if idx == 0:
+            raise OSError('disk full')
+        return len(df)
+
+    results = fetch_many([HttpRequest(f'{server}/ok1'), HttpRequest(f'{server}/ok2')],
+                         max_retries=0, timeout=5, on_result=on_result)
+
+    assert results == [None, 1]
+
+
+def test_on_result_runs_off_the_event_loop(server):
+    import asyncio
+
+    threads = []
+
+    def on_result(idx, df):
+        # Blocking work here must not stall the downloads
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        threads.append(threading.current_thread())
+        return idx
+
+    results = fetch_many([HttpRequest(f'{server}/ok{idx}') for idx in range(3)], max_retries=0, timeout=5,
+                         on_result=on_result)
+
+    assert results == [0, 1, 2]
+    assert len(set(threads)) == 1 and threads[0] is not threading.main_thread()
+
+
+def test_failed_requests_hold_their_error(server):
+    from dwh_utils.async_extraction import FetchError
+
+    results = fetch_many([HttpRequest(f'{server}/missing'), HttpRequest(f'{server}/ok1')],
+                         max_retries=0, timeout=5, return_exceptions=True)
+
+    assert isinstance(results[0], FetchError) and '404' in str(results[0])
+    assert results[1]['path'].tolist() == ['/ok1']
+
+
+def test_extraction_error_names_the_download_error(server, tmp_path):
+    from dwh_utils.extraction import ExtractionError, perform_extraction
+
+    config = {'extraction': {
+        'output_excel_path': str(tmp_path),
+        'concurrency': 2,
+        'json': [{'url': f'{server}/ok1'}, {'url': f'{server}/missing', 'max_retries': 0}],
+    }}
+    with pytest.raises(ExtractionError, match='404'):
+        perform_extraction(config, str(tmp_path / 'demo_e.py'))
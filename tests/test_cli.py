@@ -0,0 +1,26 @@
+"""dwh-run: configs that cannot run end with the CLI's error message and exit code, not a traceback."""
+import json
+
+from dwh_utils import cli, config
+
+
+def _write_config(folder, name, data):
+    folder.mkdir(exist_ok=True)
+    (folder / f'{name}.json').write_text(json.dumps(data))
+    return str(folder)
+
+
+def test_arrow_staging_without_pyarrow_exits_with_an_error(tmp_path, monkeypatch, capsys):
+    config_dir = _write_config(tmp_path / 'config', 'arrowed', {'extraction': {'staging_format': 'arrow'}})
+    find_spec = config.importlib.util.find_spec
+    monkeypatch.setattr(config.importlib.util, 'find_spec', lambda name: None if name == 'pyarrow' else find_spec(name))
+
+    assert cli.main(['arrowed', '--config-dir', config_dir]) == 2
+    assert 'requires pyarrow' in capsys.readouterr().out
+
+
+def test_invalid_config_exits_with_an_error(tmp_path, capsys):
+    config_dir = _write_config(tmp_path / 'config', 'broken', {'extraction': {'concurrency': 'many'}})
+
+    assert cli.main(['broken', '--config-dir', config_dir]) == 2
+    assert 'concurrency' in capsys.readouterr().out
@@ -0,0 +1,77 @@
+"""Config validation and the compiled plan cache."""
+import json
+import os
+
+import pytest
+
+from dwh_utils.config import ConfigError, clear_config_cache, compile_plan, load_plan, read_config_file, validate_config
+
+
+def _errors(config):
+    with pytest.raises(ConfigError) as info:
+        validate_config(config)
+    return str(info.value)
+
+
+def test_all_problems_are_reported_together():
+    message = _errors({'extraction': {'json': [{'urll': 'http://x'}], 'concurency': 4}})
+    assert "missing required key 'url'" in message
+    assert "unknown key 'urll' (did you mean 'url'?)" in message
+    assert "unknown key 'concurency' (did you mean 'concurrency'?)" in message
+
+
+def test_booleans_are_not_integers():
+    assert 'extraction.concurrency: expected int, got bool' in _errors({'extraction': {'concurrency': True}})
+    assert 'max_retries: expected int, got bool' in _errors({'extraction': {'json': [{'url': 'u', 'max_retries': False}]}})
+
+
+def test_list_elements_are_checked():
+    message = _errors({'extraction': {'csv': [{'url': 'u', 'timeout': [5, 'slow', 1]}]}})
+    assert 'timeout: expected 2 elements, got 3' in message
+    assert 'timeout[1]: expected int or float, got str' in message
+    assert 'keys[0]: expected str' in _errors({'mapping': {'code': {'keys': [1]}}})
+
+
+def test_values_are_checked_beyond_their_type():
+    message = _errors({'extraction': {'memory_budget': 'lots', 'concurrency': 0, 'staging_workers': -2,
+                                      'excel': [{'path': 'stock.xlsx', 'workers': 0}]}})
+    assert "extraction.memory_budget: Invalid memory size 'lots'" in message
+    assert 'extraction.concurrency: expected a positive int, got 0' in message
+    assert 'extraction.staging_workers: expected a positive int, got -2' in message
+    assert 'extraction.excel[0].workers: expected a positive int, got 0' in message
+    assert 'memory_budget: expected a positive size' in _errors({'extraction': {'memory_budget': '0MB'}})
+
+    plan = compile_plan({'extraction': {'memory_budget': '2 KB', 'concurrency': 1}}, 'demo')
+    assert plan.memory_budget == 2048
+
+
+def test_empty_sheets_list_is_rejected():
+    assert 'sheets: empty list' in _errors({'extraction': {'excel': [{'path': 'stock.xlsx', 'sheets': []}]}})
+    validate_config({'extraction': {'excel': [{'path': 'stock.xlsx', 'sheets': None}]}})
+
+
+def test_plan_fills_defaults_and_is_read_only():
+    plan = compile_plan({'extraction': {'json': [{'url': 'u'}], 'csv': [{'url': 'v', 'load_s3': True}]}}, 'demo')
+    assert [source.name for source in plan.sources] == ['json_0', 'csv_0']
+    assert plan.staging_format == 'xlsx' and plan.staging_workers == 1
+    assert plan.sources[1].options['output_folder'] == plan.temp_folders[0]
+    with pytest.raises(TypeError):
+        plan.sources[0].options['url'] = 'other'
+
+
+def test_plan_is_cached_until_the_file_changes(tmp_path):
+    clear_config_cache()
+    path = tmp_path / 'demo.json'
+    path.write_text(json.dumps({'extraction': {'json': [{'url': 'u'}]}}))
+
+    first = load_plan('demo', str(tmp_path))
+    assert load_plan('demo', str(tmp_path)) is first
+
+    # A copy each time, so callers may modify it without touching the cache
+    read_config_file(str(path))['extraction']['json'].clear()
+    assert read_config_file(str(path))['extraction']['json'] == [{'url': 'u'}]
+
+    path.write_text(json.dumps({'extraction': {'json': [{'url': 'u'}, {'url': 'w'}]}}))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert len(load_plan('demo', str(tmp_path)).sources) == 2
@@ -0,0 +1,86 @@
+"""ER diagrams: schemas read from MySQL and the layout of linked tables."""
+import types
+
+import pandas as pd
+import pytest
+
+from dwh_utils import diagram
+
+
+class _Cursor:
+    def __init__(self, results):
+        self.results = list(results)
+
+    def execute(self, query, params=None):
+        self.rows = self.results.pop(0)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def test_information_schema_bytes_are_read_as_text(monkeypatch):
+    # Some mysql.connector versions return information_schema strings as bytes
+    columns = [(b'familia', b'id_familia', b'int', None, b'PRI'), ('articulo', bytearray(b'id_familia'), 'int', None, b'MUL')]
+    foreign_keys = [(b'articulo', b'id_familia', b'familia', b'id_familia')]
+    cursor = _Cursor([columns, foreign_keys])
+    connection = types.SimpleNamespace(cursor=lambda: cursor, close=lambda: None)
+    monkeypatch.setattr(diagram, 'import_optional', lambda name: types.SimpleNamespace(Error=OSError))
+    monkeypatch.setattr(diagram, 'get_mysql_connection', lambda *args: connection)
+
+    columns, foreign_keys = diagram.read_schema_mysql('host', 'user', 'password', 'intranet')
+
+    assert columns['COLUMN_KEY'].tolist() == ['PRI', 'MUL']
+    assert foreign_keys.iloc[0].tolist() == ['articulo', 'id_familia', 'familia', 'id_familia']
+    xml = "".join(diagram.iter_mxgraph(columns, foreign_keys))
+    assert "b&apos;" not in xml and "b'" not in xml
+    assert 'value="Key : id_familia : int"' in xml
+
+
+def _keys(*edges):
+    return pd.DataFrame([(source, column, target, 'id') for source, column, target in edges], columns=diagram.FOREIGN_KEY_COLUMNS)
+
+
+def test_referenced_tables_are_laid_out_above_without_overlaps():
+    heights = {'venta': 200, 'articulo': 120, 'familia': 60, 'tienda': 80, 'a': 60, 'b': 60, 'suelta': 300}
+    keys = _keys(('venta', 'id_articulo', 'articulo'), ('venta', 'id_tienda', 'tienda'),
+                 ('articulo', 'id_familia', 'familia'), ('a', 'id_b', 'b'), ('b', 'id_a', 'a'),
+                 ('venta', 'id_otra', 'missing'))
+
+    positions = diagram.layout_tables(heights, keys)
+
+    assert set(positions) == set(heights)
+    for source, target in [('venta', 'articulo'), ('venta', 'tienda'), ('articulo', 'familia')]:
+        assert positions[target][1] + heights[target] < positions[source][1]
+    assert positions['a'][1] != positions['b'][1]
+
+    boxes = [(x, y, x + diagram.TABLE_WIDTH, y + heights[table]) for table, (x, y) in positions.items()]
+    for idx, (left, top, right, bottom) in enumerate(boxes):
+        for other_left, other_top, other_right, other_bottom in boxes[idx + 1:]:
+            assert right <= other_left or other_right <= left or bottom <= other_top or other_bottom <= top
+
+
+def test_every_foreign_key_between_two_tables_is_drawn():
+    columns = pd.DataFrame([
+        ('tienda', 'id', 'int', None, 'PRI'),
+        ('traspaso', 'id_origen', 'int', None, 'MUL'),
+        ('traspaso', 'id_destino', 'int', None, 'MUL'),
+        ('traspaso', 'nota', 'varchar', 50.0, ''),
+    ], columns=diagram.SCHEMA_COLUMNS)
+    keys = pd.DataFrame([('traspaso', 'id_origen', 'tienda', 'id'), ('traspaso', 'id_destino', 'tienda', 'id')],
+                        columns=diagram.FOREIGN_KEY_COLUMNS)
+
+    xml = "".join(diagram.iter_mxgraph(columns, keys))
+    assert xml.count('edge="1"') == 2
+    assert 'value=" : nota : varchar (50)"' in xml
+
+
+def test_empty_or_unread_schema(tmp_path):
+    path = str(tmp_path / 'er.drawio')
+    diagram.write_er_diagram(pd.DataFrame(columns=diagram.SCHEMA_COLUMNS), path)
+    with open(path, encoding='utf-8') as file:
+        assert 'vertex="1"' not in file.read()
+    with pytest.raises(ValueError, match='read_schema_mysql'):
+        diagram.write_er_diagram(None, path)
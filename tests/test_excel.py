@@ -0,0 +1,112 @@
+"""write_excel: workbooks Excel can open, whose split sheets read back as one table each."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dwh_utils.excel import group_sheets, read_sheets, write_excel
+
+
+def _read_tables(path):
+    frames = read_sheets(path)
+    return {first: pd.concat([frames[name] for name in parts], ignore_index=True)
+            for first, parts in group_sheets(list(frames)).items()}
+
+
+def test_no_sheets_is_an_error(tmp_path):
+    path = str(tmp_path / 'empty.xlsx')
+    with pytest.raises(ValueError, match='at least one'):
+        write_excel({}, path)
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_split_sheets_read_back_next_to_clashing_names(tmp_path, workers):
+    path = str(tmp_path / 'clash.xlsx')
+    sheets = {
+        'a (2)': pd.DataFrame({'x': ['before']}),
+        'a': pd.DataFrame({'n': range(5)}),
+        'b': pd.DataFrame({'n': range(3)}),
+        'b (2)': pd.DataFrame({'y': ['after']}),
+    }
+    # Three rows per sheet, header included
+    write_excel(sheets, path, max_rows=3, workers=workers)
+
+    tables = _read_tables(path)
+    assert list(tables) == ['a (2)', 'a', 'b', 'b (2)_2']
+    assert tables['a (2)']['x'].tolist() == ['before']
+    assert tables['a']['n'].tolist() == list(range(5))
+    assert tables['b']['n'].tolist() == list(range(3))
+    assert tables['b (2)_2']['y'].tolist() == ['after']
+
+
+def test_values_round_trip(tmp_path):
+    path = str(tmp_path / 'types.xlsx')
+    df = pd.DataFrame({
+        'int': [1, -2, 3],
+        'nullable': pd.array([1, None, 3], dtype='Int64'),
+        'float': [0.5, np.nan, 1e-3],
+        'text': ['a & <b>', None, 'línea\x01'],
+        'flag': [True, False, True],
+        'day': pd.to_datetime(['2024-01-31', None, '2024-03-01']),
+        'mixed': [1, 'A', None],
+    })
+    write_excel({'data': df}, path)
+
+    back = read_sheets(path)['data']
+    assert back['int'].tolist() == [1, -2, 3]
+    assert back['nullable'].isna().tolist() == [False, True, False]
+    assert back['float'].tolist()[::2] == [0.5, 1e-3]
+    assert back['text'].tolist()[::2] == ['a & <b>', 'línea']
+    assert back['flag'].tolist() == [True, False, True]
+    assert back['day'].dt.strftime('%Y-%m-%d').tolist()[::2] == ['2024-01-31', '2024-03-01']
+    # Mixed columns are written as their text
+    assert back['mixed'].tolist()[:2] == ['1', 'A']
+
+
+def test_integers_beyond_double_precision_are_written_exactly(tmp_path):
+    path = str(tmp_path / 'ids.xlsx')
+    big = 2 ** 60 + 1
+    write_excel({'int64': pd.DataFrame({'id': [big, 7]}), 'python': pd.DataFrame({'id': [2 ** 70, 7]}, dtype=object)}, path)
+
+    sheets = read_sheets(path, dtype=str)
+    assert sheets['int64']['id'].tolist() == [str(big), '7']
+    assert sheets['python']['id'].tolist() == [str(2 ** 70), '7']
+
+
+def test_long_split_sheet_reads_back_as_one_table(tmp_path):
+    path = str(tmp_path / 'split.xlsx')
+    chunks = (pd.DataFrame({'n': range(start, start + 4)}) for start in range(0, 12, 4))
+    write_excel([('numbers', chunks)], path, max_rows=5)
+
+    assert list(read_sheets(path)) == ['numbers', 'numbers (2)', 'numbers (3)']
+    assert _read_tables(path)['numbers']['n'].tolist() == list(range(12))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sheet_names_stay_unique_after_cleaning(tmp_path, workers):
+    path = str(tmp_path / 'names.xlsx')
+    long_name = 'x' * 40
+    names = ['a/b', 'a?b', 'Data', 'data', long_name, long_name + 'y']
+    write_excel({name: pd.DataFrame({'n': [idx]}) for idx, name in enumerate(names)}, path, workers=workers)
+
+    sheets = read_sheets(path)
+    assert list(sheets) == ['a_b', 'a_b_2', 'Data', 'data_2', 'x' * 31, 'x' * 29 + '_2']
+    assert [df['n'].item() for df in sheets.values()] == list(range(6))
+
+
+def test_failed_write_keeps_the_original_error_and_file(tmp_path):
+    path = tmp_path / 'out.xlsx'
+    path.write_bytes(b'previous')
+
+    def chunks():
+        yield pd.DataFrame({'n': [1]})
+        raise RuntimeError('source went away')
+
+    # The error is raised while the sheet part is still open for writing
+    with pytest.raises(RuntimeError, match='source went away'):
+        write_excel([('data', chunks())], str(path))
+
+    assert path.read_bytes() == b'previous'
+    assert os.listdir(tmp_path) == ['out.xlsx']
@@ -0,0 +1,68 @@
+"""perform_extraction: failed runs resume where they stopped; Excel workbooks as sources."""
+import os
+
+import pandas as pd
+import pytest
+
+from dwh_utils.excel import write_excel
+from dwh_utils.extraction import ExtractionError, perform_extraction, read_excel_file
+from dwh_utils.staging import load_staged
+
+
+def _config(tmp_path, *paths):
+    return {'extraction': {'output_excel_path': str(tmp_path / 'staging'), 'excel': [{'path': path} for path in paths]}}
+
+
+def test_failed_run_resumes_with_the_sources_still_to_do(tmp_path):
+    first, second = str(tmp_path / 'first.xlsx'), str(tmp_path / 'second.xlsx')
+    write_excel({'data': pd.DataFrame({'n': [1, 2]})}, first)
+    script = str(tmp_path / 'demo_e.py')
+
+    with pytest.raises(ExtractionError, match='excel_1'):
+        perform_extraction(_config(tmp_path, first, second), script, run_id='r1')
+
+    # The first source is not read again: the resumed run takes it from its checkpoint
+    write_excel({'data': pd.DataFrame({'n': [3]})}, second)
+    os.remove(first)
+    extracted = perform_extraction(_config(tmp_path, first, second), script)
+
+    assert [df['n'].tolist() for df in extracted['excel']] == [[1, 2], [3]]
+    assert load_staged('demo', str(tmp_path / 'staging'), run_id='r1')['excel_0']['n'].tolist() == [1, 2]
+    # Completed: its checkpoints are gone and the next run starts afresh
+    assert not os.path.exists(tmp_path / 'staging' / 'demo' / 'runs' / 'r1')
+    with pytest.raises(ExtractionError, match='excel_0'):
+        perform_extraction(_config(tmp_path, first, second), script, run_id='r2')
+
+
+def test_changed_source_is_extracted_again_on_resume(tmp_path):
+    first = str(tmp_path / 'first.xlsx')
+    write_excel({'data': pd.DataFrame({'n': [1]})}, first)
+    script = str(tmp_path / 'demo_e.py')
+
+    with pytest.raises(ExtractionError):
+        perform_extraction(_config(tmp_path, first, str(tmp_path / 'missing.xlsx')), script, run_id='r1')
+
+    write_excel({'data': pd.DataFrame({'n': [2]})}, first)
+    config = _config(tmp_path, first)
+    config['extraction']['excel'][0]['header'] = 0
+    extracted = perform_extraction(config, script)
+    assert extracted['excel'][0]['n'].tolist() == [2]
+
+
+def test_excel_sheets_are_stacked_with_their_sheet_name(tmp_path):
+    path = str(tmp_path / 'stock.xlsx')
+    write_excel({'norte': pd.DataFrame({'codigo': ['01', '02'], 'unidades': [1, 2]}),
+                 'sur': pd.DataFrame({'codigo': ['03'], 'unidades': ['x']}),
+                 'notas': pd.DataFrame({'texto': ['ignored']})}, path)
+
+    df = read_excel_file(path, sheets=['norte', 'sur'], dtype={'unidades': 'int', 'codigo': 'str'})
+    assert df['sheet'].tolist() == ['norte', 'norte', 'sur']
+    assert df['codigo'].tolist() == ['01', '02', '03']
+    # A value that is not a number becomes missing instead of failing the column
+    assert str(df['unidades'].dtype) == 'Int64'
+    assert df['unidades'].tolist()[:2] == [1, 2] and pd.isna(df['unidades'].iloc[2])
+
+    single = read_excel_file(path, sheets='notas')
+    assert list(single.columns) == ['texto']
+    assert read_excel_file(path, sheets=[]).empty
+    assert read_excel_file(str(tmp_path / 'missing.xlsx')) is None
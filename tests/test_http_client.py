@@ -0,0 +1,115 @@
+"""Retries of http_client and the asyncio engine: backoff, Retry-After and the per-host token bucket."""
+import threading
+import time
+import types
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+        if self.path == '/flaky':
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/busy':
+            # A server that asks to come back tomorrow
+            self.send_response(503)
+            self.send_header('Retry-After', '86400')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = b'[{"ok": 1}]'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _response(retry_after):
+    return types.SimpleNamespace(headers={'Retry-After': retry_after} if retry_after is not None else {})
+
+
+def test_backoff_delays_stay_within_their_exponential_cap():
+    from dwh_utils.http_client import backoff_delay
+
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, base=0.5, cap=10) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= min(10, 0.5 * 2 ** attempt)
+    # Full jitter: the delays are spread, not all at the cap
+    assert len({round(delay, 3) for delay in delays}) > 100
+
+
+def test_retry_after_reads_seconds_and_dates():
+    from dwh_utils.http_client import retry_after_seconds
+
+    assert retry_after_seconds(_response('7')) == 7
+    assert 25 <= retry_after_seconds(_response(formatdate(time.time() + 30, usegmt=True))) <= 30
+    assert retry_after_seconds(_response(formatdate(time.time() - 30, usegmt=True))) == 0
+    assert retry_after_seconds(_response('soon')) is None
+    assert retry_after_seconds(_response(None)) is None
+    assert retry_after_seconds(None) is None
+
+
+def test_token_bucket_allows_a_burst_then_the_rate():
+    from dwh_utils.http_client import TokenBucket
+
+    bucket = TokenBucket(rate=10, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert 0 < bucket.try_acquire() <= 0.1
+
+    bucket.pause(5)
+    time.sleep(0.2)
+    # Tokens refilled meanwhile, but the host is paused
+    assert 4.5 < bucket.try_acquire() <= 5
+
+
+def test_per_request_max_retries_wins_when_fetching_concurrently(server):
+    pytest.importorskip('aiohttp')
+    from dwh_utils.async_extraction import HttpRequest, fetch_many
+
+    _Handler.hits.clear()
+    results = fetch_many([HttpRequest(f'{server}/flaky', max_retries=2)], max_retries=0, max_backoff=0.05)
+    assert results == [None]
+    assert _Handler.hits['/flaky'] == 3
+
+
+def test_retry_after_beyond_max_backoff_fails_the_request(server):
+    requests = pytest.importorskip('requests')
+    from dwh_utils.http_client import http_get
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError, match='max_backoff'):
+        http_get(f'{server}/busy', max_retries=3, max_backoff=5)
+    assert time.monotonic() - started < 5
+
+
+def test_retry_after_beyond_max_backoff_fails_the_async_request(server):
+    pytest.importorskip('aiohttp')
+    from dwh_utils.async_extraction import FetchError, HttpRequest, fetch_many
+
+    started = time.monotonic()
+    results = fetch_many([HttpRequest(f'{server}/busy'), HttpRequest(f'{server}/ok')],
+                         max_retries=3, max_backoff=5, return_exceptions=True)
+    assert time.monotonic() - started < 5
+    assert isinstance(results[0], FetchError) and 'max_backoff' in str(results[0])
+    assert results[1]['ok'].tolist() == [1]
@@ -0,0 +1,86 @@
+"""
+Import budget of dwh_utils.
+
+`import dwh_utils` must not load anything, and the modules the ETL scripts use
+must not load the optional dependencies (see dwh_utils/_optional.py): those are
+imported by the functions that need them. What was imported, and how long it
+took, is read from `python -X importtime` in fresh interpreters. The time limits
+are generous and take the best of RUNS runs, so that a slow or busy machine does
+not fail them: they catch heavy work creeping into module level, not noise.
+"""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that only the functions using them may import
+OPTIONAL_MODULES = ['requests', 'aiohttp', 'duckdb', 'mysql.connector', 'openpyxl', 'IPython']
+
+SCRIPT_IMPORT = "import dwh_utils.extraction, dwh_utils.transform, dwh_utils.load, dwh_utils.staging"
+RUNS = 3
+
+# Time spent in dwh_utils' own modules (self time, pandas and the stdlib excluded)
+# when a script imports them: about 0.006 s measured
+OWN_MODULES_BUDGET_SECONDS = 0.25
+# `import dwh_utils` may cost at most this multiple of `import json`, measured in the same interpreter
+PACKAGE_TO_JSON_RATIO = 3
+
+
+def _import_times(statement):
+    """
+    Imports of a fresh interpreter running statement, from `python -X importtime`.
+
+    Returns:
+    dict: module name -> (self seconds, cumulative seconds).
+    """
+    path = os.path.join(REPO_ROOT, 'dwh-utils')
+    if os.environ.get('PYTHONPATH'):
+        path += os.pathsep + os.environ['PYTHONPATH']
+    env = dict(os.environ, PYTHONPATH=path)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            capture_output=True, text=True, env=env, check=True)
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        imports[name.strip()] = (int(own) / 1e6, int(cumulative) / 1e6)
+    return imports
+
+
+def _is_dwh_utils(name):
+    return name == 'dwh_utils' or name.startswith('dwh_utils.')
+
+
+def test_package_import_loads_nothing():
+    modules = _import_times("import dwh_utils")
+
+    assert [name for name in OPTIONAL_MODULES if name in modules] == []
+    assert 'pandas' not in modules
+    assert sorted(name for name in modules if name.startswith('dwh_utils.')) == []
+
+
+def test_package_import_costs_no_more_than_a_small_stdlib_import():
+    ratios = []
+    for _ in range(RUNS):
+        # json first, so that the modules both share are charged to the baseline
+        imports = _import_times("import json, dwh_utils")
+        ratios.append(imports['dwh_utils'][1] / imports['json'][1])
+
+    assert min(ratios) <= PACKAGE_TO_JSON_RATIO
+
+
+def test_script_imports_skip_optional_dependencies():
+    modules = _import_times(SCRIPT_IMPORT)
+
+    loaded = [name for name in OPTIONAL_MODULES if name in modules]
+    assert loaded == [], f"{SCRIPT_IMPORT} loaded {', '.join(loaded)}"
+
+
+def test_script_imports_stay_within_the_own_modules_budget():
+    own = min(sum(seconds for name, (seconds, _) in _import_times(SCRIPT_IMPORT).items() if _is_dwh_utils(name))
+              for _ in range(RUNS))
+
+    assert own <= OWN_MODULES_BUDGET_SECONDS, f"dwh_utils' own modules took {own:.3f} s to import"
@@ -0,0 +1,48 @@
+"""LazyTable over staged partitions: steps never edit the chunks they are given."""
+import pandas as pd
+import pytest
+
+from dwh_utils.lazy import scan_staged
+
+
+def test_force_int_conversion_over_an_arrow_partition(tmp_path):
+    pytest.importorskip('pyarrow')
+    from dwh_utils.staging import read_arrow, write_arrow
+
+    path = str(tmp_path / 'sql_0.arrow')
+    write_arrow(pd.DataFrame({'total': [1.0, 2.0, 3.0], 'code': ['1', 'x', '3']}), path)
+
+    result = scan_staged(path).force_int_conversion('total').force_int_conversion('code').collect()
+
+    assert result['total'].tolist() == [1, 2, 3]
+    assert result['code'].tolist() == [1, 'x', 3]
+    # The memory-mapped file is left as staged
+    staged = read_arrow(path)
+    assert staged['total'].tolist() == [1.0, 2.0, 3.0]
+    assert staged['code'].tolist() == ['1', 'x', '3']
+
+
+def test_only_the_selected_and_step_columns_are_read(tmp_path):
+    path = tmp_path / 'sql_0.csv'
+    pd.DataFrame({'a': [1, 2], 'b': [3, 4], 'c': [5, 6], 'd': [7, 8]}).to_csv(path, index=False)
+    seen = []
+
+    def step(chunk):
+        seen.append(sorted(chunk.columns))
+        return chunk.assign(a=chunk['a'] + chunk['b'])
+
+    table = scan_staged(str(path)).pipe(step, ['b']).select(['a'])
+
+    assert table.required_columns() == ['a', 'b']
+    assert table.collect().to_dict('list') == {'a': [4, 6]}
+    assert seen == [['a', 'b']]
+
+
+def test_csv_and_excel_partitions_take_their_own_read_options(tmp_path):
+    from dwh_utils.excel import write_excel
+
+    (tmp_path / 'part_0.csv').write_text('a;b\n1;2\n')
+    write_excel({'data': pd.DataFrame({'a': [3], 'b': [4]})}, str(tmp_path / 'part_1.xlsx'))
+
+    result = scan_staged(str(tmp_path), csv_options={'sep': ';'}).select(['a']).collect()
+    assert sorted(result['a'].tolist()) == [1, 3]
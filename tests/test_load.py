@@ -0,0 +1,94 @@
+"""MySQL loads: the rows handed to the driver, and what is committed or rolled back."""
+import decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dwh_utils import load
+from dwh_utils.load import _to_rows
+
+
+class _Connection:
+    """Records the statements run through it, and whether they were committed or rolled back."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.log = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.log.append(query.split()[0] + ' ' + query.split()[1])
+
+    def executemany(self, query, rows):
+        mysql = pytest.importorskip('mysql.connector')
+        if self.fail_on is not None and rows[0][0] == self.fail_on:
+            raise mysql.Error("Data too long")
+        self.log.append(f"INSERT {len(rows)}")
+
+    def fetchall(self):
+        return []
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+    def rollback(self):
+        self.log.append('ROLLBACK')
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    pytest.importorskip('mysql.connector')
+    conn = _Connection()
+    monkeypatch.setattr(load, 'get_mysql_connection', lambda *args: conn)
+    return conn
+
+
+def test_rows_keep_each_column_type_and_send_missing_as_none():
+    df = pd.DataFrame({
+        'units': pd.array([2 ** 60 + 1, None], dtype='Int64'),
+        'price': [1.5, np.nan],
+        'name': ['a', None],
+        'opened': pd.to_datetime(['2024-01-01', None]),
+        'amount': [decimal.Decimal('0.10'), None],
+    })
+
+    rows = _to_rows(df)
+
+    assert rows[0] == (2 ** 60 + 1, 1.5, 'a', pd.Timestamp('2024-01-01'), decimal.Decimal('0.10'))
+    assert type(rows[0][0]) is int
+    assert rows[1] == (None, None, None, None, None)
+    # The frame itself is left as it was
+    assert df['name'].isna().tolist() == [False, True] and df['amount'][1] is None
+
+
+def test_streamed_chunks_load_in_one_transaction(connection):
+    chunks = (pd.DataFrame({'n': [start, start + 1]}) for start in (0, 2, 4))
+
+    assert load.load_chunks_to_mysql(chunks, 'host', 'user', 'password', 'dwh', 't', truncate=True) == 6
+    assert connection.log == ['DELETE FROM', 'INSERT 2', 'INSERT 2', 'INSERT 2', 'COMMIT']
+
+
+def test_failed_chunk_rolls_the_whole_load_back(connection):
+    connection.fail_on = 2
+    chunks = (pd.DataFrame({'n': [start, start + 1]}) for start in (0, 2, 4))
+
+    assert load.load_chunks_to_mysql(chunks, 'host', 'user', 'password', 'dwh', 't', truncate=True) is None
+    assert connection.log == ['DELETE FROM', 'INSERT 2', 'ROLLBACK']
+
+
+def test_ddl_runs_before_the_load_transaction(connection):
+    from dwh_utils.schema import ColumnSpec, TableSchema
+
+    table_schema = TableSchema('t', (ColumnSpec('n', 'INT', False),), ('n',), ())
+    connection.fail_on = 1
+
+    assert load.load_to_mysql(pd.DataFrame({'n': [1]}), 'host', 'user', 'password', 'dwh', 't',
+                              truncate=True, schema=table_schema, create=True) is None
+    # The table is emptied with DELETE, which the rollback undoes; CREATE has committed on its own
+    assert connection.log == ['CREATE TABLE', 'SELECT COLUMN_NAME,', 'DELETE FROM', 'ROLLBACK']
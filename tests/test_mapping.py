@@ -0,0 +1,115 @@
+"""MappingIndex: composite-key, range and validity-date lookups, and the cached load of a sheet."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dwh_utils.excel import write_excel
+from dwh_utils.mapping import MappingIndex, index_keys, load_mapping_index
+
+
+def test_index_keys():
+    assert index_keys('Provincia') is None
+    assert index_keys('Provincia', range_column='Importe') == ['Provincia']
+    assert index_keys('Zona', keys=['Provincia', 'Municipio']) == ['Provincia', 'Municipio']
+
+
+def test_composite_keys_take_the_last_row_like_a_dictionary():
+    sheet = pd.DataFrame([
+        ('Norte', 'Asturias', 'Oviedo'),
+        ('Sur', 'Sevilla', 'Sevilla'),
+        ('Centro', 'Madrid', 'Madrid'),
+        ('Capital', 'Madrid', 'Madrid'),
+        ('Nada', None, 'Oviedo'),
+    ])
+    df = pd.DataFrame({'provincia': ['Madrid', 'Sevilla', 'Asturias', 'Madrid', 'Cuenca'],
+                       'municipio': ['Madrid', 'Sevilla', 'Gijon', 'Getafe', 'Cuenca']})
+
+    index = MappingIndex(sheet, key_count=2)
+    mapped, matched = index.map(df, ['provincia', 'municipio'])
+
+    reference = dict(zip(zip(sheet[1], sheet[2]), sheet[0]))
+    expected = [reference.get(key) for key in zip(df['provincia'], df['municipio'])]
+    assert mapped.tolist() == [value if value is not None else np.nan for value in expected]
+    assert matched.tolist() == [value is not None for value in expected]
+    assert len(index) == 4
+    with pytest.raises(ValueError, match='2 key column'):
+        index.lookup(df, ['provincia'])
+
+
+def test_range_bands_per_key_and_open_ended():
+    sheet = pd.DataFrame([
+        ('A-low', 'A', 0, 100),
+        ('A-high', 'A', 100, None),
+        ('B-mid', 'B', 50, 60),
+    ])
+    df = pd.DataFrame({'tarifa': ['A', 'A', 'A', 'B', 'B', 'B', 'C', 'A'],
+                       'importe': [0, 99.5, 1e9, 49, 50, 60, 10, np.nan]})
+
+    mapped, matched = MappingIndex(sheet, ranged=True).map(df, ['tarifa'], range_column='importe')
+
+    assert mapped.tolist()[:3] == ['A-low', 'A-low', 'A-high']
+    assert mapped.tolist()[4] == 'B-mid'
+    assert matched.tolist() == [True, True, True, False, True, False, False, False]
+
+
+def test_bands_without_keys():
+    sheet = pd.DataFrame([('small', 0, 10), ('large', 10, None)])
+    df = pd.DataFrame({'units': [3, 10, -1]})
+    mapped, _ = MappingIndex(sheet, key_count=0, ranged=True).map(df, [], range_column='units')
+    assert mapped.tolist()[:2] == ['small', 'large'] and pd.isna(mapped.iloc[2])
+
+
+def test_validity_windows_pick_the_version_in_force():
+    sheet = pd.DataFrame([
+        ('old', 'X', pd.Timestamp('2020-01-01'), pd.Timestamp('2023-01-01')),
+        ('new', 'X', pd.Timestamp('2023-01-01'), pd.NaT),
+        ('gone', 'Y', pd.Timestamp('2020-01-01'), pd.Timestamp('2021-01-01')),
+    ])
+    df = pd.DataFrame({'code': ['X', 'X', 'X', 'Y', 'Y'],
+                       'fecha': pd.to_datetime(['2019-12-31', '2022-12-31', '2030-01-01', '2020-06-01', '2021-01-01'])})
+
+    mapped, matched = MappingIndex(sheet, validity=True).map(df, ['code'], valid_on='fecha')
+
+    assert matched.tolist() == [False, True, True, True, False]
+    assert mapped[matched].tolist() == ['old', 'new', 'gone']
+    with pytest.raises(ValueError, match='valid_on'):
+        MappingIndex(sheet, validity=True).lookup(df, ['code'])
+
+
+def test_bands_within_the_version_in_force():
+    sheet = pd.DataFrame([
+        ('2020 low', 'X', 0, 100, '2020-01-01', '2024-01-01'),
+        ('2020 high', 'X', 100, None, '2020-01-01', '2024-01-01'),
+        ('2024 any', 'X', 0, None, '2024-01-01', None),
+    ])
+    sheet[4] = pd.to_datetime(sheet[4])
+    sheet[5] = pd.to_datetime(sheet[5])
+    df = pd.DataFrame({'code': ['X'] * 4, 'importe': [50, 150, 150, -5],
+                       'fecha': pd.to_datetime(['2022-01-01', '2022-01-01', '2024-06-01', '2024-06-01'])})
+
+    mapped, matched = MappingIndex(sheet, ranged=True, validity=True).map(df, ['code'], range_column='importe', valid_on='fecha')
+    assert mapped[matched].tolist() == ['2020 low', '2020 high', '2024 any']
+    assert not matched[3]
+
+
+def test_load_mapping_index_reads_the_sheet_again_once_edited(tmp_path):
+    path = str(tmp_path / 'Mapping.xlsx')
+    df = pd.DataFrame({'tarifa': ['A'], 'importe': [5]})
+
+    def write(mapped):
+        write_excel({'Tarifas': pd.DataFrame({'mapped': [mapped], 'key': ['A'], 'low': [0], 'high': [10]})}, path)
+
+    write('v1')
+    # The header row is read as data, but its bounds are not numbers so it never matches
+    index = load_mapping_index('Tarifas', path, ranged=True)
+    assert len(index) == 1
+    assert index.map(df, ['tarifa'], range_column='importe')[0].tolist() == ['v1']
+    assert load_mapping_index('Tarifas', path, ranged=True) is index
+
+    write('v2')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    edited = load_mapping_index('Tarifas', path, ranged=True)
+    assert edited.map(df, ['tarifa'], range_column='importe')[0].tolist() == ['v2']
@@ -0,0 +1,126 @@
+"""SpillStore: frames beyond the memory budget go to disk and come back on access."""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from dwh_utils import extraction
+from dwh_utils.memory import SpillStore, frame_nbytes, parse_size
+
+
+def _frame(n):
+    return pd.DataFrame({'n': range(n)})
+
+
+def test_parse_size():
+    assert parse_size(2048) == 2048
+    assert parse_size('512MB') == 512 * 1024 ** 2
+    assert parse_size(' 1.5 kb ') == 1536
+    with pytest.raises(ValueError, match='Invalid memory size'):
+        parse_size('lots')
+
+
+def test_least_recently_used_frames_are_spilled_and_read_back(tmp_path):
+    budget = frame_nbytes(_frame(100)) * 2
+    with SpillStore(budget, str(tmp_path / 'spill')) as store:
+        store['a'] = _frame(100)
+        store['b'] = _frame(100)
+        store.get('a')
+        store['c'] = _frame(100)
+
+        # 'b' was the least recently used
+        assert store.spilled == 1
+        assert os.listdir(tmp_path / 'spill') == ['b' + store.suffix]
+        assert store.nbytes <= budget
+        assert store['b']['n'].tolist() == list(range(100))
+        # Back in memory, its spill file is gone; 'a' made room for it
+        assert os.listdir(tmp_path / 'spill') == ['a' + store.suffix]
+        assert sorted(store) == ['a', 'b', 'c']
+
+    assert os.listdir(tmp_path / 'spill') == []
+
+
+def test_frames_with_a_loader_are_dropped_instead_of_spilled(tmp_path):
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return _frame(10)
+
+    with SpillStore(1) as store:
+        store.put('a', _frame(10), loader)
+        store.add_lazy('b', loader)
+        assert loads == []
+
+        view = store.view(['a', 'b'])
+        assert len(view) == 2
+        assert view[1]['n'].tolist() == list(range(10))
+        # Loading 'b' evicted 'a', which is read back through its loader, never written
+        assert view[0]['n'].tolist() == list(range(10))
+        assert loads == [1, 1]
+        assert store.spill_dir is None
+
+
+def test_relocated_frame_drops_its_spill_file(tmp_path):
+    store = SpillStore(1, str(tmp_path))
+    store['a'] = _frame(10)
+    store['b'] = _frame(10)
+    assert os.listdir(tmp_path) == ['a' + store.suffix]
+
+    store.relocate('a', lambda: _frame(3))
+    assert os.listdir(tmp_path) == []
+    assert len(store['a']) == 3
+    with pytest.raises(KeyError):
+        store.relocate('missing', lambda: _frame(3))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps([{'n': n} for n in range(1000)]).encode()
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_prefetched_sources_are_held_under_the_budget(tmp_path, monkeypatch):
+    pytest.importorskip('aiohttp')
+    stores = []
+
+    class RecordingStore(SpillStore):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.peak = 0
+            stores.append(self)
+
+        def put(self, key, df, loader=None):
+            super().put(key, df, loader)
+            self.peak = max(self.peak, self.nbytes)
+
+    monkeypatch.setattr(extraction, 'SpillStore', RecordingStore)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{httpd.server_port}'
+        config = {'extraction': {
+            'output_excel_path': str(tmp_path / 'staging'), 'staging_format': 'arrow',
+            'concurrency': 3, 'memory_budget': 1,
+            'json': [{'url': f'{url}/{idx}'} for idx in range(3)],
+        }}
+        extracted = extraction.perform_extraction(config, str(tmp_path / 'demo_e.py'))
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    # Each download went into the store with its checkpoint as loader: one frame at a time, no spill files
+    store, = stores
+    assert store.peak == frame_nbytes(extracted['json'][0])
+    assert store.spilled >= 2
+    assert store.spill_dir is None
+    assert [len(df) for df in extracted['json']] == [1000, 1000, 1000]
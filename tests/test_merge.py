@@ -0,0 +1,61 @@
+"""merge_files: duplicates dropped across files, and a failed merge leaves the output alone."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dwh_utils.merge import RowHashSet, merge_files
+
+
+def _write_csv(path, **columns):
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+
+def test_row_hash_set_marks_first_occurrences():
+    seen = RowHashSet()
+    assert seen.add_new([3, 1, 3]).tolist() == [True, True, False]
+    for batch in range(10):
+        seen.add_new(np.arange(batch * 5, batch * 5 + 10, dtype=np.uint64))
+    assert seen.add_new([1, 100, 100]).tolist() == [False, True, False]
+    assert len(seen) == 56
+    assert len(seen.runs) <= 4
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_duplicates_are_dropped_across_files_in_file_order(tmp_path, workers):
+    _write_csv(tmp_path / 'a.csv', id=[1, 2, 2], name=['x', 'y', 'y'])
+    # Same rows with the columns in another order, and '01' is not the same text as '1'
+    pd.DataFrame({'name': ['y', 'z', 'x'], 'id': ['2', '3', '01']}).to_csv(tmp_path / 'b.csv', index=False)
+    output = str(tmp_path / 'merged.csv')
+
+    assert merge_files(str(tmp_path / '*.csv'), output, workers=workers, chunksize=2) == (6, 4)
+    merged = pd.read_csv(output, dtype=str)
+    assert merged.to_dict('list') == {'id': ['1', '2', '3', '01'], 'name': ['x', 'y', 'z', 'x']}
+
+    # Re-running into the input folder skips the output itself
+    assert merge_files(str(tmp_path), output, subset=['name'], workers=workers) == (6, 3)
+
+
+def test_failed_merge_keeps_the_previous_output(tmp_path):
+    _write_csv(tmp_path / 'a.csv', id=[1])
+    _write_csv(tmp_path / 'b.csv', id=[2], extra=['e'])
+    output = tmp_path / 'out' / 'merged.csv'
+    output.parent.mkdir()
+    output.write_text('previous\n')
+
+    with pytest.raises(ValueError, match='extra'):
+        merge_files([str(tmp_path / 'a.csv'), str(tmp_path / 'b.csv')], str(output), workers=1)
+
+    assert output.read_text() == 'previous\n'
+    assert os.listdir(output.parent) == ['merged.csv']
+
+
+def test_files_without_a_column_dedupe_against_rows_where_it_is_empty(tmp_path):
+    (tmp_path / 'a.csv').write_text('a,b\n1,x\n2,y\n')
+    (tmp_path / 'b.csv').write_text('a\n1\n1\n')
+    (tmp_path / 'c.csv').write_text('a,b\n1,\n')
+    output = str(tmp_path / 'out' / 'merged.csv')
+
+    assert merge_files(str(tmp_path / '*.csv'), output, workers=2) == (5, 3)
+    assert pd.read_csv(output, dtype=str, keep_default_na=False).to_dict('list') == {'a': ['1', '2', '1'], 'b': ['x', 'y', '']}
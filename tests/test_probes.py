@@ -0,0 +1,85 @@
+"""Change probes: the fingerprint a table is compared by, and the extract kept with it."""
+import datetime
+
+import pandas as pd
+import pytest
+
+from dwh_utils import probes
+from dwh_utils.probes import ProbeStore, probe_mysql_table
+
+OPTIONS = {'host': 'db', 'database': 'intranet', 'table': 'stock'}
+
+
+class _Connection:
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=()):
+        self.queries.append(query)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    pytest.importorskip('mysql.connector')
+    conn = _Connection(None)
+    monkeypatch.setattr(probes, 'get_mysql_connection', lambda *args: conn)
+    return conn
+
+
+def _probe(method, probe_column=None):
+    return probe_mysql_table('db', 'user', 'password', 'intranet', 'stock', method, probe_column)
+
+
+def test_update_time_probe_reads_uncached_statistics(server):
+    server.row = (datetime.datetime(2024, 6, 24, 15, 44), 0)
+
+    assert _probe('update_time') == '["update_time", "2024-06-24 15:44:00"]'
+    assert server.queries[0] == 'SET SESSION information_schema_stats_expiry = 0'
+    assert 'TABLE_ROWS' not in server.queries[1]
+
+
+def test_unknown_update_time_always_extracts(server):
+    server.row = (None, None)
+    assert _probe('update_time') is None
+
+
+def test_write_in_the_probes_own_second_always_extracts(server):
+    # UPDATE_TIME has one-second resolution, so a later write in this second would not change it
+    server.row = (datetime.datetime(2024, 6, 24, 15, 44, 10), 1)
+    assert _probe('update_time') is None
+    assert 'UPDATE_TIME >= NOW()' in server.queries[1]
+
+
+def test_fingerprint_probe_needs_a_probe_column(server):
+    with pytest.raises(ValueError, match='probe_column'):
+        _probe('fingerprint')
+
+    server.row = (10, datetime.datetime(2024, 6, 24))
+    assert _probe('fingerprint', 'updated_at') == '["fingerprint", 10, "2024-06-24 00:00:00"]'
+    assert server.queries == ['SELECT COUNT(*), MAX(updated_at) FROM stock']
+
+
+def test_stored_extract_is_reused_only_for_the_same_fingerprint(tmp_path):
+    ProbeStore('demo', str(tmp_path)).remember(OPTIONS, 'v1', pd.DataFrame({'n': [1, 2]}))
+
+    store = ProbeStore('demo', str(tmp_path))
+    assert store.lookup(OPTIONS, 'v1')['n'].tolist() == [1, 2]
+    assert store.lookup(OPTIONS, 'v2') is None
+    assert store.lookup(OPTIONS, None) is None
+    assert store.lookup(dict(OPTIONS, table='other'), 'v1') is None
+
+
+def test_unknown_fingerprint_is_not_stored(tmp_path):
+    store = ProbeStore('demo', str(tmp_path))
+    store.remember(OPTIONS, None, pd.DataFrame({'n': [1]}))
+    assert store.state == {}
@@ -0,0 +1,83 @@
+"""ColumnProfiler: chunked and merged profiles agree with pandas on the whole data."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dwh_utils.profiling import ColumnProfiler, HyperLogLog, QuantileSketch, profile_frame
+
+
+def _profile(df, chunks=1, **options):
+    profiler = ColumnProfiler(**options)
+    for chunk in np.array_split(np.arange(len(df)), chunks):
+        profiler.update(df.iloc[chunk])
+    return profiler.result().set_index('column')
+
+
+def test_chunked_profile_matches_pandas():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'amount': rng.normal(100, 15, 300).round(2),
+        'code': rng.choice(['AB-1', 'CD-22', None], 300),
+    })
+    df.loc[::7, 'amount'] = np.nan
+
+    report = _profile(df, chunks=4, checks={'code': r'[A-Z]{2}-\d'})
+    amount, code = report.loc['amount'], report.loc['code']
+
+    assert amount['nulls'] == df['amount'].isna().sum()
+    assert amount['distinct'] == df['amount'].nunique()
+    assert amount['min'] == df['amount'].min() and amount['max'] == df['amount'].max()
+    assert amount['mean'] == pytest.approx(df['amount'].mean())
+    assert amount['std'] == pytest.approx(df['amount'].std())
+    # Exact below the sketch capacity
+    assert amount['p50'] == df['amount'].dropna().quantile(0.5, interpolation='lower')
+
+    assert code['distinct'] == 2 and bool(code['distinct_exact'])
+    assert (code['min_length'], code['max_length']) == (4, 5)
+    assert code['top_patterns'].startswith(('AA-9 ', 'AA-99 '))
+    assert code['invalid'] == (df['code'] == 'CD-22').sum()
+    assert pd.isna(report.loc['amount', 'invalid'])
+
+
+def test_variance_survives_a_large_offset():
+    values = 1e9 + np.arange(1000) % 10
+    report = _profile(pd.DataFrame({'x': values}), chunks=7)
+    assert report.loc['x', 'std'] == pytest.approx(np.std(values, ddof=1), rel=1e-9)
+
+
+def test_merged_profilers_equal_a_single_pass():
+    # Fewer distinct values than the frequent value counters keep, with no ties among the top ones
+    n = np.random.default_rng(0).permutation(np.repeat(np.arange(40), np.arange(1, 41)))
+    df = pd.DataFrame({'n': n, 's': [f'v{value % 30}' for value in n]})
+    merged = ColumnProfiler().update(df.iloc[:500]).merge(ColumnProfiler().update(df.iloc[500:])).result()
+    single = profile_frame(df)
+    pd.testing.assert_frame_equal(merged, single)
+
+
+def test_merging_a_deeper_sketch_keeps_every_value():
+    shallow = QuantileSketch(k=16, seed=1)
+    shallow.update(np.arange(10))
+    deep = QuantileSketch(k=16, seed=2)
+    deep.update(np.arange(10_000))
+
+    shallow.merge(deep)
+    weights = sum(len(level) * 2 ** idx for idx, level in enumerate(shallow.levels))
+    assert shallow.count == 10_010
+    assert weights == pytest.approx(shallow.count, rel=0.01)
+    assert shallow.quantiles([0.5])[0] == pytest.approx(5000, rel=0.1)
+
+
+def test_categorical_min_max_follow_the_category_order():
+    categories = ['low', 'medium', 'high']
+    df = pd.DataFrame({'level': pd.Categorical(['medium', 'high', 'medium', 'low'], categories=categories)})
+    report = _profile(df, chunks=2)
+    assert (report.loc['level', 'min'], report.loc['level', 'max']) == ('low', 'high')
+
+
+def test_distinct_estimate_is_within_the_standard_error():
+    hll = HyperLogLog(14)
+    for start in range(0, 200_000, 50_000):
+        hll.update(pd.util.hash_array(np.arange(start, start + 50_000)))
+    assert not hll.is_exact
+    # Four standard errors, 1.04/sqrt(2**14)
+    assert hll.count() == pytest.approx(200_000, rel=4 * 1.04 / 2 ** 7)
@@ -0,0 +1,80 @@
+"""Row hashes of scd.scd2_merge: real changes are seen, and re-reading the dimension changes nothing."""
+import datetime
+import decimal
+
+import numpy as np
+import pandas as pd
+
+from dwh_utils.scd import row_hash, scd2_merge
+
+
+def _merge(incoming, current):
+    return scd2_merge(incoming, current, 'code', effective_date=pd.Timestamp('2024-06-01'))
+
+
+def test_large_integer_change_changes_the_hash():
+    before = pd.DataFrame({'amount': [2 ** 60]})
+    after = pd.DataFrame({'amount': [2 ** 60 + 1]})
+    assert row_hash(before, ['amount'])[0] != row_hash(after, ['amount'])[0]
+
+
+def test_precise_decimal_change_changes_the_hash():
+    before = pd.DataFrame({'amount': [decimal.Decimal('12345678901234567.01')]})
+    after = pd.DataFrame({'amount': [decimal.Decimal('12345678901234567.02')]})
+    assert row_hash(before, ['amount'])[0] != row_hash(after, ['amount'])[0]
+
+
+def test_dimension_read_back_from_mysql_is_unchanged():
+    incoming = pd.DataFrame({
+        'code': [1, 2, 3],
+        'name': ['a', 'b', None],
+        'price': [1.5, 0.1, np.nan],
+        'units': pd.array([1, None, 2 ** 60], dtype='Int64'),
+        'opened': pd.to_datetime(['2024-01-01', '2024-02-01', None]),
+        'note': [np.nan, np.nan, np.nan],
+        'comment': pd.Series([None, None, None], dtype=object),
+    })
+    # The same rows as mysql.connector returns them: Decimal, date, floats for integers
+    # with NULLs, and the all-NULL columns swapped between None and NaN
+    current = pd.DataFrame({
+        'sk': [10, 11, 12],
+        'code': [1, 2, 3],
+        'name': ['a', 'b', None],
+        'price': [decimal.Decimal('1.50'), decimal.Decimal('0.10'), None],
+        'units': [1, None, 2 ** 60],
+        'opened': [datetime.date(2024, 1, 1), datetime.date(2024, 2, 1), None],
+        'note': pd.Series([None, None, None], dtype=object),
+        'comment': [np.nan, np.nan, np.nan],
+        'is_current': [1, 1, 1],
+    })
+
+    changes = _merge(incoming, current)
+    assert changes.unchanged == 3
+    assert changes.expire.empty and changes.insert.empty
+
+    # Against the stored hashes of the first load too
+    first = _merge(incoming, current.iloc[:0])
+    current['row_hash'] = first.insert['row_hash'].to_numpy()
+    assert _merge(incoming, current).insert.empty
+
+
+def test_changed_attribute_creates_a_new_version():
+    current = pd.DataFrame({'sk': [1, 2], 'code': [1, 2], 'units': [2 ** 60, 5], 'is_current': [1, 1]})
+    incoming = pd.DataFrame({'code': [1, 2], 'units': [2 ** 60 + 1, 5]})
+
+    changes = _merge(incoming, current)
+    assert changes.expire['sk'].tolist() == [1]
+    assert changes.insert['code'].tolist() == [1]
+
+
+def test_rows_without_a_stored_hash_are_hashed():
+    incoming = pd.DataFrame({'code': [1, 2, 3], 'units': [5, 6, 7]})
+    current = incoming.assign(sk=[1, 2, 3], is_current=1, row_hash=row_hash(incoming, ['units']))
+
+    # Rows loaded before the row_hash column existed hold NULL
+    with_nulls = current.assign(row_hash=pd.Series([None, *current['row_hash'][1:]], dtype=object))
+    assert _merge(incoming, with_nulls).unchanged == 3
+    # Read back with NULLs, the column is float64 and loses precision: every row is hashed again
+    as_float = current.assign(row_hash=[np.nan, *current['row_hash'][1:].astype(float)])
+    assert _merge(incoming, as_float).unchanged == 3
+    assert _merge(incoming.assign(units=[5, 6, 8]), with_nulls).expire['sk'].tolist() == [3]
@@ -0,0 +1,90 @@
+"""schema: values a column cannot hold are loaded as NULL, and existing tables are widened only on request."""
+import decimal
+
+import numpy as np
+import pandas as pd
+
+from dwh_utils.schema import ColumnSpec, TableSchema, coerce_frame
+
+
+def _coerce(sql_type, values):
+    table_schema = TableSchema('t', (ColumnSpec('value', sql_type, True),), (), ())
+    return coerce_frame(pd.DataFrame({'value': values}), table_schema)['value']
+
+
+def test_infinite_and_out_of_range_integers_become_null():
+    values = _coerce('INT', [1.0, np.inf, -np.inf, 3e10, np.nan])
+    assert str(values.dtype) == 'Int64'
+    assert values.tolist()[0] == 1
+    assert values.isna().tolist() == [False, True, True, True, True]
+
+
+def test_integers_beyond_int64_become_null():
+    values = _coerce('BIGINT', [2.0 ** 63, -2.0 ** 63, 1e19, 4.0])
+    assert values.isna().tolist() == [True, False, True, False]
+    assert values.tolist()[1] == -2 ** 63
+
+
+def test_integer_columns_stay_exact():
+    values = _coerce('BIGINT', [2 ** 62 + 1, 2 ** 63 - 1])
+    assert values.tolist() == [2 ** 62 + 1, 2 ** 63 - 1]
+    assert _coerce('TINYINT UNSIGNED', [1, -1, 300, 255]).isna().tolist() == [False, True, True, False]
+    assert _coerce('BIGINT UNSIGNED', np.array([2 ** 64 - 1, 0], dtype='uint64')).tolist() == [2 ** 64 - 1, 0]
+
+
+def test_infinite_doubles_and_out_of_range_decimals_become_null():
+    assert _coerce('DOUBLE', [1.5, np.inf]).isna().tolist() == [False, True]
+    assert _coerce('DECIMAL(5,2)', [1.234, 1000]).tolist() == [decimal.Decimal('1.23'), None]
+
+
+def test_long_text_is_text_not_a_wide_varchar():
+    from dwh_utils.schema import infer_type
+
+    assert infer_type(pd.Series(['a' * 200])) == 'VARCHAR(200)'
+    assert infer_type(pd.Series(['a' * 1024])) == 'VARCHAR(1024)'
+    assert infer_type(pd.Series(['a' * 1025])) == 'TEXT'
+
+
+class _Cursor:
+    """Answers the information_schema query with the columns of an existing table, and records the rest."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.executed = []
+
+    def execute(self, query, params=None):
+        if not query.startswith('SELECT'):
+            self.executed.append(query)
+
+    def fetchall(self):
+        return self.columns
+
+
+def test_existing_tables_are_only_widened_with_migrate():
+    from dwh_utils.schema import migrate_table
+
+    table_schema = TableSchema('t', (
+        ColumnSpec('id', 'INT', False),
+        ColumnSpec('units', 'INT', True),
+        ColumnSpec('name', 'VARCHAR(20)', True),
+        ColumnSpec('added', 'DATE', True),
+    ), ('id',), ())
+    existing = [
+        (b'id', b'tinyint(4)', 'NO', None, 'auto_increment', None, ''),
+        ('units', 'int(11)', 'NO', '0', '', None, "Units in 'boxes'"),
+        ('name', 'varchar(10)', 'YES', None, '', b'utf8mb4_bin', 'Display name'),
+    ]
+
+    cursor = _Cursor(existing)
+    statement = migrate_table(cursor, table_schema)
+    assert cursor.executed == []
+    # MODIFY replaces the whole column definition, so the default, collation and comment are restated
+    assert statement == ("ALTER TABLE `t`\n"
+                         "    MODIFY `id` INT NOT NULL AUTO_INCREMENT,\n"
+                         "    MODIFY `units` int(11) NULL DEFAULT '0' COMMENT 'Units in ''boxes''',\n"
+                         "    MODIFY `name` VARCHAR(20) COLLATE utf8mb4_bin NULL COMMENT 'Display name',\n"
+                         "    ADD COLUMN `added` DATE NULL;")
+
+    assert migrate_table(cursor, table_schema, migrate=True) is None
+    assert cursor.executed == [statement]
+    assert migrate_table(_Cursor([]), table_schema, migrate=True) is None
@@ -0,0 +1,67 @@
+"""SqlEngine: staged files and mapping sheets queried in place, results streamed in chunks."""
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+
+from dwh_utils.excel import write_excel  # noqa: E402
+from dwh_utils.sql_engine import VECTOR_SIZE, SqlEngine  # noqa: E402
+
+
+def test_csv_partitions_are_unioned_and_joined_with_a_mapping(tmp_path):
+    staged = tmp_path / 'tienda'
+    staged.mkdir()
+    pd.DataFrame({'provincia': ['MAD', 'BCN'], 'ahorro': [1, 2]}).to_csv(staged / 'part_0.csv', index=False)
+    # A later partition with one more column: unioned by name
+    pd.DataFrame({'provincia': ['MAD'], 'ahorro': [4], 'extra': ['x']}).to_csv(staged / 'part_1.csv', index=False)
+    mapping_path = str(tmp_path / 'Mapping.xlsx')
+    write_excel({'Provincias': pd.DataFrame({'mapped': ['Madrid', 'Barcelona'], 'value': ['MAD', 'BCN']})}, mapping_path)
+
+    with SqlEngine(threads=2) as engine:
+        engine.register_staged('tienda', str(staged))
+        table = engine.register_mapping('Provincias', mapping_path)
+        result = engine.query(f'''
+            SELECT m.mapped AS provincia, sum(t.ahorro) AS ahorro
+            FROM tienda t LEFT JOIN {table} m ON m.value = t.provincia
+            GROUP BY ALL ORDER BY provincia''')
+
+    assert table == 'map_provincias'
+    assert result.to_dict('list') == {'provincia': ['Barcelona', 'Madrid'], 'ahorro': [2, 5]}
+
+
+def test_arrow_partitions_are_scanned(tmp_path):
+    pytest.importorskip('pyarrow')
+    from dwh_utils.staging import write_arrow
+
+    write_arrow(pd.DataFrame({'n': [1, 2]}), str(tmp_path / 'sql_0.arrow'))
+    write_arrow(pd.DataFrame({'n': [3]}), str(tmp_path / 'sql_1.arrow'))
+
+    with SqlEngine() as engine:
+        engine.register_staged('t', str(tmp_path))
+        assert engine.query("SELECT sum(n) AS total FROM t")['total'].tolist() == [6]
+
+
+def test_query_results_stream_in_chunks():
+    with SqlEngine() as engine:
+        chunks = list(engine.iter_query("SELECT * FROM range(5000) t(n)", chunk_rows=VECTOR_SIZE))
+
+    assert [len(chunk) for chunk in chunks] == [2048, 2048, 904]
+    assert pd.concat(chunks)['n'].tolist() == list(range(5000))
+
+
+def test_workbook_continuation_sheets_are_queried(tmp_path):
+    path = str(tmp_path / 'sql_0.xlsx')
+    # Three rows per sheet, header included: 5 rows spread over three sheets
+    write_excel({'sql_0': pd.DataFrame({'n': range(5)})}, path, max_rows=3)
+
+    with SqlEngine() as engine:
+        engine.register_staged('t', path)
+        assert engine.query("SELECT count(*) AS rows, sum(n) AS total FROM t").iloc[0].tolist() == [5, 10]
+
+
+def test_workbook_of_several_tables_is_refused(tmp_path):
+    path = str(tmp_path / 'run.xlsx')
+    write_excel({'sql_0': pd.DataFrame({'n': [1]}), 'json_0': pd.DataFrame({'m': [2]})}, path)
+
+    with SqlEngine() as engine, pytest.raises(ValueError, match='several tables'):
+        engine.register_staged('t', path)
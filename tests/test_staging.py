@@ -0,0 +1,80 @@
+"""Arrow staging: memory-mapped hand-off to the transformation stage, and which run is picked up."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from dwh_utils.staging import find_staged, load_staged, read_arrow, write_staging_arrow, write_staging_workbook  # noqa: E402
+
+SCRIPT = 'demo_e.py'
+
+
+def _stage(tmp_path, run_id, n, fmt='arrow'):
+    extracted = {'sql': [pd.DataFrame({'n': [n] * 3, 'x': [1.5, 2.5, np.nan]})], 'json': []}
+    write = write_staging_arrow if fmt == 'arrow' else write_staging_workbook
+    return write(extracted, str(tmp_path), SCRIPT, run_id)
+
+
+def test_arrow_run_round_trips(tmp_path):
+    _stage(tmp_path, 'r1', 7)
+
+    staged = load_staged('demo', str(tmp_path))
+    assert list(staged) == ['sql_0']
+    assert staged['sql_0']['n'].tolist() == [7, 7, 7]
+    assert staged['sql_0']['x'].isna().tolist() == [False, False, True]
+
+    # Mapped columns are read-only; writable=True copies them out so they can be edited in place
+    with pytest.raises(ValueError):
+        staged['sql_0'].loc[0, 'n'] = 8
+    writable = load_staged('demo', str(tmp_path), writable=True)['sql_0']
+    writable.loc[0, 'n'] = 8
+    assert writable['n'].tolist() == [8, 7, 7]
+    assert load_staged('demo', str(tmp_path))['sql_0']['n'].tolist() == [7, 7, 7]
+
+
+def test_mixed_type_column_is_staged_as_text(tmp_path):
+    path = str(tmp_path / 'mixed.arrow')
+    from dwh_utils.staging import write_arrow
+
+    write_arrow(pd.DataFrame({'code': [1, 'A', None]}), path)
+    assert read_arrow(path)['code'].tolist()[:2] == ['1', 'A']
+
+
+def test_latest_staged_run_is_the_last_written_not_the_highest_id(tmp_path):
+    older = _stage(tmp_path, 'r9', 1)
+    newer = _stage(tmp_path, 'r1', 2)
+    os.utime(older, (1_000_000, 1_000_000))
+
+    assert find_staged('demo', str(tmp_path)) == newer
+    assert load_staged('demo', str(tmp_path))['sql_0']['n'].tolist() == [2, 2, 2]
+    assert load_staged('demo', str(tmp_path), run_id='r9')['sql_0']['n'].tolist() == [1, 1, 1]
+
+
+def test_arrow_folder_wins_over_the_workbook_of_the_same_run(tmp_path):
+    workbook = _stage(tmp_path, 'r1', 1, fmt='xlsx')
+    folder = _stage(tmp_path, 'r1', 2)
+    os.utime(folder, (1_000_000, 1_000_000))
+
+    assert find_staged('demo', str(tmp_path)) == folder
+    assert workbook.endswith('demo_r1.xlsx')
+    assert load_staged('demo', str(tmp_path), sources=['sql_0'], columns=['n'])['sql_0'].columns.tolist() == ['n']
+
+
+def test_nothing_staged_is_an_error(tmp_path):
+    with pytest.raises(FileNotFoundError, match='No staged data'):
+        find_staged('demo', str(tmp_path))
+
+
+def test_runs_started_together_get_their_own_id(tmp_path):
+    from dwh_utils.staging import RunCheckpoint, new_run_id
+
+    first, second = new_run_id(), new_run_id()
+    assert first != second and first[:14].isdigit()
+
+    # Two pipelines staged within the same second do not overwrite each other
+    paths = {write_staging_arrow({'sql': [pd.DataFrame({'n': [n]})]}, str(tmp_path), SCRIPT) for n in range(2)}
+    assert len(paths) == 2
+    assert RunCheckpoint('demo', staging_path=str(tmp_path / 'a')).run_id != RunCheckpoint('demo', staging_path=str(tmp_path / 'b')).run_id